@@ -6,6 +6,8 @@ from sqlalchemy import pool
 from alembic import context
 
 from app.config import settings
+from app.core.partitions import is_price_partition
+from app.core.search import PRODUCT_FTS_TABLE, PRODUCT_SEARCH_INDEX, PRODUCT_SEARCH_VECTOR
 from app.database import engine
 from app.models import * 
 
@@ -35,6 +37,22 @@ db_url_escaped = settings.DATABASE_URL.replace('%', '%%')
 config.set_main_option('sqlalchemy.url', db_url_escaped)
 
 
+# Objects created with raw SQL rather than declared on the models. Autogenerate
+# would otherwise take them for leftovers and drop them.
+def include_name(name, type_, parent_names) -> bool:
+    if type_ == "table":
+        # The FTS5 table and its shadow tables (_data, _idx, _config, _docsize),
+        # and the monthly partitions of prices, which are created as time goes by
+        if name == PRODUCT_FTS_TABLE or name.startswith(f"{PRODUCT_FTS_TABLE}_"):
+            return False
+        return not is_price_partition(name)
+    if type_ == "column":
+        return not (parent_names["table_name"] == "products" and name == PRODUCT_SEARCH_VECTOR)
+    if type_ == "index":
+        return name != PRODUCT_SEARCH_INDEX
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -53,6 +71,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -74,7 +93,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_name=include_name
         )
 
         with context.begin_transaction():
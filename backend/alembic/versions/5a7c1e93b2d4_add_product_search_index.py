@@ -0,0 +1,29 @@
+"""Add product search index
+
+Revision ID: 5a7c1e93b2d4
+Revises: 319607ce68d9
+Create Date: 2026-10-18 15:12:40.331872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.core.search import drop_product_search, install_product_search
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7c1e93b2d4'
+down_revision: Union[str, None] = '319607ce68d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # PostgreSQL gets a generated tsvector column with a GIN index, SQLite an FTS5 table.
+    # Both are filled from the existing products.
+    install_product_search(op.get_bind())
+
+
+def downgrade() -> None:
+    drop_product_search(op.get_bind())
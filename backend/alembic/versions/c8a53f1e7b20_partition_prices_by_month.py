@@ -0,0 +1,118 @@
+"""Partition prices by month
+
+Revision ID: c8a53f1e7b20
+Revises: b4e19a6c02d5
+Create Date: 2026-10-18 13:05:17.884120
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+from app.core.partitions import PRICE_DEFAULT_PARTITION, add_months, create_price_partitions, month_start
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a53f1e7b20'
+down_revision: Union[str, None] = 'b4e19a6c02d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PRICE_COLUMNS = "id, product_id, supermarket_id, price, url, original_price, scraped_at, last_seen_at, created_at"
+
+PRICE_INDEXES = """
+    CREATE INDEX idx_price_composite ON prices (product_id, supermarket_id, scraped_at);
+    CREATE INDEX ix_prices_price ON prices (price);
+    CREATE INDEX ix_prices_product_id ON prices (product_id);
+    CREATE INDEX ix_prices_scraped_at ON prices (scraped_at);
+    CREATE INDEX ix_prices_supermarket_id ON prices (supermarket_id);
+    CREATE INDEX ix_prices_last_seen_at ON prices (last_seen_at);
+"""
+
+
+def _detach_old_prices() -> None:
+    """Rename the current prices table out of the way, keeping its id sequence alive."""
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE prices RENAME TO prices_old")
+    op.execute("ALTER TABLE prices_old DROP CONSTRAINT prices_pkey")
+    op.execute("ALTER TABLE prices_old DROP CONSTRAINT uix_price_composite")
+    for index in (
+        "idx_price_composite", "ix_prices_price", "ix_prices_product_id",
+        "ix_prices_scraped_at", "ix_prices_supermarket_id", "ix_prices_last_seen_at",
+    ):
+        op.execute(f"DROP INDEX {index}")
+
+
+def upgrade() -> None:
+    # Partitioning is PostgreSQL only, other databases keep the plain table
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    _detach_old_prices()
+
+    # The partition key has to be part of every unique constraint, including the primary key
+    op.execute("""
+        CREATE TABLE prices (
+            id INTEGER NOT NULL DEFAULT nextval('prices_id_seq'),
+            product_id INTEGER REFERENCES products (id),
+            supermarket_id INTEGER REFERENCES supermarkets (id),
+            price FLOAT NOT NULL,
+            url VARCHAR(500),
+            original_price FLOAT,
+            scraped_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            last_seen_at TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT prices_pkey PRIMARY KEY (id, scraped_at),
+            CONSTRAINT uix_price_composite UNIQUE (product_id, supermarket_id, scraped_at)
+        ) PARTITION BY RANGE (scraped_at)
+    """)
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY prices.id")
+    op.execute(PRICE_INDEXES)
+
+    # Monthly partitions from the oldest stored price up to the configured horizon,
+    # plus a default partition so an unexpected timestamp never fails an insert
+    connection = op.get_bind()
+    oldest = connection.execute(sa.text("SELECT MIN(scraped_at) FROM prices_old")).scalar()
+    current = month_start(datetime.now(timezone.utc))
+    create_price_partitions(
+        connection,
+        month_start(oldest) if oldest else current,
+        add_months(current, settings.PRICE_PARTITION_MONTHS_AHEAD + 1),
+    )
+    op.execute(f"CREATE TABLE {PRICE_DEFAULT_PARTITION} PARTITION OF prices DEFAULT")
+
+    op.execute(f"INSERT INTO prices ({PRICE_COLUMNS}) SELECT {PRICE_COLUMNS} FROM prices_old")
+    op.execute("DROP TABLE prices_old")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    _detach_old_prices()
+
+    op.execute("""
+        CREATE TABLE prices (
+            id INTEGER NOT NULL DEFAULT nextval('prices_id_seq'),
+            product_id INTEGER REFERENCES products (id),
+            supermarket_id INTEGER REFERENCES supermarkets (id),
+            price FLOAT NOT NULL,
+            url VARCHAR(500),
+            original_price FLOAT,
+            scraped_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            last_seen_at TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT prices_pkey PRIMARY KEY (id),
+            CONSTRAINT uix_price_composite UNIQUE (product_id, supermarket_id, scraped_at)
+        )
+    """)
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY prices.id")
+    op.execute(PRICE_INDEXES)
+
+    op.execute(f"INSERT INTO prices ({PRICE_COLUMNS}) SELECT {PRICE_COLUMNS} FROM prices_old")
+    # Dropping the partitioned parent drops every partition with it
+    op.execute("DROP TABLE prices_old")
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import signal
+import sys
+from datetime import datetime
+
+from sqlmodel import Session
+
+from app.config import settings
+from app.core.export import export_prices as stream_price_export
+from app.core.partitions import drop_price_partitions_before, ensure_price_partitions
+from app.crud import crud_scraping_job
+from app.database import engine
+from app.schemas.price import PriceExportFormat
+from app.schemas.scraping_job import ScrapingJobCreate
+from app.scraper.engine import ScrapeEngine
+from app.scraper.scheduler import create_due_jobs, refresh_schedule
+from app.scraper.worker import Worker
+
+
+def ensure_partitions(args: argparse.Namespace):
+    created = ensure_price_partitions(engine, months_ahead=args.months_ahead)
+    print(f"Created {len(created)} partitions: {', '.join(created) or '-'}")
+
+
+def drop_partitions(args: argparse.Namespace):
+    dropped = drop_price_partitions_before(engine, args.before)
+    print(f"Dropped {len(dropped)} partitions: {', '.join(dropped) or '-'}")
+
+
+def export_prices(args: argparse.Namespace):
+    # SQL echo goes to stdout, where the export may be going too
+    engine.echo = False
+    chunks = stream_price_export(
+        engine,
+        PriceExportFormat(args.format),
+        supermarket_id=args.supermarket_id,
+        product_id=args.product_id,
+        since=args.since,
+        until=args.until,
+        batch_size=args.batch_size,
+    )
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output != "-" else sys.stdout
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def scrape(args: argparse.Namespace):
+    with Session(engine) as session:
+        if args.job_id is not None:
+            job = crud_scraping_job.get_job(session, args.job_id)
+            if job is None:
+                sys.exit(f"Scraping job {args.job_id} not found")
+        else:
+            job = crud_scraping_job.create_scraping_job(session, ScrapingJobCreate(supermarket_id=args.supermarket_id))
+        scrape_engine = ScrapeEngine(
+            session, batch_size=args.batch_size, max_pages=args.max_pages, conditional=not args.full
+        )
+        job = asyncio.run(scrape_engine.run(job))
+        print(f"Job {job.id} {job.status.value}: {job.products_scraped} prices, {job.errors_count} errors")
+
+
+def work(args: argparse.Namespace):
+    async def run_worker(session: Session) -> int:
+        worker = Worker(session, jobs=args.jobs, poll_interval=args.poll_interval)
+        # Finish the running jobs on SIGTERM/SIGINT; a second signal interrupts them
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop, worker, loop, signum)
+        return await worker.run(once=args.once)
+
+    def stop(worker: Worker, loop: asyncio.AbstractEventLoop, signum: int):
+        worker.stop()
+        loop.remove_signal_handler(signum)
+
+    with Session(engine) as session:
+        finished = asyncio.run(run_worker(session))
+    print(f"Finished {finished} jobs")
+
+
+def schedule(args: argparse.Namespace):
+    with Session(engine) as session:
+        scheduled = refresh_schedule(session)
+        jobs = create_due_jobs(session, max_urls=args.max_urls, max_jobs=args.max_jobs)
+    print(f"Scheduled {scheduled} products, queued {len(jobs)} jobs for {sum(len(job.urls) for job in jobs)} pages")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Supermarket Price Scraper maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure-partitions", help="Create the upcoming monthly price partitions")
+    ensure.add_argument("--months-ahead", type=int, default=settings.PRICE_PARTITION_MONTHS_AHEAD)
+    ensure.set_defaults(handler=ensure_partitions)
+
+    drop = commands.add_parser("drop-partitions", help="Drop monthly price partitions that end before a date")
+    drop.add_argument("--before", type=datetime.fromisoformat, required=True)
+    drop.set_defaults(handler=drop_partitions)
+
+    export = commands.add_parser("export-prices", help="Stream prices as CSV or NDJSON")
+    export.add_argument("--format", choices=[f.value for f in PriceExportFormat], default=PriceExportFormat.CSV.value)
+    export.add_argument("--supermarket-id", type=int)
+    export.add_argument("--product-id", type=int)
+    export.add_argument("--since", type=datetime.fromisoformat)
+    export.add_argument("--until", type=datetime.fromisoformat)
+    export.add_argument("--batch-size", type=int, default=settings.PRICE_EXPORT_BATCH_SIZE)
+    export.add_argument("--output", default="-", help="File to write, - for stdout")
+    export.set_defaults(handler=export_prices)
+
+    scraper = commands.add_parser("scrape", help="Scrape a supermarket's site into prices")
+    target = scraper.add_mutually_exclusive_group(required=True)
+    target.add_argument("--job-id", type=int, help="Run an existing scraping job")
+    target.add_argument("--supermarket-id", type=int, help="Create and run a new job for a supermarket")
+    scraper.add_argument("--batch-size", type=int, default=settings.SCRAPER_BATCH_SIZE)
+    scraper.add_argument("--max-pages", type=int, default=settings.SCRAPER_MAX_PAGES)
+    scraper.add_argument("--full", action="store_true", help="Fetch and ingest every page, changed or not")
+    scraper.set_defaults(handler=scrape)
+
+    worker = commands.add_parser("work", help="Run scraping jobs claimed from the job queue")
+    worker.add_argument("--jobs", type=int, default=settings.SCRAPER_WORKER_JOBS, help="Jobs to run at once")
+    worker.add_argument("--poll-interval", type=float, default=settings.SCRAPER_WORKER_POLL_INTERVAL)
+    worker.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+    worker.set_defaults(handler=work)
+
+    scheduler = commands.add_parser("schedule", help="Reschedule products by price volatility and queue the due pages")
+    scheduler.add_argument("--max-urls", type=int, default=settings.SCRAPER_JOB_MAX_URLS, help="Pages per job")
+    scheduler.add_argument("--max-jobs", type=int, help="Queue at most this many jobs")
+    scheduler.set_defaults(handler=schedule)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
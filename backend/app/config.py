@@ -1,5 +1,7 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Optional
 
 # Path to .env file
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -8,7 +10,56 @@ ENV_FILE = BASE_DIR / ".env"
 class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str
+    PRICE_INGEST_BATCH_SIZE: int = 1000
+    DIMENSION_CACHE_TTL: float = 300.0
+    DIMENSION_CACHE_MAX_SIZE: int = 10000
+    PRICE_PARTITION_MONTHS_AHEAD: int = 3
+    PRICE_HISTORY_RAW_MAX_DAYS: int = 31
+    PRICE_EXPORT_BATCH_SIZE: int = 5000
+    # Comparisons and baskets leave out prices last seen longer ago than this
+    PRICE_FRESHNESS_HOURS: float = 24.0
+    SCRAPER_CONCURRENCY: int = 4
+    SCRAPER_MAX_CONNECTIONS: int = 100
+    SCRAPER_TIMEOUT: float = 20.0
+    SCRAPER_MAX_RETRIES: int = 2
+    SCRAPER_MAX_PAGES: int = 10000
+    SCRAPER_BATCH_SIZE: int = 500
+    SCRAPER_MIN_MATCH_SCORE: float = 0.75
+    SCRAPER_USER_AGENT: str = "SupermarketPriceScraper/1.0"
+    SCRAPER_WORKER_JOBS: int = 2
+    SCRAPER_WORKER_POLL_INTERVAL: float = 5.0
+    SCRAPER_JOB_TIMEOUT: float = 900.0
+    # Running jobs write their counters at most this often, or after this many updates
+    SCRAPER_PROGRESS_FLUSH_INTERVAL: float = 5.0
+    SCRAPER_PROGRESS_FLUSH_EVERY: int = 1000
+    SCRAPER_PAGE_STORE_DIR: Path = BASE_DIR / "data" / "pages"
+    SCRAPER_PAGE_STORE_LEVEL: int = 3
+    # Worker processes parsing pages: None for one per core, 0 to parse on the event loop
+    SCRAPER_PARSE_PROCESSES: Optional[int] = None
+    SCRAPER_PIPELINE_QUEUE_SIZE: int = 64
+    # Per-site limits, unless a supermarket sets its own
+    SCRAPER_RATE_LIMIT: float = 10.0
+    SCRAPER_RATE_BURST: float = 5.0
+    # A response this many times slower than usual counts as a sign of overload
+    SCRAPER_LATENCY_TOLERANCE: float = 3.0
+    SCRAPER_MAX_RETRY_AFTER: float = 60.0
+    # Incremental scheduling: pages a day to spread over products by how often their prices change
+    SCRAPER_DAILY_PAGE_BUDGET: int = 20000
+    SCRAPER_MIN_INTERVAL_HOURS: float = 1.0
+    # Under PRICE_FRESHNESS_HOURS with time to spare for dispatching and fetching a due page,
+    # so an unchanged price is confirmed before it drops out of comparisons
+    SCRAPER_MAX_INTERVAL_HOURS: float = 20.0
+    SCRAPER_VOLATILITY_WINDOW_DAYS: int = 90
+    SCRAPER_JOB_MAX_URLS: int = 500
+    # Dispatched pages that have not been checked by then are due again
+    SCRAPER_SCHEDULE_LEASE_HOURS: float = 6.0
 
     model_config = SettingsConfigDict(env_file=str(ENV_FILE), env_ignore_empty=True)
 
+    @model_validator(mode="after")
+    def check_revisit_interval(self) -> "Settings":
+        if self.SCRAPER_MAX_INTERVAL_HOURS > self.PRICE_FRESHNESS_HOURS:
+            raise ValueError("SCRAPER_MAX_INTERVAL_HOURS must not exceed PRICE_FRESHNESS_HOURS")
+        return self
+
 settings = Settings()
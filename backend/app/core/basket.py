@@ -0,0 +1,194 @@
+import heapq
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.schemas.basket import BasketLine, BasketOption, BasketResult
+
+
+# A basket is solved on a product x supermarket matrix of quantity-weighted
+# latest prices, with inf where a store doesn't carry a product. The best
+# single store is a column sum; the best split across at most K stores is a
+# branch and bound over store subsets.
+MAX_SEARCH_NODES = 2000
+
+
+def build_price_matrix(
+    rows: Sequence[Tuple[int, int, float]],
+    product_ids: Sequence[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Matrix of unit prices for product_ids (rows) at every supermarket in rows (columns)."""
+    supermarket_ids = np.array(sorted({supermarket_id for _, supermarket_id, _ in rows}), dtype=np.int64)
+    matrix = np.full((len(product_ids), len(supermarket_ids)), np.inf)
+    if rows:
+        row_index = {product_id: i for i, product_id in enumerate(product_ids)}
+        products, supermarkets, prices = zip(*rows)
+        matrix[
+            [row_index[product_id] for product_id in products],
+            np.searchsorted(supermarket_ids, supermarkets),
+        ] = prices
+    return matrix, supermarket_ids
+
+
+def _undominated_stores(costs: np.ndarray) -> np.ndarray:
+    """
+    Indexes of stores not dominated by another one. A store is dominated when
+    some other store is at least as cheap for every product; swapping it for
+    that store never makes a split worse, so it can be left out of the search.
+    """
+    at_most = (costs[:, :, None] <= costs[:, None, :]).all(axis=0)  # [b, a]: b is never dearer than a
+    strictly = (costs[:, :, None] < costs[:, None, :]).any(axis=0)
+    # Of identical stores only the first one is kept
+    earlier = np.tri(costs.shape[1], k=-1, dtype=bool).T
+    dominates = at_most & (strictly | earlier)
+    np.fill_diagonal(dominates, False)
+    return np.flatnonzero(~dominates.any(axis=0))
+
+
+def _greedy_split(costs: np.ndarray, max_stores: int) -> Tuple[List[int], float]:
+    """Repeatedly add the store that saves the most, as a first upper bound."""
+    current = costs.max(axis=1)
+    chosen: List[int] = []
+    for _ in range(max_stores):
+        candidates = np.minimum(current[:, None], costs)
+        best = int(np.argmin(candidates.sum(axis=0)))
+        current = candidates[:, best]
+        chosen.append(best)
+    return chosen, current.sum()
+
+
+def _best_split(costs: np.ndarray, max_stores: int) -> Tuple[List[int], bool]:
+    """
+    Columns of the cheapest set of at most max_stores stores, and whether the
+    search finished. costs must be finite. The search stops after
+    MAX_SEARCH_NODES subsets and then returns the best split found so far.
+    """
+    stores = _undominated_stores(costs)
+    costs = costs[:, stores]
+    # Cheapest stores first so good splits are found early
+    order = np.argsort(costs.sum(axis=0), kind="stable")
+    costs = costs[:, order]
+    # suffix_min[:, j]: cheapest price of every product among stores j onwards
+    suffix_min = np.minimum.accumulate(costs[:, ::-1], axis=1)[:, ::-1]
+    count = costs.shape[1]
+
+    best_stores, best_total = _greedy_split(costs, min(max_stores, count))
+    nodes = 0
+
+    def lower_bounds(start: int, current: np.ndarray, remaining: int) -> np.ndarray:
+        """
+        For every j >= start, a lower bound on any split that adds up to
+        remaining stores from j onwards to current. Savings are subadditive,
+        so those stores save at most the sum of their `remaining` largest
+        individual savings; and no product gets cheaper than its cheapest
+        remaining price.
+        """
+        savings = np.maximum(current[:, None] - costs[:, start:], 0).sum(axis=0)
+        top_savings = np.empty(len(savings))
+        largest: List[float] = []
+        largest_sum = 0.0
+        for k in range(len(savings) - 1, -1, -1):
+            heapq.heappush(largest, savings[k])
+            largest_sum += savings[k]
+            if len(largest) > remaining:
+                largest_sum -= heapq.heappop(largest)
+            top_savings[k] = largest_sum
+        cheapest = np.minimum(current[:, None], suffix_min[:, start:]).sum(axis=0)
+        return np.maximum(current.sum() - top_savings, cheapest)
+
+    def search(start: int, current: np.ndarray, chosen: List[int]) -> bool:
+        nonlocal best_stores, best_total, nodes
+        nodes += 1
+        if nodes > MAX_SEARCH_NODES:
+            return False
+        remaining = max_stores - len(chosen)
+        bounds = lower_bounds(start, current, remaining)
+        candidates = np.minimum(current[:, None], costs[:, start:])
+        totals = candidates.sum(axis=0)
+        for offset, j in enumerate(range(start, count)):
+            # Bounds only grow with j, so once one can't beat the best split no later one can
+            if not bounds[offset] < best_total:
+                break
+            if totals[offset] < best_total:
+                best_stores, best_total = chosen + [j], totals[offset]
+            if remaining > 1 and j + 1 < count:
+                if not search(j + 1, candidates[:, offset], chosen + [j]):
+                    return False
+        return True
+
+    complete = search(0, costs.max(axis=1), [])
+    # Drop stores the final assignment doesn't use
+    used = set(np.argmin(costs[:, best_stores], axis=1).tolist())
+    return sorted(int(stores[order[best_stores[i]]]) for i in used), complete
+
+
+def _option(
+    product_ids: Sequence[int],
+    quantities: np.ndarray,
+    prices: np.ndarray,
+    supermarket_ids: np.ndarray,
+    columns: List[int],
+    optimal: bool = True
+) -> BasketOption:
+    selected = prices[:, columns]
+    picks = np.argmin(selected, axis=1)
+    unit_prices = selected[np.arange(len(product_ids)), picks]
+    carried = ~np.isinf(unit_prices)
+    subtotals = np.where(carried, unit_prices * quantities, 0)
+    lines = [
+        BasketLine(
+            product_id=product_id,
+            supermarket_id=int(supermarket_ids[columns[pick]]),
+            quantity=quantity,
+            price=price,
+            subtotal=subtotal,
+        )
+        for product_id, pick, quantity, price, subtotal, ok in zip(
+            product_ids, picks.tolist(), quantities.tolist(), unit_prices.tolist(), subtotals.tolist(), carried.tolist()
+        )
+        if ok
+    ]
+    return BasketOption(
+        supermarket_ids=[int(supermarket_ids[column]) for column in columns],
+        total=round(float(subtotals.sum()), 2),
+        lines=lines,
+        missing_product_ids=[product_id for product_id, ok in zip(product_ids, carried.tolist()) if not ok],
+        optimal=optimal,
+    )
+
+
+def optimize_basket(
+    quantities_by_product: Dict[int, float],
+    rows: Sequence[Tuple[int, int, float]],
+    max_stores: int
+) -> BasketResult:
+    """
+    Cheapest single supermarket and cheapest split across at most max_stores
+    supermarkets for a basket, given the (product_id, supermarket_id, price)
+    rows of the latest prices. Options that carry more of the basket always
+    win over cheaper ones that carry less; products no supermarket has are
+    reported as unavailable.
+    """
+    product_ids = list(quantities_by_product)
+    prices, supermarket_ids = build_price_matrix(rows, product_ids)
+    available = ~np.isinf(prices).all(axis=1)
+    unavailable = [product_id for product_id, ok in zip(product_ids, available.tolist()) if not ok]
+    product_ids = [product_id for product_id, ok in zip(product_ids, available.tolist()) if ok]
+    if not product_ids:
+        return BasketResult(unavailable_product_ids=unavailable)
+    prices = prices[available]
+    quantities = np.array([quantities_by_product[product_id] for product_id in product_ids])
+
+    # A missing product costs more than the dearest possible basket, which
+    # puts coverage first and keeps every cost finite for the search
+    costs = prices * quantities[:, None]
+    penalty = np.where(np.isinf(costs), 0, costs).max(axis=1).sum() + 1
+    costs = np.where(np.isinf(costs), penalty, costs)
+
+    single = [int(np.argmin(costs.sum(axis=0)))]
+    split, complete = _best_split(costs, max_stores)
+    return BasketResult(
+        single_store=_option(product_ids, quantities, prices, supermarket_ids, single),
+        split=_option(product_ids, quantities, prices, supermarket_ids, split, optimal=complete),
+        unavailable_product_ids=unavailable,
+    )
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from app.config import settings
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a fixed time to live.
+    Misses are never cached, so a row created after a failed lookup is found on the next call.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if value is None:
+            return
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Read-through lookup: call loader on a miss and cache what it returns."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def get_many_or_load(self, keys: Iterable[Hashable], loader: Callable[[set], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """Read-through lookup of many keys, loading all misses with a single loader call."""
+        found, missing = {}, set()
+        for key in keys:
+            value = self.get(key)
+            if value is None:
+                missing.add(key)
+            else:
+                found[key] = value
+        if missing:
+            loaded = loader(missing)
+            for key, value in loaded.items():
+                self.set(key, value)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+supermarket_cache = TTLCache("supermarkets", maxsize=settings.DIMENSION_CACHE_MAX_SIZE, ttl=settings.DIMENSION_CACHE_TTL)
+category_cache = TTLCache("categories", maxsize=settings.DIMENSION_CACHE_MAX_SIZE, ttl=settings.DIMENSION_CACHE_TTL)
+# Category ID -> IDs of the category and all its descendants
+category_subtree_cache = TTLCache("category_subtrees", maxsize=settings.DIMENSION_CACHE_MAX_SIZE, ttl=settings.DIMENSION_CACHE_TTL)
+product_name_cache = TTLCache("product_names", maxsize=settings.DIMENSION_CACHE_MAX_SIZE, ttl=settings.DIMENSION_CACHE_TTL)
+
+
+def get_cache_stats() -> list:
+    return [cache.stats() for cache in (supermarket_cache, category_cache, category_subtree_cache, product_name_cache)]
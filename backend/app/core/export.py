@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.engine import Connection, Engine, Row
+
+from app.config import settings
+from app.crud.crud_price import seen_since
+from app.models.price import Price
+from app.schemas.price import PriceExportFormat
+
+
+# Exports read plain rows through a server-side cursor and format them one
+# batch at a time, so memory stays flat however many rows are exported.
+# Timestamps are rendered as ISO 8601 UTC text by the database, which is far
+# cheaper than building and formatting a datetime object per value.
+EXPORT_HEADER = [
+    "id", "product_id", "supermarket_id", "price", "original_price",
+    "url", "scraped_at", "last_seen_at",
+]
+
+MEDIA_TYPES = {
+    PriceExportFormat.CSV: "text/csv",
+    PriceExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def _utc_isoformat(column, dialect: str):
+    if dialect == "postgresql":
+        return func.to_char(func.timezone("UTC", column), 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"')
+    if dialect == "sqlite":
+        # SQLite stores UTC datetimes as 'YYYY-MM-DD HH:MM:SS.ffffff' text
+        return func.replace(column, " ", "T") + "Z"
+    return cast(column, String)
+
+
+def iter_price_batches(
+    connection: Connection,
+    supermarket_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = settings.PRICE_EXPORT_BATCH_SIZE
+) -> Iterator[Sequence[Row]]:
+    """
+    Yield the matching prices batch_size rows at a time, in storage order.
+    No ORDER BY, so the database can stream a plain scan instead of sorting.
+    """
+    dialect = connection.dialect.name
+    statement = select(
+        Price.id, Price.product_id, Price.supermarket_id, Price.price, Price.original_price, Price.url,
+        _utc_isoformat(Price.scraped_at, dialect), _utc_isoformat(Price.last_seen_at, dialect),
+    )
+    if supermarket_id is not None:
+        statement = statement.where(Price.supermarket_id == supermarket_id)
+    if product_id is not None:
+        statement = statement.where(Price.product_id == product_id)
+    if since is not None:
+        statement = statement.where(seen_since(since))
+    if until is not None:
+        statement = statement.where(Price.scraped_at < until)
+
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+    yield from result.partitions()
+
+
+def _format_csv(batch: Sequence[Row]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    return buffer.getvalue()
+
+
+_encode_json = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _format_ndjson(batch: Sequence[Row]) -> str:
+    lines = [_encode_json(dict(zip(EXPORT_HEADER, row))) for row in batch]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def format_price_batches(batches: Iterator[Sequence[Row]], export_format: PriceExportFormat) -> Iterator[str]:
+    """Turn row batches into CSV (with a header line) or NDJSON text chunks."""
+    if export_format == PriceExportFormat.CSV:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_HEADER)
+        yield buffer.getvalue()
+        for batch in batches:
+            yield _format_csv(batch)
+    else:
+        for batch in batches:
+            yield _format_ndjson(batch)
+
+
+def export_prices(engine: Engine, export_format: PriceExportFormat, **filters) -> Iterator[str]:
+    """
+    Stream an export on a connection of its own, so it can outlive the
+    request session. The connection is released when the iterator is closed.
+    """
+    with engine.connect() as connection:
+        yield from format_price_batches(iter_price_batches(connection, **filters), export_format)
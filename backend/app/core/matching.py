@@ -0,0 +1,228 @@
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+
+# Scraped items are resolved to products in three passes, cheapest first:
+#  1. the SKU, looked up in the unique sku index
+#  2. the normalized name + variant, compared as a whole
+#  3. a fuzzy token score against the products of the same block
+# Names are normalized by folding accents and case and rewriting quantities to
+# one unit ("1L", "1000 ml" and "1.000ML" are all "1000ml"). A block is the
+# first meaningful word of the name, usually the kind of product, so only
+# candidates that could plausibly match are loaded and scored.
+SKU_CONFIDENCE = 1.0
+EXACT_CONFIDENCE = 0.95
+AMBIGUOUS_EXACT_CONFIDENCE = 0.9
+FUZZY_CONFIDENCE_SCALE = 0.9
+# Candidates are the products sharing one of the rarer words of an item. Words
+# in more products of a block than this, like the block word itself, and
+# quantities are only checked on those candidates.
+COMMON_WORD_PRODUCTS = 200
+# Score factor when both sides state a quantity and none of them agree
+QUANTITY_MISMATCH_FACTOR = 0.5
+
+_UNITS = {
+    "ml": ("ml", 1), "cc": ("ml", 1), "l": ("ml", 1000), "lt": ("ml", 1000), "lts": ("ml", 1000),
+    "litro": ("ml", 1000), "litros": ("ml", 1000),
+    "g": ("g", 1), "gr": ("g", 1), "grs": ("g", 1), "gramos": ("g", 1), "kg": ("g", 1000), "kilo": ("g", 1000),
+    "kilos": ("g", 1000),
+    "un": ("un", 1), "und": ("un", 1), "unds": ("un", 1), "unidades": ("un", 1),
+}
+_QUANTITY = re.compile(r"(\d+(?:[.,]\d+)*)\s*(" + "|".join(sorted(_UNITS, key=len, reverse=True)) + r")\b")
+_COUNT = re.compile(r"\bx\s*(\d+)\b")
+_QUANTITY_TOKEN = re.compile(r"^\d+(?:\.\d+)?(?:ml|g|un)$")
+_DIGIT = re.compile(r"\d")
+_TOKEN = re.compile(r"[^\W_]+(?:\.[^\W_]+)*")
+
+
+def _fold(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def _number(text: str) -> float:
+    # "1.000" and "1,5": a separator followed by exactly three digits groups thousands
+    parts = re.split(r"[.,]", text)
+    if len(parts) > 1 and len(parts[-1]) != 3:
+        return float("".join(parts[:-1]) + "." + parts[-1])
+    return float("".join(parts))
+
+
+def _quantity(match: re.Match) -> str:
+    unit, factor = _UNITS[match.group(2)]
+    return f" {_number(match.group(1)) * factor:g}{unit} "
+
+
+# Variants and many names repeat across a catalog and across runs
+@lru_cache(maxsize=100_000)
+def normalize_tokens(text: Optional[str]) -> Tuple[str, ...]:
+    """Accent and case folded words of text, with quantities rewritten to ml, g or un."""
+    if not text:
+        return ()
+    folded = _fold(text)
+    if _DIGIT.search(folded):
+        folded = _COUNT.sub(r" \1un ", _QUANTITY.sub(_quantity, folded))
+    # Dots are kept only inside numbers, such as the 2.5 of "2.5g"
+    return tuple(_TOKEN.findall(folded))
+
+
+def normalize_sku(sku: Optional[str]) -> Optional[str]:
+    """SKUs are stored upper-cased and stripped, see ProductBase.validate_sku."""
+    if sku is None:
+        return None
+    return sku.upper().strip() or None
+
+
+def _block_of(tokens: Sequence[str]) -> Optional[str]:
+    for token in tokens:
+        if len(token) >= 3 and not token.isdigit() and not _QUANTITY_TOKEN.match(token):
+            return token[:100]
+    return tokens[0][:100] if tokens else None
+
+
+def blocking_key(name: Optional[str]) -> Optional[str]:
+    """First word of the name that is neither a quantity nor shorter than three characters."""
+    return _block_of(normalize_tokens(name))
+
+
+@dataclass(frozen=True)
+class MatchKey:
+    block: Optional[str]
+    tokens: FrozenSet[str]
+    quantities: FrozenSet[str]
+
+
+def match_key(name: Optional[str], variant: Optional[str]) -> MatchKey:
+    name_tokens = normalize_tokens(name)
+    tokens = frozenset(name_tokens) | frozenset(normalize_tokens(variant))
+    quantities = frozenset(token for token in tokens if _QUANTITY_TOKEN.match(token))
+    return MatchKey(_block_of(name_tokens), tokens, quantities)
+
+
+class _Block:
+    """The candidate products of one block with a word index over them."""
+
+    def __init__(self):
+        self.product_ids: List[int] = []
+        self.category_ids: List[int] = []
+        self.keys: List[MatchKey] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.exact: Dict[FrozenSet[str], List[int]] = defaultdict(list)
+        self.weights: Dict[str, float] = {}
+        self.totals: List[float] = []
+        self.unseen_weight = 0.0
+
+    def add(self, product_id: int, category_id: int, key: MatchKey) -> None:
+        position = len(self.product_ids)
+        self.product_ids.append(product_id)
+        self.category_ids.append(category_id)
+        self.keys.append(key)
+        self.exact[key.tokens].append(position)
+        for token in key.tokens:
+            self.postings[token].append(position)
+
+    def freeze(self) -> None:
+        """Word weights and per-product weight totals, once every product is in."""
+        size = len(self.product_ids)
+        self.unseen_weight = math.log(1 + size / 0.5)
+        # Rarer words weigh more; words the block has never seen weigh the most
+        self.weights = {token: math.log(1 + size / len(positions)) for token, positions in self.postings.items()}
+        self.totals = [sum(self.weights[token] for token in key.tokens) for key in self.keys]
+
+    def total(self, key: MatchKey) -> float:
+        weights = self.weights
+        return sum(weights.get(token, self.unseen_weight) for token in key.tokens)
+
+    def overlaps(self, key: MatchKey) -> Dict[int, float]:
+        """Weight of the words each candidate product shares with an item."""
+        common: Dict[int, float] = defaultdict(float)
+        frequent = []
+        for token in key.tokens:
+            positions = self.postings.get(token)
+            if positions is None:
+                continue
+            if len(positions) > COMMON_WORD_PRODUCTS or token in key.quantities:
+                frequent.append(token)
+                continue
+            weight = self.weights[token]
+            for position in positions:
+                common[position] += weight
+
+        if not common and frequent:
+            # Only common words to go by: take the first products of the rarest one
+            rarest = max(frequent, key=self.weights.__getitem__)
+            common = dict.fromkeys(self.postings[rarest][:COMMON_WORD_PRODUCTS], 0.0)
+        for token in frequent:
+            weight = self.weights[token]
+            for position in common:
+                if token in self.keys[position].tokens:
+                    common[position] += weight
+        return common
+
+    def score(self, key: MatchKey, total: float, position: int, common: float) -> float:
+        """Weighted Dice overlap of the words of an item and a product."""
+        total += self.totals[position]
+        score = 2 * common / total if total else 0.0
+        quantities = self.keys[position].quantities
+        if key.quantities and quantities and not key.quantities & quantities:
+            score *= QUANTITY_MISMATCH_FACTOR
+        return score
+
+
+class ProductMatcher:
+    """Name based matching of scraped items against candidate product rows."""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[str], int]]):
+        self.blocks: Dict[str, _Block] = defaultdict(_Block)
+        for product_id, name, variant, category_id in rows:
+            key = match_key(name, variant)
+            if key.block is not None:
+                self.blocks[key.block].add(product_id, category_id, key)
+        for block in self.blocks.values():
+            block.freeze()
+
+    def match(
+        self,
+        key: MatchKey,
+        category_id: Optional[int] = None,
+        min_score: float = 0.0
+    ) -> Optional[Tuple[int, bool, float]]:
+        """
+        (product_id, exact, confidence) of the best product for an item, None
+        when no candidate scores at least min_score.
+        """
+        block = self.blocks.get(key.block)
+        if block is None or not key.tokens:
+            return None
+
+        def allowed(position: int) -> bool:
+            return category_id is None or block.category_ids[position] == category_id
+
+        exact = [position for position in block.exact.get(key.tokens, []) if allowed(position)]
+        if exact:
+            product_id = min(block.product_ids[position] for position in exact)
+            return product_id, True, EXACT_CONFIDENCE if len(exact) == 1 else AMBIGUOUS_EXACT_CONFIDENCE
+
+        best: Optional[Tuple[float, int]] = None
+        total = block.total(key)
+        for position, common in block.overlaps(key).items():
+            if not allowed(position):
+                continue
+            score = block.score(key, total, position, common)
+            ranked = (score, -block.product_ids[position])
+            if best is None or ranked > best:
+                best = ranked
+        if best is None or best[0] < min_score:
+            return None
+        return -best[1], False, round(best[0] * FUZZY_CONFIDENCE_SCALE, 4)
+
+
+def blocks_of(keys: Sequence[MatchKey]) -> List[str]:
+    return sorted({key.block for key in keys if key.block is not None})
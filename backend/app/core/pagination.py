@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, Sequence, Tuple, Type
+
+from fastapi import Response
+from sqlalchemy import and_, or_
+
+
+# Keyset pagination: a cursor holds the sort key of the last row of a page and
+# the next page starts strictly after it, so every page is an index range scan
+# no matter how deep the client is. Cursors are opaque to clients.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Type) -> Tuple:
+    """Decode a cursor made by encode_cursor into values of the given types."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        raw = json.loads(payload)
+        if not isinstance(raw, list) or len(raw) != len(types):
+            raise InvalidCursor("Invalid cursor")
+        values = []
+        for value, kind in zip(raw, types):
+            if kind is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif kind is int and isinstance(value, int) and not isinstance(value, bool):
+                values.append(value)
+            else:
+                raise InvalidCursor("Invalid cursor")
+        return tuple(values)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def keyset_after(columns: Sequence, values: Sequence, descending: bool = False):
+    """
+    Filter for rows sorting strictly after values on columns. Written out as
+    OR/AND rather than a row-value comparison so the leading column also
+    bounds the scan on its own.
+    """
+    def beyond(column, value):
+        return column < value if descending else column > value
+
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], beyond(column, value)))
+    leading = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return and_(leading, or_(*clauses))
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, key: Callable[[Any], Tuple]) -> Optional[str]:
+    """Advertise the cursor of the page after rows, when rows filled the page."""
+    if not rows or len(rows) < limit:
+        return None
+    cursor = encode_cursor(*key(rows[-1]))
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
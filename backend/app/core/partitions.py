@@ -0,0 +1,134 @@
+import re
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+
+
+# On PostgreSQL the prices table is range-partitioned by scraped_at, one partition per month.
+# Other databases keep a single table and every function here is a no-op for them.
+PRICE_PARTITION_PREFIX = "prices_y"
+# Catches rows outside every monthly partition, so an insert never fails for want of one
+PRICE_DEFAULT_PARTITION = "prices_default"
+
+
+def month_start(value: datetime) -> datetime:
+    """First instant of the month containing value, in UTC. Naive values are assumed to be UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month_index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+def price_partition_name(month: datetime) -> str:
+    return f"{PRICE_PARTITION_PREFIX}{month.year:04d}m{month.month:02d}"
+
+
+def is_price_partition(name: str) -> bool:
+    """Whether a table is one of the partitions of prices, rather than a table of its own."""
+    return name == PRICE_DEFAULT_PARTITION or re.fullmatch(rf"{PRICE_PARTITION_PREFIX}\d{{4}}m\d{{2}}", name) is not None
+
+
+def _is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('prices')")
+    ).scalar()
+    return relkind == "p"
+
+
+def _price_partitions(connection: Connection) -> List[str]:
+    return connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'prices'::regclass"
+    )).scalars().all()
+
+
+def _create_price_partition(connection: Connection, name: str, month: datetime, has_default: bool) -> None:
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    in_month = {"start": month, "end": add_months(month, 1)}
+    strays = has_default and connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {PRICE_DEFAULT_PARTITION} WHERE scraped_at >= :start AND scraped_at < :end)"
+    ), in_month).scalar()
+    if not strays:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF prices FOR VALUES {bounds}"))
+        return
+    # Postgres refuses a partition for rows the default partition already holds:
+    # move them into a standalone table first, then attach it
+    connection.execute(text(f"CREATE TABLE {name} (LIKE prices INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {PRICE_DEFAULT_PARTITION} WHERE scraped_at >= :start AND scraped_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), in_month)
+    connection.execute(text(f"ALTER TABLE prices ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+
+def create_price_partitions(connection: Connection, start: datetime, end: datetime) -> List[str]:
+    """
+    Create the monthly partitions covering [start, end) that don't exist yet.
+    Rows of those months that landed in the default partition meanwhile move
+    into their new partition.
+    """
+    created = []
+    if not _is_partitioned(connection):
+        return created
+
+    existing = set(_price_partitions(connection))
+    month = month_start(start)
+    while month < end:
+        name = price_partition_name(month)
+        if name not in existing:
+            _create_price_partition(connection, name, month, PRICE_DEFAULT_PARTITION in existing)
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_price_partitions(engine: Engine, months_ahead: int = settings.PRICE_PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Make sure partitions exist from the current month up to months_ahead months from now."""
+    current = month_start(datetime.now(timezone.utc))
+    with engine.begin() as connection:
+        return create_price_partitions(connection, current, add_months(current, months_ahead + 1))
+
+
+def drop_price_partitions(connection: Connection, cutoff: datetime) -> List[str]:
+    """
+    Drop every monthly partition that ends on or before cutoff. Removing old
+    data this way is a catalog operation instead of a DELETE over the table;
+    only the stray rows of the default partition are deleted.
+    """
+    if cutoff.tzinfo is None:
+        cutoff = cutoff.replace(tzinfo=timezone.utc)
+    dropped = []
+    if not _is_partitioned(connection):
+        return dropped
+    names = _price_partitions(connection)
+    for name in sorted(names):
+        if not name.startswith(PRICE_PARTITION_PREFIX):
+            continue
+        year, month = name[len(PRICE_PARTITION_PREFIX):].split("m")
+        partition_end = add_months(datetime(int(year), int(month), 1, tzinfo=timezone.utc), 1)
+        if partition_end <= cutoff:
+            connection.execute(text(f"ALTER TABLE prices DETACH PARTITION {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if PRICE_DEFAULT_PARTITION in names:
+        connection.execute(
+            text(f"DELETE FROM {PRICE_DEFAULT_PARTITION} WHERE scraped_at < :cutoff"), {"cutoff": cutoff}
+        )
+    return dropped
+
+
+def drop_price_partitions_before(engine: Engine, cutoff: datetime) -> List[str]:
+    with engine.begin() as connection:
+        return drop_price_partitions(connection, cutoff)
@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.crud.crud_category import get_subtree_ids
+from app.crud.crud_price import seen_since
+from app.models.price import Price
+from app.models.product import Product
+from app.schemas.price import PriceStats
+
+
+# Statistics are computed for every product at once: the window is loaded as
+# flat arrays, sorted so each product's prices are contiguous, and every
+# statistic is a reduceat or an index lookup over those segments.
+PRICE_WINDOW_DTYPE = np.dtype([("product_id", np.int64), ("supermarket_id", np.int64), ("price", np.float64)])
+PERCENTILES = (10, 25, 75, 90)
+
+
+def load_price_window(
+    session: Session,
+    since: datetime,
+    product_ids: Optional[Sequence[int]] = None,
+    category_id: Optional[int] = None,
+    include_subcategories: bool = False
+) -> np.ndarray:
+    """
+    Prices seen since the cutoff as a structured array. A compacted row stands
+    for one price level, however many scrapes repeated it.
+    """
+    statement = select(Price.product_id, Price.supermarket_id, Price.price).where(seen_since(since))
+    if product_ids is not None:
+        statement = statement.where(Price.product_id.in_(product_ids))
+    if category_id is not None:
+        category_ids = get_subtree_ids(session, category_id) if include_subcategories else [category_id]
+        statement = statement.join(Product, Product.id == Price.product_id).where(Product.category_id.in_(category_ids))
+    rows = session.execute(statement).all()
+    return np.fromiter((tuple(row) for row in rows), dtype=PRICE_WINDOW_DTYPE, count=len(rows))
+
+
+def _segment_starts(*keys: np.ndarray) -> np.ndarray:
+    """Start index of every run of equal keys in arrays that are already sorted by them."""
+    changed = np.zeros(len(keys[0]), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(changed)
+
+
+def _segment_percentiles(sorted_prices: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated percentile of every segment, like np.percentile on each one."""
+    position = starts + (counts - 1) * (q / 100.0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    fraction = position - lower
+    return sorted_prices[lower] + (sorted_prices[upper] - sorted_prices[lower]) * fraction
+
+
+def compute_price_stats(window: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-product statistics over a price window, one array entry per product in
+    ascending product_id order. Store spread is the difference between the
+    highest and lowest per-supermarket mean price.
+    """
+    if len(window) == 0:
+        return {"product_id": np.empty(0, dtype=np.int64)}
+
+    # Product, then price order makes every product a sorted segment
+    order = np.lexsort((window["price"], window["product_id"]))
+    product_ids = window["product_id"][order]
+    prices = window["price"][order]
+    starts = _segment_starts(product_ids)
+    counts = np.diff(np.append(starts, len(prices)))
+    products = product_ids[starts]
+
+    mean = np.add.reduceat(prices, starts) / counts
+    deviation = prices - np.repeat(mean, counts)
+    std = np.sqrt(np.add.reduceat(deviation * deviation, starts) / counts)
+    stats = {
+        "product_id": products,
+        "count": counts,
+        "mean": mean,
+        "std": std,
+        "min": prices[starts],
+        "max": prices[starts + counts - 1],
+        "median": _segment_percentiles(prices, starts, counts, 50),
+        "cv": np.divide(std, mean, out=np.zeros_like(std), where=mean > 0),
+    }
+    for q in PERCENTILES:
+        stats[f"p{q}"] = _segment_percentiles(prices, starts, counts, q)
+
+    # Per-store means, then their range within each product
+    store_order = np.lexsort((window["supermarket_id"], window["product_id"]))
+    store_products = window["product_id"][store_order]
+    store_starts = _segment_starts(store_products, window["supermarket_id"][store_order])
+    store_counts = np.diff(np.append(store_starts, len(store_order)))
+    store_means = np.add.reduceat(window["price"][store_order], store_starts) / store_counts
+    product_store_starts = _segment_starts(store_products[store_starts])
+    stats["stores"] = np.diff(np.append(product_store_starts, len(store_starts)))
+    stats["store_spread"] = (
+        np.maximum.reduceat(store_means, product_store_starts) - np.minimum.reduceat(store_means, product_store_starts)
+    )
+    return stats
+
+
+def get_price_stats(
+    session: Session,
+    since: datetime,
+    product_ids: Optional[Sequence[int]] = None,
+    category_id: Optional[int] = None,
+    include_subcategories: bool = False
+) -> List[PriceStats]:
+    stats = compute_price_stats(load_price_window(session, since, product_ids, category_id, include_subcategories))
+    columns = {name: values.tolist() for name, values in stats.items()}
+    return [
+        PriceStats(**{name: values[i] for name, values in columns.items()})
+        for i in range(len(columns["product_id"]))
+    ]
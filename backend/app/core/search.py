@@ -0,0 +1,139 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Subquery
+
+
+# Product search runs on a full-text index over name, variant and sku instead
+# of a LIKE scan, so a query only touches the postings of its own terms:
+#  - PostgreSQL: a generated tsvector column with a GIN index, ranked by ts_rank_cd
+#  - SQLite: an FTS5 table kept in sync by triggers, ranked by bm25
+# Every query term is matched as a prefix, so partial words and SKUs as they
+# are being typed still match. Accents are folded on both sides.
+PRODUCT_FTS_TABLE = "products_fts"
+PRODUCT_SEARCH_VECTOR = "search_vector"
+PRODUCT_SEARCH_INDEX = "ix_products_search_vector"
+
+# Field weights: name and sku hits outrank variant hits
+SQLITE_BM25_WEIGHTS = (10.0, 4.0, 10.0)
+
+_ACCENTED = "ÁÀÂÄÉÈÊËÍÌÎÏÓÒÔÖÚÙÛÜÑÇáàâäéèêëíìîïóòôöúùûüñç"
+_UNACCENTED = "AAAAEEEEIIIIOOOOUUUUNCaaaaeeeeiiiioooouuuunc"
+
+
+def _pg_fold(column: str) -> str:
+    # translate() is immutable, so unlike unaccent() it can feed a generated column
+    return f"translate(coalesce({column}, ''), '{_ACCENTED}', '{_UNACCENTED}')"
+
+
+_PG_INSTALL = [
+    f"""
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS {PRODUCT_SEARCH_VECTOR} tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish'::regconfig, {_pg_fold('name')}), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, {_pg_fold('sku')}), 'A') ||
+        setweight(to_tsvector('spanish'::regconfig, {_pg_fold('variant')}), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS {PRODUCT_SEARCH_INDEX} ON products USING GIN ({PRODUCT_SEARCH_VECTOR})",
+]
+
+_PG_DROP = [
+    f"DROP INDEX IF EXISTS {PRODUCT_SEARCH_INDEX}",
+    f"ALTER TABLE products DROP COLUMN IF EXISTS {PRODUCT_SEARCH_VECTOR}",
+]
+
+# External content table: the index stores only postings, rows are read from products
+_SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {PRODUCT_FTS_TABLE} USING fts5(
+        name, variant, sku, content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PRODUCT_FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {PRODUCT_FTS_TABLE}(rowid, name, variant, sku) VALUES (new.id, new.name, new.variant, new.sku);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PRODUCT_FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}, rowid, name, variant, sku)
+        VALUES ('delete', old.id, old.name, old.variant, old.sku);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {PRODUCT_FTS_TABLE}_au AFTER UPDATE OF name, variant, sku ON products BEGIN
+        INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}, rowid, name, variant, sku)
+        VALUES ('delete', old.id, old.name, old.variant, old.sku);
+        INSERT INTO {PRODUCT_FTS_TABLE}(rowid, name, variant, sku) VALUES (new.id, new.name, new.variant, new.sku);
+    END
+    """,
+    # Index whatever the products table already holds
+    f"INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {PRODUCT_FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {PRODUCT_FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {PRODUCT_FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {PRODUCT_FTS_TABLE}",
+]
+
+
+def install_product_search(connection: Connection) -> None:
+    """Create the search index of the products table. A no-op on other databases."""
+    statements = {"postgresql": _PG_INSTALL, "sqlite": _SQLITE_INSTALL}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_product_search(connection: Connection) -> None:
+    statements = {"postgresql": _PG_DROP, "sqlite": _SQLITE_DROP}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def search_terms(query: str) -> List[str]:
+    """Accent-folded, lower-cased words of a query. Anything else is dropped, so terms are safe to quote."""
+    decomposed = unicodedata.normalize("NFKD", query)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.findall(r"\w+", folded.lower())
+
+
+def product_search_matches(dialect: str, query: str) -> Optional[Subquery]:
+    """
+    Subquery of (product_id, rank) for the products matching every term of
+    query, best match first when ordered by rank. None when the query has no
+    searchable terms.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+
+    if dialect == "postgresql":
+        statement = text(
+            f"SELECT products.id AS product_id, -ts_rank_cd(products.{PRODUCT_SEARCH_VECTOR}, q) AS rank "
+            f"FROM products, to_tsquery('spanish', :query) AS q "
+            f"WHERE products.{PRODUCT_SEARCH_VECTOR} @@ q"
+        ).bindparams(query=" & ".join(f"{term}:*" for term in terms))
+    elif dialect == "sqlite":
+        weights = ", ".join(str(weight) for weight in SQLITE_BM25_WEIGHTS)
+        statement = text(
+            f"SELECT rowid AS product_id, bm25({PRODUCT_FTS_TABLE}, {weights}) AS rank "
+            f"FROM {PRODUCT_FTS_TABLE} WHERE {PRODUCT_FTS_TABLE} MATCH :query"
+        ).bindparams(query=" ".join(f'"{term}"*' for term in terms))
+    else:
+        # No full-text index to use: every term has to appear in one of the fields
+        conditions = " AND ".join(
+            f"(lower(name) LIKE :term{i} OR lower(variant) LIKE :term{i} OR lower(sku) LIKE :term{i})"
+            for i in range(len(terms))
+        )
+        statement = text(
+            f"SELECT id AS product_id, 0 AS rank FROM products WHERE {conditions}"
+        ).bindparams(**{f"term{i}": f"%{term}%" for i, term in enumerate(terms)})
+
+    return statement.columns(product_id=Integer, rank=Float).subquery("matches")
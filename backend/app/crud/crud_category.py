@@ -1,15 +1,42 @@
 from sqlmodel import Session, select
+from sqlalchemy import delete, insert, literal, true
 from typing import List, Optional
 
+from app.core.cache import category_cache, category_subtree_cache
 from app.models.category import Category
-from app.schemas.category import CategoryCreate, CategoryUpdate
+from app.models.category_closure import CategoryClosure
+from app.schemas.category import CategoryCreate, CategoryRead, CategoryUpdate
+
+
+def _link_subtree(session: Session, category_id: int, parent_id: int) -> None:
+    """Pair every ancestor of parent_id with every category in the subtree of category_id."""
+    ancestors = CategoryClosure.__table__.alias("ancestors")
+    subtree = CategoryClosure.__table__.alias("subtree")
+    session.execute(insert(CategoryClosure).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        select(ancestors.c.ancestor_id, subtree.c.descendant_id, ancestors.c.depth + subtree.c.depth + 1)
+        .select_from(ancestors.join(subtree, true()))
+        .where(ancestors.c.descendant_id == parent_id)
+        .where(subtree.c.ancestor_id == category_id)
+    ))
+
+
+def _invalidate_tree() -> None:
+    # A change anywhere in the tree changes the subtrees of all its ancestors
+    category_subtree_cache.invalidate()
 
 
 def create_category(session: Session, category_in: CategoryCreate) -> Category:
-    category = Category.model_validate(category_in)
+    category = Category(**category_in.model_dump())
     session.add(category)
+    session.flush()
+    session.add(CategoryClosure(ancestor_id=category.id, descendant_id=category.id, depth=0))
+    if category.parent_id is not None:
+        session.flush()
+        _link_subtree(session, category.id, category.parent_id)
     session.commit()
     session.refresh(category)
+    _invalidate_tree()
     return category
 
 
@@ -17,24 +44,100 @@ def get_category(session: Session, category_id: int) -> Optional[Category]:
     return session.get(Category, category_id)
 
 
-def get_categories(session: Session, skip: int = 0, limit: int = 100) -> List[Category]:
-    statement = select(Category).offset(skip).limit(limit)
+def get_category_cached(session: Session, category_id: int) -> Optional[CategoryRead]:
+    """Read-through cached snapshot of a category, for lookups that don't modify it."""
+    def load():
+        category = session.get(Category, category_id)
+        return CategoryRead.model_validate(category) if category else None
+    return category_cache.get_or_load(category_id, load)
+
+
+def get_categories(session: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Category]:
+    """List in ID order. after_id continues from a previous page without scanning the skipped rows."""
+    statement = select(Category).order_by(Category.id)
+    if after_id is not None:
+        statement = statement.where(Category.id > after_id)
+    statement = statement.offset(skip).limit(limit)
+    return session.exec(statement).all()
+
+
+def get_subtree_ids(session: Session, category_id: int) -> List[int]:
+    """
+    Cached IDs of a category and all its descendants, from one indexed
+    closure lookup. Filtering on category_id IN these covers the subtree.
+    """
+    def load() -> List[int]:
+        statement = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+        return sorted({category_id, *session.exec(statement).all()})
+    return category_subtree_cache.get_or_load(category_id, load)
+
+
+def is_in_subtree(session: Session, category_id: int, descendant_id: int) -> bool:
+    """
+    Whether descendant_id is category_id or one of its descendants, read
+    from the closure table rather than the cached subtree, for checks that
+    guard writes.
+    """
+    statement = (
+        select(literal(1))
+        .where(CategoryClosure.ancestor_id == category_id)
+        .where(CategoryClosure.descendant_id == descendant_id)
+    )
+    return session.exec(statement).first() is not None
+
+
+def get_subcategories(session: Session, category_id: int) -> List[Category]:
+    """Every descendant of a category, closest first."""
+    statement = (
+        select(Category)
+        .join(CategoryClosure, CategoryClosure.descendant_id == Category.id)
+        .where(CategoryClosure.ancestor_id == category_id)
+        .where(CategoryClosure.depth > 0)
+        .order_by(CategoryClosure.depth, Category.id)
+    )
     return session.exec(statement).all()
 
 
+def has_subcategories(session: Session, category_id: int) -> bool:
+    statement = select(literal(1)).where(Category.parent_id == category_id).limit(1)
+    return session.exec(statement).first() is not None
+
+
 def update_category(session: Session, db_category: Category, category_in: CategoryUpdate) -> Category:
+    """Update a category. A new parent_id moves the category together with its whole subtree."""
     category_data = category_in.model_dump(exclude_unset=True)
+    moved = "parent_id" in category_data and category_data["parent_id"] != db_category.parent_id
     for key, value in category_data.items():
         setattr(db_category, key, value)
     session.add(db_category)
+
+    if moved:
+        session.flush()
+        # Detach the subtree from its old ancestors, then attach it under the new parent
+        subtree = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == db_category.id)
+        session.execute(
+            delete(CategoryClosure)
+            .where(CategoryClosure.descendant_id.in_(subtree.scalar_subquery()))
+            .where(CategoryClosure.ancestor_id.not_in(subtree.scalar_subquery()))
+        )
+        if db_category.parent_id is not None:
+            _link_subtree(session, db_category.id, db_category.parent_id)
+
     session.commit()
     session.refresh(db_category)
+    category_cache.invalidate(db_category.id)
+    if moved:
+        _invalidate_tree()
     return db_category
 
 
 def delete_category(session: Session, category_id: int) -> Optional[Category]:
+    """Delete a category without subcategories; callers check has_subcategories first."""
     category = session.get(Category, category_id)
     if category:
+        session.execute(delete(CategoryClosure).where(CategoryClosure.descendant_id == category_id))
         session.delete(category)
         session.commit()
-    return category
\ No newline at end of file
+        category_cache.invalidate(category_id)
+        _invalidate_tree()
+    return category
@@ -0,0 +1,46 @@
+from sqlmodel import Session, select
+from typing import Dict, List, NamedTuple, Optional
+
+from app.crud.crud_price import dialect_insert
+from app.models.page_cache import PageCache
+
+
+class CachedPage(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    links: List[str]
+    product_ids: Optional[List[int]]
+
+
+def get_cached_pages(session: Session, supermarket_id: int) -> Dict[str, CachedPage]:
+    """The cache entries of a supermarket's pages by URL, loaded once per job."""
+    statement = select(
+        PageCache.url, PageCache.etag, PageCache.last_modified, PageCache.content_hash, PageCache.links,
+        PageCache.product_ids,
+    ).where(PageCache.supermarket_id == supermarket_id)
+    return {url: CachedPage(*values) for url, *values in session.execute(statement)}
+
+
+def save_pages(session: Session, pages: List[Dict]) -> None:
+    """
+    Upsert cache entries by URL. Not committed here: entries are saved with
+    the batch of prices extracted from them, so a page is only ever skipped
+    as unchanged once its prices have been stored.
+    """
+    if not pages:
+        return
+    statement = dialect_insert(session, PageCache)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PageCache.url],
+        set_={
+            "supermarket_id": statement.excluded.supermarket_id,
+            "etag": statement.excluded.etag,
+            "last_modified": statement.excluded.last_modified,
+            "content_hash": statement.excluded.content_hash,
+            "links": statement.excluded.links,
+            "product_ids": statement.excluded.product_ids,
+            "fetched_at": statement.excluded.fetched_at,
+        },
+    )
+    session.execute(statement, pages)
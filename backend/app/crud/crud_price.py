@@ -1,16 +1,525 @@
 from sqlmodel import Session, select
-from typing import List, Optional
+from sqlalchemy import and_, case, func, literal, or_, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+from datetime import date, datetime, timezone
 
+from app.core.pagination import keyset_after
+from app.core.partitions import month_start
+from app.crud import crud_watch
 from app.models.price import Price
-from app.schemas.price import PriceCreate
+from app.models.price_daily import PriceDaily
+from app.models.price_latest import PriceLatest
+from app.models.price_version import PriceVersion
+from app.models.product import Product
+from app.models.supermarket import Supermarket
+from app.schemas.price import PriceCreate, PriceConflict, PriceBulkItemResult, PriceBulkResult
 
 
-def create_price(session: Session, price_in: PriceCreate) -> Price:
-    price = Price.model_validate(price_in)
-    session.add(price)
+PriceKey = Tuple[int, int, datetime]
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Naive datetimes are assumed to already be in UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _price_key(product_id: int, supermarket_id: int, scraped_at: datetime) -> PriceKey:
+    """Key of uix_price_composite, comparable whether or not the driver returns aware datetimes."""
+    return product_id, supermarket_id, _as_utc(scraped_at).replace(tzinfo=None)
+
+
+def _price_row(price_in: PriceCreate, now: datetime) -> Dict:
+    row = price_in.model_dump()
+    row["scraped_at"] = _as_utc(row["scraped_at"]) if row["scraped_at"] else now
+    row["last_seen_at"] = None
+    return row
+
+
+def seen_since(cutoff: datetime):
+    """
+    Filter for prices observed at or after cutoff. A compacted row covers
+    every observation from scraped_at to last_seen_at, so either end may match.
+    Runs never cross a month boundary, which gives scraped_at a lower bound
+    the planner can use to prune monthly partitions.
+    """
+    return and_(
+        Price.scraped_at >= month_start(cutoff),
+        or_(Price.scraped_at >= cutoff, Price.last_seen_at >= cutoff),
+    )
+
+
+def dialect_insert(session: Session, model):
+    """INSERT for the session's dialect, which is what exposes ON CONFLICT."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+
+def _upsert_statement(session: Session, on_conflict: PriceConflict):
+    """Build an INSERT on uix_price_composite with ON CONFLICT for the session's dialect."""
+    statement = dialect_insert(session, Price)
+    conflict_columns = [Price.product_id, Price.supermarket_id, Price.scraped_at]
+    if on_conflict == PriceConflict.UPDATE:
+        statement = statement.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={
+                "price": statement.excluded.price,
+                "original_price": statement.excluded.original_price,
+                "url": statement.excluded.url,
+            },
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+    return statement
+
+
+class StoredPrice(NamedTuple):
+    price_id: Optional[int]
+    duplicate: bool = False
+    compacted: bool = False
+    # An existing observation overwritten by on_conflict=update
+    replaced: bool = False
+
+
+class _PriceRun:
+    """The newest known price for a product at a supermarket and the span it was seen for."""
+
+    def __init__(self, values: Tuple, start: datetime, end: datetime, price_id: Optional[int] = None, row: Optional[Dict] = None):
+        self.values = values
+        self.start = start
+        self.end = end
+        self.price_id = price_id
+        self.row = row
+
+
+def _get_latest_runs(session: Session, pairs: Set[Tuple[int, int]], since: datetime) -> Dict[Tuple[int, int], _PriceRun]:
+    latest = (
+        select(Price.product_id, Price.supermarket_id, func.max(Price.scraped_at).label("scraped_at"))
+        .where(tuple_(Price.product_id, Price.supermarket_id).in_(pairs))
+        .where(Price.scraped_at >= since)
+        .group_by(Price.product_id, Price.supermarket_id)
+        .subquery()
+    )
+    statement = (
+        select(Price.id, Price.product_id, Price.supermarket_id, Price.price, Price.original_price, Price.url, Price.scraped_at, Price.last_seen_at)
+        .join(latest, and_(
+            Price.product_id == latest.c.product_id,
+            Price.supermarket_id == latest.c.supermarket_id,
+            Price.scraped_at == latest.c.scraped_at,
+        ))
+    )
+    return {
+        (stored.product_id, stored.supermarket_id): _PriceRun(
+            values=(stored.price, stored.original_price, stored.url),
+            start=_as_utc(stored.scraped_at),
+            end=_as_utc(stored.last_seen_at or stored.scraped_at),
+            price_id=stored.id,
+        )
+        for stored in session.execute(statement)
+    }
+
+
+def _compact_rows(session: Session, rows: List[Dict]) -> Tuple[List[Dict], Dict[int, datetime], Dict[PriceKey, Tuple[Union[int, PriceKey], bool]]]:
+    """
+    Fold observations that repeat the newest known price into that price's run.
+    A run never extends past the end of the month it started in, so every row
+    stays inside a single monthly partition.
+
+    Returns the rows that still need inserting, the new last_seen_at of stored
+    rows that were extended, and for every folded row the stored price ID or
+    pending row key it was folded into, plus whether it extended the run.
+    """
+    # Only runs from the batch's earliest month onwards can absorb its rows
+    runs = _get_latest_runs(
+        session,
+        {(row["product_id"], row["supermarket_id"]) for row in rows},
+        since=month_start(min(row["scraped_at"] for row in rows)),
+    )
+    inserts: List[Dict] = []
+    extensions: Dict[int, datetime] = {}
+    folded: Dict[PriceKey, Tuple[Union[int, PriceKey], bool]] = {}
+
+    for row in sorted(rows, key=lambda row: row["scraped_at"]):
+        pair = (row["product_id"], row["supermarket_id"])
+        values = (row["price"], row["original_price"], row["url"])
+        run = runs.get(pair)
+        if (
+            run and run.values == values and row["scraped_at"] >= run.start
+            and month_start(row["scraped_at"]) == month_start(run.start)
+        ):
+            extended = row["scraped_at"] > run.end
+            if extended:
+                run.end = row["scraped_at"]
+                if run.row is None:
+                    extensions[run.price_id] = run.end
+                else:
+                    run.row["last_seen_at"] = run.end
+            target = run.price_id if run.row is None else _price_key(*pair, run.start)
+            folded[_price_key(*pair, row["scraped_at"])] = (target, extended)
+            continue
+
+        inserts.append(row)
+        # Late observations are stored as they are but never become the newest run
+        if run is None or row["scraped_at"] > run.end:
+            runs[pair] = _PriceRun(values=values, start=row["scraped_at"], end=row["scraped_at"], row=row)
+
+    return inserts, extensions, folded
+
+
+def _refresh_latest_prices(session: Session, rows: List[Dict], outcome: Dict[PriceKey, StoredPrice]):
+    """Point price_latest at the newest stored observation of each product at each supermarket in rows."""
+    newest: Dict[Tuple[int, int], Dict] = {}
+    for row in rows:
+        stored = outcome[_price_key(row["product_id"], row["supermarket_id"], row["scraped_at"])]
+        if stored.duplicate:
+            continue
+        pair = (row["product_id"], row["supermarket_id"])
+        if pair not in newest or row["scraped_at"] > newest[pair]["scraped_at"]:
+            newest[pair] = {
+                "product_id": row["product_id"],
+                "supermarket_id": row["supermarket_id"],
+                "price_id": stored.price_id,
+                "price": row["price"],
+                "url": row["url"],
+                "original_price": row["original_price"],
+                "scraped_at": row["scraped_at"],
+            }
+    if not newest:
+        return
+
+    statement = dialect_insert(session, PriceLatest)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PriceLatest.product_id, PriceLatest.supermarket_id],
+        set_={
+            "price_id": statement.excluded.price_id,
+            "price": statement.excluded.price,
+            "url": statement.excluded.url,
+            "original_price": statement.excluded.original_price,
+            "scraped_at": statement.excluded.scraped_at,
+        },
+        # Late or replayed observations must not replace a newer price
+        where=PriceLatest.scraped_at <= statement.excluded.scraped_at,
+    )
+    session.execute(statement, list(newest.values()))
+
+
+def _get_existing_keys(session: Session, rows: List[Dict]) -> Set[PriceKey]:
+    keys = {(row["product_id"], row["supermarket_id"], row["scraped_at"]) for row in rows}
+    statement = (
+        select(Price.product_id, Price.supermarket_id, Price.scraped_at)
+        .where(tuple_(Price.product_id, Price.supermarket_id, Price.scraped_at).in_(keys))
+        .where(Price.scraped_at >= min(row["scraped_at"] for row in rows))
+        .where(Price.scraped_at <= max(row["scraped_at"] for row in rows))
+    )
+    return {_price_key(*key) for key in session.execute(statement)}
+
+
+def _recompute_daily_rollups(session: Session, days: Set[Tuple[int, int, date]], since: datetime):
+    """
+    Rebuild open, high, low and close of days where a stored price was
+    overwritten, from the runs in prices that span the day's observations.
+    The observations and their times are the same, so count, open_at and
+    close_at stand.
+    """
+    def runs_covering(start, end):
+        return (
+            select(Price.price)
+            .where(Price.product_id == PriceDaily.product_id)
+            .where(Price.supermarket_id == PriceDaily.supermarket_id)
+            .where(Price.scraped_at >= month_start(since))
+            .where(Price.scraped_at <= end)
+            .where(func.coalesce(Price.last_seen_at, Price.scraped_at) >= start)
+        )
+
+    session.execute(
+        update(PriceDaily)
+        .where(tuple_(PriceDaily.product_id, PriceDaily.supermarket_id, PriceDaily.day).in_(days))
+        .values(
+            open=runs_covering(PriceDaily.open_at, PriceDaily.open_at)
+            .order_by(Price.scraped_at.desc()).limit(1).scalar_subquery(),
+            close=runs_covering(PriceDaily.close_at, PriceDaily.close_at)
+            .order_by(Price.scraped_at.desc()).limit(1).scalar_subquery(),
+            high=runs_covering(PriceDaily.open_at, PriceDaily.close_at)
+            .with_only_columns(func.max(Price.price)).scalar_subquery(),
+            low=runs_covering(PriceDaily.open_at, PriceDaily.close_at)
+            .with_only_columns(func.min(Price.price)).scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _refresh_daily_rollups(session: Session, rows: List[Dict], outcome: Dict[PriceKey, StoredPrice]):
+    """
+    Merge the observations in rows into price_daily. Observations folded into
+    a compacted run still count, replayed duplicates do not. Days where a
+    replay overwrote a stored price are recomputed instead, as the price it
+    replaced may have been their open, high, low or close.
+    """
+    days: Dict[Tuple[int, int, date], Dict] = {}
+    replaced: Set[Tuple[int, int, date]] = set()
+    for row in rows:
+        stored = outcome[_price_key(row["product_id"], row["supermarket_id"], row["scraped_at"])]
+        if stored.duplicate:
+            continue
+        key = (row["product_id"], row["supermarket_id"], row["scraped_at"].date())
+        if stored.replaced:
+            replaced.add(key)
+            continue
+        rollup = days.get(key)
+        if rollup is None:
+            days[key] = {
+                "product_id": row["product_id"],
+                "supermarket_id": row["supermarket_id"],
+                "day": key[2],
+                "open": row["price"],
+                "high": row["price"],
+                "low": row["price"],
+                "close": row["price"],
+                "count": 1,
+                "open_at": row["scraped_at"],
+                "close_at": row["scraped_at"],
+            }
+            continue
+        rollup["high"] = max(rollup["high"], row["price"])
+        rollup["low"] = min(rollup["low"], row["price"])
+        rollup["count"] += 1
+        if row["scraped_at"] < rollup["open_at"]:
+            rollup["open"], rollup["open_at"] = row["price"], row["scraped_at"]
+        if row["scraped_at"] > rollup["close_at"]:
+            rollup["close"], rollup["close_at"] = row["price"], row["scraped_at"]
+    if days:
+        _merge_daily_rollups(session, list(days.values()))
+    if replaced:
+        _recompute_daily_rollups(session, replaced, since=min(row["scraped_at"] for row in rows))
+
+
+def _merge_daily_rollups(session: Session, rollups: List[Dict]):
+
+    statement = dialect_insert(session, PriceDaily)
+    excluded = statement.excluded
+    # Every SET expression sees the stored row, so open and open_at are decided together
+    statement = statement.on_conflict_do_update(
+        index_elements=[PriceDaily.product_id, PriceDaily.supermarket_id, PriceDaily.day],
+        set_={
+            "open": case((excluded.open_at < PriceDaily.open_at, excluded.open), else_=PriceDaily.open),
+            "open_at": case((excluded.open_at < PriceDaily.open_at, excluded.open_at), else_=PriceDaily.open_at),
+            "high": case((excluded.high > PriceDaily.high, excluded.high), else_=PriceDaily.high),
+            "low": case((excluded.low < PriceDaily.low, excluded.low), else_=PriceDaily.low),
+            "close": case((excluded.close_at >= PriceDaily.close_at, excluded.close), else_=PriceDaily.close),
+            "close_at": case((excluded.close_at >= PriceDaily.close_at, excluded.close_at), else_=PriceDaily.close_at),
+            "count": PriceDaily.count + excluded.count,
+        },
+    )
+    session.execute(statement, rollups)
+
+
+def _bump_price_versions(session: Session, product_ids: Set[int]):
+    """Record that the price history of these products changed, in the caller's transaction."""
+    if not product_ids:
+        return
+    statement = dialect_insert(session, PriceVersion)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PriceVersion.product_id],
+        set_={"version": PriceVersion.version + 1},
+    )
+    # In ID order, so concurrent batches lock the rows in the same order
+    session.execute(statement, [{"product_id": product_id, "version": 1} for product_id in sorted(product_ids)])
+
+
+def _store_prices(session: Session, rows: List[Dict], on_conflict: PriceConflict, compact: bool) -> Dict[PriceKey, StoredPrice]:
+    """
+    Write deduplicated price rows without committing and report what happened
+    to each key. price_latest, price_daily and price_versions are updated,
+    and watch alerts queued, in the same transaction.
+    """
+    outcome: Dict[PriceKey, StoredPrice] = {}
+    folded: Dict[PriceKey, Tuple[Union[int, PriceKey], bool]] = {}
+    observations = rows
+    if compact:
+        rows, extensions, folded = _compact_rows(session, rows)
+        if extensions:
+            session.execute(
+                update(Price),
+                [{"id": price_id, "last_seen_at": last_seen_at} for price_id, last_seen_at in extensions.items()],
+            )
+
+    if rows:
+        # RETURNING can't tell an updated row from an inserted one
+        existing = _get_existing_keys(session, rows) if on_conflict == PriceConflict.UPDATE else set()
+        statement = _upsert_statement(session, on_conflict).returning(
+            Price.id, Price.product_id, Price.supermarket_id, Price.scraped_at
+        )
+        for price_id, product_id, supermarket_id, scraped_at in session.execute(statement, rows):
+            key = _price_key(product_id, supermarket_id, scraped_at)
+            outcome[key] = StoredPrice(price_id, replaced=key in existing)
+        for row in rows:
+            outcome.setdefault(_price_key(row["product_id"], row["supermarket_id"], row["scraped_at"]), StoredPrice(None, duplicate=True))
+
+    for key, (target, extended) in folded.items():
+        price_id = target if isinstance(target, int) else outcome[target].price_id
+        outcome[key] = StoredPrice(price_id, duplicate=not extended, compacted=extended)
+
+    stored = []
+    for row in observations:
+        result = outcome[_price_key(row["product_id"], row["supermarket_id"], row["scraped_at"])]
+        if not result.duplicate:
+            stored.append((row, result.price_id))
+    # Watches compare against price_latest, so they go before it moves
+    crud_watch.evaluate_watches(session, stored)
+    _refresh_latest_prices(session, observations, outcome)
+    _refresh_daily_rollups(session, observations, outcome)
+    # Inserts, overwrites and extended runs all change the history; duplicates don't
+    _bump_price_versions(session, {row["product_id"] for row, _ in stored})
+    return outcome
+
+
+def create_price(
+    session: Session,
+    price_in: PriceCreate,
+    on_conflict: PriceConflict = PriceConflict.NOTHING,
+    compact: bool = False
+) -> Price:
+    """
+    Store a single price. When it repeats an existing observation, or is
+    folded into an unchanged price with compact=True, the stored row is returned.
+    """
+    row = _price_row(price_in, datetime.now(timezone.utc))
+    key = _price_key(row["product_id"], row["supermarket_id"], row["scraped_at"])
+    price_id = _store_prices(session, [row], on_conflict, compact)[key].price_id
+    if price_id is None:
+        # The row already existed and was left untouched
+        price_id = session.scalar(
+            select(Price.id)
+            .where(Price.product_id == row["product_id"])
+            .where(Price.supermarket_id == row["supermarket_id"])
+            .where(Price.scraped_at == row["scraped_at"])
+        )
     session.commit()
-    session.refresh(price)
-    return price
+    return session.get(Price, price_id)
+
+
+def get_existing_ids(session: Session, product_ids: Set[int], supermarket_ids: Set[int]) -> Tuple[Set[int], Set[int]]:
+    """Return which of the given product and supermarket IDs exist, using a single query."""
+    statement = union_all(
+        select(literal("product").label("kind"), Product.id).where(Product.id.in_(product_ids)),
+        select(literal("supermarket").label("kind"), Supermarket.id).where(Supermarket.id.in_(supermarket_ids)),
+    )
+    existing_products, existing_supermarkets = set(), set()
+    for kind, row_id in session.execute(statement):
+        if kind == "product":
+            existing_products.add(row_id)
+        else:
+            existing_supermarkets.add(row_id)
+    return existing_products, existing_supermarkets
+
+
+def create_prices_bulk(
+    session: Session,
+    prices_in: Sequence[PriceCreate],
+    on_conflict: PriceConflict = PriceConflict.NOTHING,
+    compact: bool = False
+) -> PriceBulkResult:
+    """
+    Insert many prices in one transaction.
+
+    Foreign keys are checked for the whole batch at once and the accepted rows
+    are sent as a single executemany upsert, so the cost no longer grows with
+    one lookup and one commit per row. Rows that repeat an existing
+    (product, supermarket, scraped_at) are reported as duplicates instead of
+    failing the batch.
+
+    With compact=True, observations that repeat the newest known price of a
+    product at a supermarket only move that row's last_seen_at forward.
+    """
+    existing_products, existing_supermarkets = get_existing_ids(
+        session,
+        {price_in.product_id for price_in in prices_in},
+        {price_in.supermarket_id for price_in in prices_in},
+    )
+
+    now = datetime.now(timezone.utc)
+    results: List[PriceBulkItemResult] = []
+    rows_by_key: Dict[PriceKey, Dict] = {}
+    results_by_key: Dict[PriceKey, List[PriceBulkItemResult]] = {}
+    for index, price_in in enumerate(prices_in):
+        if price_in.product_id not in existing_products:
+            results.append(PriceBulkItemResult(index=index, accepted=False, error="Product not found"))
+            continue
+        if price_in.supermarket_id not in existing_supermarkets:
+            results.append(PriceBulkItemResult(index=index, accepted=False, error="Supermarket not found"))
+            continue
+
+        row = _price_row(price_in, now)
+        key = _price_key(row["product_id"], row["supermarket_id"], row["scraped_at"])
+        result = PriceBulkItemResult(index=index, accepted=True)
+        results.append(result)
+
+        # A key may only appear once per statement; on update the last row wins
+        if key not in rows_by_key or on_conflict == PriceConflict.UPDATE:
+            rows_by_key[key] = row
+        results_by_key.setdefault(key, []).append(result)
+
+    if rows_by_key:
+        outcome = _store_prices(session, list(rows_by_key.values()), on_conflict, compact)
+        session.commit()
+
+        for key, key_results in results_by_key.items():
+            stored = outcome[key]
+            winner = key_results[-1] if on_conflict == PriceConflict.UPDATE else key_results[0]
+            for result in key_results:
+                result.price_id = stored.price_id
+                result.duplicate = stored.duplicate or result is not winner
+                result.compacted = stored.compacted and result is winner
+
+    accepted = sum(1 for result in results if result.accepted)
+    return PriceBulkResult(
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        duplicates=sum(1 for result in results if result.duplicate),
+        compacted=sum(1 for result in results if result.compacted),
+        results=results,
+    )
+
+
+def confirm_latest_prices(session: Session, supermarket_id: int, product_ids: Set[int], seen_at: datetime) -> int:
+    """
+    Observe the latest prices of products at a supermarket again at seen_at,
+    for pages fetched unchanged since their prices were stored. They are
+    compacted into the runs they repeat, so last_seen_at, price_latest and
+    the daily rollups move as for a scrape that found the same prices. Not
+    committed here. Returns how many prices were confirmed.
+    """
+    if not product_ids:
+        return 0
+    seen_at = _as_utc(seen_at)
+    statement = (
+        select(PriceLatest.product_id, PriceLatest.price, PriceLatest.original_price, PriceLatest.url)
+        .where(PriceLatest.supermarket_id == supermarket_id)
+        .where(PriceLatest.product_id.in_(product_ids))
+        .where(PriceLatest.scraped_at < seen_at)
+    )
+    rows = [
+        {
+            "product_id": product_id,
+            "supermarket_id": supermarket_id,
+            "price": price,
+            "original_price": original_price,
+            "url": url,
+            "scraped_at": seen_at,
+            "last_seen_at": None,
+        }
+        for product_id, price, original_price, url in session.execute(statement)
+    ]
+    if not rows:
+        return 0
+    outcome = _store_prices(session, rows, PriceConflict.NOTHING, compact=True)
+    return sum(1 for stored in outcome.values() if not stored.duplicate)
 
 
 def get_prices_by_product(session: Session, product_id: int) -> List[Price]:
@@ -19,4 +528,99 @@ def get_prices_by_product(session: Session, product_id: int) -> List[Price]:
         .where(Price.product_id == product_id)
         .order_by(Price.created_at.desc())
     )
-    return session.exec(statement).all()
\ No newline at end of file
+    return session.exec(statement).all()
+
+
+def get_price_history(session: Session, product_id: int, since: datetime) -> List[Price]:
+    statement = (
+        select(Price)
+        .where(Price.product_id == product_id)
+        .where(seen_since(since))
+        .order_by(Price.scraped_at.desc())
+    )
+    return session.exec(statement).all()
+
+
+def get_price_version(session: Session, product_id: int) -> int:
+    """How many times ingestion has changed the product's price history: one primary-key lookup."""
+    return session.scalar(select(PriceVersion.version).where(PriceVersion.product_id == product_id)) or 0
+
+
+def get_price_history_version(session: Session, product_id: int, since: datetime) -> Tuple[int, Optional[datetime]]:
+    """
+    Validator for get_price_history: the product's price version, and when
+    the oldest row in the window was last seen. Between writes the window
+    only changes when that row falls out of it. Both come from single index
+    lookups, however long the history.
+    """
+    # Runs only ever extend forward, so this is the time seen_since compares against
+    seen = func.coalesce(Price.last_seen_at, Price.scraped_at)
+    statement = (
+        select(seen)
+        .where(Price.product_id == product_id)
+        .where(Price.scraped_at >= month_start(since))
+        .where(seen >= since)
+        .order_by(seen)
+        .limit(1)
+    )
+    return get_price_version(session, product_id), session.scalar(statement)
+
+
+def get_daily_price_history_version(session: Session, product_id: int, since: datetime) -> Tuple[int, date]:
+    """Validator for get_daily_price_history: the product's price version and the first day of the window."""
+    return get_price_version(session, product_id), _as_utc(since).date()
+
+
+def get_daily_price_history(session: Session, product_id: int, since: datetime) -> List[PriceDaily]:
+    """Daily rollups of a product at every supermarket from the UTC day containing since onwards."""
+    statement = (
+        select(PriceDaily)
+        .where(PriceDaily.product_id == product_id)
+        .where(PriceDaily.day >= _as_utc(since).date())
+        .order_by(PriceDaily.day.desc(), PriceDaily.supermarket_id)
+    )
+    return session.exec(statement).all()
+
+
+def get_recent_prices(
+    session: Session,
+    since: datetime,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Price]:
+    """Newest prices first. after is the (scraped_at, id) of the last price of the previous page."""
+    statement = (
+        select(Price)
+        .where(seen_since(since))
+        .order_by(Price.scraped_at.desc(), Price.id.desc())
+    )
+    if after is not None:
+        statement = statement.where(keyset_after([Price.scraped_at, Price.id], after, descending=True))
+    statement = statement.offset(skip).limit(limit)
+    return session.exec(statement).all()
+
+
+def get_latest_prices(session: Session, product_ids: Sequence[int], since: datetime) -> List[Tuple[PriceLatest, Optional[str], str]]:
+    """
+    Latest price of each product at each supermarket seen since the cutoff,
+    with the supermarket and product names, in a single query.
+    """
+    statement = (
+        select(PriceLatest, Supermarket.name, Product.name)
+        .join(Product, Product.id == PriceLatest.product_id)
+        .outerjoin(Supermarket, Supermarket.id == PriceLatest.supermarket_id)
+        .where(PriceLatest.product_id.in_(product_ids))
+        .where(PriceLatest.scraped_at >= since)
+    )
+    return session.exec(statement).all()
+
+
+def get_latest_price_rows(session: Session, product_ids: Sequence[int], since: datetime) -> List[Tuple[int, int, float]]:
+    """(product_id, supermarket_id, price) of the latest prices seen since the cutoff, without loading ORM objects."""
+    statement = (
+        select(PriceLatest.product_id, PriceLatest.supermarket_id, PriceLatest.price)
+        .where(PriceLatest.product_id.in_(product_ids))
+        .where(PriceLatest.scraped_at >= since)
+    )
+    return [tuple(row) for row in session.execute(statement)]
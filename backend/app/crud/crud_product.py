@@ -1,10 +1,19 @@
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+from app.core.cache import product_name_cache
+from app.core.matching import SKU_CONFIDENCE, ProductMatcher, blocks_of, match_key, normalize_sku
+from app.core.search import product_search_matches
+from app.crud import crud_category
 from app.models.product import Product
+from app.schemas.matching import ProductMatch, ProductMatchItem, ProductMatchMethod, ProductMatchResult
 from app.schemas.product import ProductCreate, ProductUpdate
 
 
+# Keeps IN lists well below the bound parameter limits of every database
+LOOKUP_CHUNK_SIZE = 1000
+
+
 def create_product(session: Session, product_in: ProductCreate) -> Product:
     product = Product.model_validate(product_in)
     session.add(product)
@@ -17,15 +26,49 @@ def get_product(session: Session, product_id: int) -> Optional[Product]:
     return session.get(Product, product_id)
 
 
-def get_products(session: Session, skip: int = 0, limit: int = 100) -> List[Product]:
-    statement = select(Product).offset(skip).limit(limit)
+def get_product_name(session: Session, product_id: int) -> Optional[str]:
+    """Read-through cached display name of a product, None if it doesn't exist."""
+    return product_name_cache.get_or_load(
+        product_id,
+        lambda: session.exec(select(Product.name).where(Product.id == product_id)).first()
+    )
+
+
+def get_product_names(session: Session, product_ids: Iterable[int]) -> Dict[int, str]:
+    """Cached display names of many products; the misses are loaded with one query."""
+    def load(missing: set) -> Dict[int, str]:
+        statement = select(Product.id, Product.name).where(Product.id.in_(missing))
+        return dict(session.exec(statement).all())
+    return product_name_cache.get_many_or_load(product_ids, load)
+
+
+def get_products(session: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Product]:
+    """List in ID order. after_id continues from a previous page without scanning the skipped rows."""
+    statement = select(Product).order_by(Product.id)
+    if after_id is not None:
+        statement = statement.where(Product.id > after_id)
+    statement = statement.offset(skip).limit(limit)
     return session.exec(statement).all()
 
 
-def get_products_by_category(session: Session, category_id: int, skip: int = 0, limit: int = 100) -> List[Product]:
+def _in_category(session: Session, category_id: int, include_subcategories: bool):
+    if include_subcategories:
+        return Product.category_id.in_(crud_category.get_subtree_ids(session, category_id))
+    return Product.category_id == category_id
+
+
+def get_products_by_category(
+    session: Session,
+    category_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    include_subcategories: bool = False
+) -> List[Product]:
+    """Products of a category, or of its whole subtree with include_subcategories, in ID order."""
     statement = (
         select(Product)
-        .where(Product.category_id == category_id)
+        .where(_in_category(session, category_id, include_subcategories))
+        .order_by(Product.id)
         .offset(skip)
         .limit(limit)
     )
@@ -37,20 +80,86 @@ def search_products(
     query: Optional[str] = None,
     category_id: Optional[int] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    include_subcategories: bool = False
 ) -> List[Product]:
+    """
+    Products matching every word of query in their name, variant or sku, most
+    relevant first. Without a query, products are listed in ID order.
+    """
     statement = select(Product)
-    
+
     if query:
-        statement = statement.where(Product.name.ilike(f"%{query}%"))
-    
+        matches = product_search_matches(session.get_bind().dialect.name, query)
+        if matches is None:
+            return []
+        statement = statement.join(matches, matches.c.product_id == Product.id).order_by(matches.c.rank, Product.id)
+    else:
+        statement = statement.order_by(Product.id)
+
     if category_id:
-        statement = statement.where(Product.category_id == category_id)
-    
+        statement = statement.where(_in_category(session, category_id, include_subcategories))
+
     statement = statement.offset(skip).limit(limit)
     return session.exec(statement).all()
 
 
+def _chunks(values: Sequence, size: int = LOOKUP_CHUNK_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def get_product_ids_by_sku(session: Session, skus: Iterable[str]) -> Dict[str, int]:
+    """Product ID of every SKU that exists, through the unique sku index."""
+    found = {}
+    for chunk in _chunks(sorted(set(skus))):
+        found.update(session.exec(select(Product.sku, Product.id).where(Product.sku.in_(chunk))).all())
+    return found
+
+
+def get_match_candidates(session: Session, blocks: Sequence[str]) -> List[Tuple[int, str, Optional[str], int]]:
+    """(id, name, variant, category_id) of the products in the given match blocks."""
+    rows = []
+    for chunk in _chunks(blocks):
+        statement = select(Product.id, Product.name, Product.variant, Product.category_id).where(
+            Product.match_block.in_(chunk)
+        )
+        rows.extend(tuple(row) for row in session.exec(statement))
+    return rows
+
+
+def match_products(session: Session, items: Sequence[ProductMatchItem], min_score: float = 0.6) -> ProductMatchResult:
+    """
+    Resolve scraped items to products: by SKU first, then by normalized name
+    and variant, then by the best fuzzy score of at least min_score. Matches
+    are returned in item order.
+    """
+    matches = [ProductMatch(index=index) for index in range(len(items))]
+
+    skus = [normalize_sku(item.sku) for item in items]
+    by_sku = get_product_ids_by_sku(session, [sku for sku in skus if sku is not None])
+    pending = []
+    for match, sku in zip(matches, skus):
+        if sku in by_sku:
+            match.product_id = by_sku[sku]
+            match.method = ProductMatchMethod.SKU
+            match.confidence = SKU_CONFIDENCE
+        else:
+            pending.append(match.index)
+
+    keys = {index: match_key(items[index].name, items[index].variant) for index in pending}
+    matcher = ProductMatcher(get_match_candidates(session, blocks_of(list(keys.values()))))
+    for index, key in keys.items():
+        found = matcher.match(key, category_id=items[index].category_id, min_score=min_score)
+        if found is not None:
+            match = matches[index]
+            match.product_id, exact, match.confidence = found
+            match.method = ProductMatchMethod.EXACT if exact else ProductMatchMethod.FUZZY
+
+    matched = sum(1 for match in matches if match.product_id is not None)
+    return ProductMatchResult(matches=matches, matched=matched, unmatched=len(matches) - matched)
+
+
 def update_product(session: Session, db_product: Product, product_in: ProductUpdate) -> Product:
     product_data = product_in.model_dump(exclude_unset=True)
     for key, value in product_data.items():
@@ -58,6 +167,7 @@ def update_product(session: Session, db_product: Product, product_in: ProductUpd
     session.add(db_product)
     session.commit()
     session.refresh(db_product)
+    product_name_cache.invalidate(db_product.id)
     return db_product
 
 
@@ -66,4 +176,5 @@ def delete_product(session: Session, product_id: int) -> Optional[Product]:
     if product:
         session.delete(product)
         session.commit()
+        product_name_cache.invalidate(product_id)
     return product
\ No newline at end of file
@@ -1,13 +1,20 @@
 from sqlmodel import SQLModel, Field, Session, select
-from typing import Optional, List
+from sqlalchemy import and_, update
+from typing import Optional, List, Tuple
 from datetime import datetime, timezone
+from uuid import uuid4
 
+from app.core.pagination import keyset_after
 from app.models.scraping_job import ScrapingJob, ScrapingJobStatus
 from app.schemas.scraping_job import ScrapingJobCreate, ScrapingJobUpdate
 
 
+class StaleClaim(Exception):
+    """The job was requeued, and possibly claimed by another worker, since this claim was made."""
+
+
 def create_scraping_job(session: Session, job_in: ScrapingJobCreate) -> ScrapingJob:
-    job = ScrapingJob.model_validate(job_in)
+    job = ScrapingJob(**job_in.model_dump())
     session.add(job)
     session.commit()
     session.refresh(job)
@@ -18,13 +25,17 @@ def get_job(session: Session, job_id: int) -> Optional[ScrapingJob]:
     return session.get(ScrapingJob, job_id)
 
 
-def get_jobs(session: Session, skip: int = 0, limit: int = 100) -> List[ScrapingJob]:
-    statement = (
-        select(ScrapingJob)
-        .order_by(ScrapingJob.started_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
+def get_jobs(
+    session: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[ScrapingJob]:
+    """Newest jobs first. after is the (started_at, id) of the last job of the previous page."""
+    statement = select(ScrapingJob).order_by(ScrapingJob.started_at.desc(), ScrapingJob.id.desc())
+    if after is not None:
+        statement = statement.where(keyset_after([ScrapingJob.started_at, ScrapingJob.id], after, descending=True))
+    statement = statement.offset(skip).limit(limit)
     return session.exec(statement).all()
 
 
@@ -40,11 +51,133 @@ def get_jobs_by_supermarket(session: Session, supermarket_id: int, skip: int = 0
 
 def get_running_jobs(session: Session) -> List[ScrapingJob]:
     statement = select(ScrapingJob).where(
-        ScrapingJob.status == ScrapingJobStatus.RUNNING
+        ScrapingJob.status == ScrapingJobStatus.IN_PROGRESS
     )
     return session.exec(statement).all()
 
 
+def claim_jobs(session: Session, limit: int = 1) -> List[ScrapingJob]:
+    """
+    Atomically move up to limit of the oldest PENDING jobs to IN_PROGRESS and
+    return them. Concurrent workers never claim the same job: on Postgres the
+    candidates are locked with FOR UPDATE SKIP LOCKED, so workers pass over
+    each other's rows instead of waiting on them; elsewhere each job is taken
+    with a compare-and-set on its status.
+
+    Each claim stamps the jobs with a new claim_token, which ack_job,
+    release_job and progress writes must present. Read it right after
+    claiming: a job requeued as stale and claimed again holds another
+    worker's token.
+    """
+    claim_token = uuid4().hex
+    candidates = (
+        select(ScrapingJob.id)
+        .where(ScrapingJob.status == ScrapingJobStatus.PENDING)
+        .order_by(ScrapingJob.id)
+        .limit(limit)
+    )
+
+    if session.get_bind().dialect.name == "postgresql":
+        statement = (
+            update(ScrapingJob)
+            .where(ScrapingJob.id.in_(candidates.with_for_update(skip_locked=True).scalar_subquery()))
+            .values(status=ScrapingJobStatus.IN_PROGRESS, claim_token=claim_token)
+            .returning(ScrapingJob)
+            .execution_options(populate_existing=True)
+        )
+        jobs = sorted(session.execute(statement).scalars().all(), key=lambda job: job.id)
+        session.commit()
+        return jobs
+
+    claimed = []
+    # Losing every race to other workers doesn't mean the queue is empty
+    while not claimed:
+        job_ids = session.exec(candidates).all()
+        if not job_ids:
+            break
+        for job_id in job_ids:
+            result = session.execute(
+                update(ScrapingJob)
+                .where(ScrapingJob.id == job_id)
+                .where(ScrapingJob.status == ScrapingJobStatus.PENDING)
+                .values(status=ScrapingJobStatus.IN_PROGRESS, claim_token=claim_token)
+            )
+            # Another worker got there between the SELECT and the UPDATE
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        session.commit()
+    return [session.get(ScrapingJob, job_id, populate_existing=True) for job_id in claimed]
+
+
+def start_job(session: Session, db_job: ScrapingJob) -> ScrapingJob:
+    """Claim a job directly rather than from the queue, for jobs run on demand."""
+    db_job.status = ScrapingJobStatus.IN_PROGRESS
+    db_job.claim_token = uuid4().hex
+    session.add(db_job)
+    session.commit()
+    session.refresh(db_job)
+    return db_job
+
+
+def is_claimed_by(job_id: int, claim_token: Optional[str]):
+    """Condition for writes that only the current holder of a running job may make."""
+    return and_(
+        ScrapingJob.id == job_id,
+        ScrapingJob.status == ScrapingJobStatus.IN_PROGRESS,
+        ScrapingJob.claim_token == claim_token,
+    )
+
+
+def ack_job(session: Session, db_job: ScrapingJob, claim_token: Optional[str], job_in: ScrapingJobUpdate) -> ScrapingJob:
+    """
+    Finish a claimed job: job_in must move it to COMPLETED or FAILED. Raises
+    StaleClaim, writing nothing, if the job is no longer held by claim_token.
+    """
+    if job_in.status not in (ScrapingJobStatus.COMPLETED, ScrapingJobStatus.FAILED):
+        raise ValueError("A job can only be acknowledged as completed or failed")
+    job_data = job_in.model_dump(exclude_unset=True)
+    job_data.setdefault("completed_at", datetime.now(timezone.utc))
+    result = session.execute(update(ScrapingJob).where(is_claimed_by(db_job.id, claim_token)).values(**job_data))
+    session.commit()
+    if result.rowcount != 1:
+        raise StaleClaim(f"Scraping job {db_job.id} is no longer held by this claim")
+    session.refresh(db_job)
+    return db_job
+
+
+def release_job(session: Session, db_job: ScrapingJob, claim_token: Optional[str]) -> bool:
+    """
+    Hand a claimed job back to the queue, for a worker that stops before
+    finishing it. Returns False, changing nothing, if the job is no longer
+    held by claim_token.
+    """
+    result = session.execute(
+        update(ScrapingJob)
+        .where(is_claimed_by(db_job.id, claim_token))
+        .values(status=ScrapingJobStatus.PENDING)
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+def requeue_stale_jobs(session: Session, stale_before: datetime) -> int:
+    """
+    Return IN_PROGRESS jobs that have not been updated since stale_before to
+    PENDING, so jobs of a crashed worker are claimed again. Running jobs
+    write a heartbeat every SCRAPER_PROGRESS_FLUSH_INTERVAL seconds, which
+    keeps updated_at fresh however little they find.
+    """
+    result = session.execute(
+        update(ScrapingJob)
+        .where(ScrapingJob.status == ScrapingJobStatus.IN_PROGRESS)
+        .where(ScrapingJob.updated_at < stale_before)
+        .values(status=ScrapingJobStatus.PENDING)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return result.rowcount
+
+
 def update_job(session: Session, db_job: ScrapingJob, job_in: ScrapingJobUpdate) -> ScrapingJob:
     job_data = job_in.model_dump(exclude_unset=True)
 
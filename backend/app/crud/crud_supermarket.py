@@ -1,8 +1,9 @@
 from sqlmodel import Session, select
 from typing import List, Optional
 
+from app.core.cache import supermarket_cache
 from app.models.supermarket import Supermarket
-from app.schemas.supermarket import SupermarketCreate, SupermarketUpdate
+from app.schemas.supermarket import SupermarketCreate, SupermarketRead, SupermarketUpdate
 
 
 def create_supermarket(session: Session, supermarket_in: SupermarketCreate) -> Supermarket:
@@ -17,8 +18,20 @@ def get_supermarket(session: Session, supermarket_id: int) -> Optional[Supermark
     return session.get(Supermarket, supermarket_id)
 
 
-def get_supermarkets(session: Session, skip: int = 0, limit: int = 100) -> List[Supermarket]:
-    statement = select(Supermarket).offset(skip).limit(limit)
+def get_supermarket_cached(session: Session, supermarket_id: int) -> Optional[SupermarketRead]:
+    """Read-through cached snapshot of a supermarket, for lookups that don't modify it."""
+    def load():
+        supermarket = session.get(Supermarket, supermarket_id)
+        return SupermarketRead.model_validate(supermarket) if supermarket else None
+    return supermarket_cache.get_or_load(supermarket_id, load)
+
+
+def get_supermarkets(session: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Supermarket]:
+    """List in ID order. after_id continues from a previous page without scanning the skipped rows."""
+    statement = select(Supermarket).order_by(Supermarket.id)
+    if after_id is not None:
+        statement = statement.where(Supermarket.id > after_id)
+    statement = statement.offset(skip).limit(limit)
     return session.exec(statement).all()
 
 
@@ -29,6 +42,7 @@ def update_supermarket(session: Session, db_supermarket: Supermarket, supermarke
     session.add(db_supermarket)
     session.commit()
     session.refresh(db_supermarket)
+    supermarket_cache.invalidate(db_supermarket.id)
     return db_supermarket
 
 
@@ -37,4 +51,5 @@ def delete_supermarket(session: Session, supermarket_id: int) -> Optional[Superm
     if supermarket:
         session.delete(supermarket)
         session.commit()
+        supermarket_cache.invalidate(supermarket_id)
     return supermarket
\ No newline at end of file
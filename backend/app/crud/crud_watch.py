@@ -0,0 +1,155 @@
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert, update
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timezone
+
+from app.models.price_latest import PriceLatest
+from app.models.watch import Watch, PriceAlert, PriceAlertReason
+from app.schemas.watch import WatchCreate, WatchUpdate
+
+
+def create_watch(session: Session, watch_in: WatchCreate) -> Watch:
+    watch = Watch.model_validate(watch_in)
+    session.add(watch)
+    session.commit()
+    session.refresh(watch)
+    return watch
+
+
+def get_watch(session: Session, watch_id: int) -> Optional[Watch]:
+    return session.get(Watch, watch_id)
+
+
+def get_watches(
+    session: Session,
+    subscriber: Optional[str] = None,
+    product_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None
+) -> List[Watch]:
+    statement = select(Watch).order_by(Watch.id)
+    if subscriber is not None:
+        statement = statement.where(Watch.subscriber == subscriber)
+    if product_id is not None:
+        statement = statement.where(Watch.product_id == product_id)
+    if after_id is not None:
+        statement = statement.where(Watch.id > after_id)
+    statement = statement.offset(skip).limit(limit)
+    return session.exec(statement).all()
+
+
+def update_watch(session: Session, db_watch: Watch, watch_in: WatchUpdate) -> Watch:
+    watch_data = watch_in.model_dump(exclude_unset=True)
+    for key, value in watch_data.items():
+        setattr(db_watch, key, value)
+    session.add(db_watch)
+    session.commit()
+    session.refresh(db_watch)
+    return db_watch
+
+
+def delete_watch(session: Session, watch_id: int) -> Optional[Watch]:
+    watch = session.get(Watch, watch_id)
+    if watch:
+        session.execute(delete(PriceAlert).where(PriceAlert.watch_id == watch_id))
+        session.delete(watch)
+        session.commit()
+    return watch
+
+
+def get_pending_alerts(session: Session, limit: int = 100, after_id: Optional[int] = None) -> List[PriceAlert]:
+    """Undelivered alerts in the order they were raised."""
+    statement = select(PriceAlert).where(PriceAlert.delivered_at.is_(None)).order_by(PriceAlert.id)
+    if after_id is not None:
+        statement = statement.where(PriceAlert.id > after_id)
+    return session.exec(statement.limit(limit)).all()
+
+
+def mark_alerts_delivered(session: Session, alert_ids: Sequence[int]) -> int:
+    """Mark alerts as delivered and return how many were still pending."""
+    result = session.execute(
+        update(PriceAlert)
+        .where(PriceAlert.id.in_(alert_ids))
+        .where(PriceAlert.delivered_at.is_(None))
+        .values(delivered_at=datetime.now(timezone.utc))
+    )
+    session.commit()
+    return result.rowcount
+
+
+def _match(watch: Watch, price: float, previous_price: Optional[float]) -> Optional[PriceAlertReason]:
+    # A target alert fires when the price crosses the target, not on every scrape below it
+    if watch.target_price is not None and price <= watch.target_price:
+        if previous_price is None or previous_price > watch.target_price:
+            return PriceAlertReason.TARGET_PRICE
+    if watch.drop_percent is not None and previous_price is not None:
+        if price <= previous_price * (1 - watch.drop_percent / 100):
+            return PriceAlertReason.PRICE_DROP
+    return None
+
+
+def evaluate_watches(session: Session, observations: Sequence[Tuple[Dict, Optional[int]]]) -> int:
+    """
+    Queue alerts for the active watches matched by newly stored prices,
+    without committing. observations are (price row, stored price ID) pairs
+    and must be evaluated before price_latest is refreshed, since it still
+    holds the price each observation is compared against.
+
+    Only watches on the observed products are loaded, through the
+    (product_id, is_active) index, so the cost follows the number of new
+    prices rather than the number of watches.
+    """
+    product_ids = {row["product_id"] for row, _ in observations}
+    watches_by_product: Dict[int, List[Watch]] = {}
+    for watch in session.exec(
+        select(Watch).where(Watch.product_id.in_(product_ids)).where(Watch.is_active == True)
+    ):
+        watches_by_product.setdefault(watch.product_id, []).append(watch)
+    if not watches_by_product:
+        return 0
+
+    by_pair: Dict[Tuple[int, int], List[Tuple[Dict, Optional[int]]]] = {}
+    for row, price_id in observations:
+        if row["product_id"] in watches_by_product:
+            by_pair.setdefault((row["product_id"], row["supermarket_id"]), []).append((row, price_id))
+
+    previous: Dict[Tuple[int, int], Tuple[float, datetime]] = {}
+    latest_rows = session.execute(
+        select(PriceLatest.product_id, PriceLatest.supermarket_id, PriceLatest.price, PriceLatest.scraped_at)
+        .where(PriceLatest.product_id.in_({product_id for product_id, _ in by_pair}))
+    )
+    for product_id, supermarket_id, price, scraped_at in latest_rows:
+        if (product_id, supermarket_id) in by_pair:
+            if scraped_at.tzinfo is None:
+                scraped_at = scraped_at.replace(tzinfo=timezone.utc)
+            previous[(product_id, supermarket_id)] = (price, scraped_at)
+
+    alerts = []
+    for (product_id, supermarket_id), pair_observations in by_pair.items():
+        last = previous.get((product_id, supermarket_id))
+        for row, price_id in sorted(pair_observations, key=lambda observation: observation[0]["scraped_at"]):
+            # Late observations never became the latest price, so they don't alert
+            if last is not None and row["scraped_at"] <= last[1]:
+                continue
+            previous_price = last[0] if last is not None else None
+            for watch in watches_by_product[product_id]:
+                if watch.supermarket_id is not None and watch.supermarket_id != supermarket_id:
+                    continue
+                reason = _match(watch, row["price"], previous_price)
+                if reason is not None:
+                    alerts.append({
+                        "watch_id": watch.id,
+                        "product_id": product_id,
+                        "supermarket_id": supermarket_id,
+                        "price_id": price_id,
+                        "reason": reason,
+                        "price": row["price"],
+                        "previous_price": previous_price,
+                        "scraped_at": row["scraped_at"],
+                    })
+            last = (row["price"], row["scraped_at"])
+
+    if alerts:
+        session.execute(insert(PriceAlert), alerts)
+    return len(alerts)
@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, create_engine, Session
 from app.config import settings
+from app.core.partitions import ensure_price_partitions
 
 # Create the database engine
 # echo=True will log generated SQL, useful for debugging
@@ -13,3 +14,4 @@ def get_session():
 def create_db_and_tables():
     """Create the database tables based on the models."""
     SQLModel.metadata.create_all(engine)
+    ensure_price_partitions(engine)
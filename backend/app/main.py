@@ -1,12 +1,40 @@
+import asyncio
+import logging
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
-from app.database import create_db_and_tables
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager, suppress
+from app.core.cache import get_cache_stats
+from app.core.partitions import ensure_price_partitions
+from app.database import create_db_and_tables, engine
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MAINTENANCE_INTERVAL = 24 * 60 * 60
+
+
+async def maintain_price_partitions(interval: float = PARTITION_MAINTENANCE_INTERVAL):
+    """
+    Keep creating the upcoming monthly price partitions while the server runs.
+    A failed run, on a lock timeout or a dropped connection say, is logged and
+    retried at the next interval rather than ending the task.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(ensure_price_partitions, engine)
+        except Exception:
+            logger.exception("Price partition maintenance failed")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Load the database tables on startup
     create_db_and_tables()
+    maintenance = asyncio.create_task(maintain_price_partitions())
     yield
+    maintenance.cancel()
+    with suppress(asyncio.CancelledError):
+        await maintenance
 
 app = FastAPI(
     title="Supermarket Price Scraper",
@@ -16,3 +44,9 @@ app = FastAPI(
 @app.get("/")
 def read_root():
     return {"message": "Server working correctly!"}
+
+
+@app.get("/cache/stats")
+def read_cache_stats():
+    """Hit/miss counters of the in-process dimension caches"""
+    return get_cache_stats()
@@ -1,14 +1,30 @@
 from .supermarket import Supermarket
 from .category import Category
+from .category_closure import CategoryClosure
 from .product import Product
 from .price import Price
+from .price_latest import PriceLatest
+from .price_daily import PriceDaily
+from .price_version import PriceVersion
 from .scraping_job import ScrapingJob, ScrapingJobStatus
+from .watch import Watch, PriceAlert, PriceAlertReason
+from .page_cache import PageCache
+from .scrape_schedule import ScrapeSchedule
 
 __all__ = [
     "Supermarket",
     "Category",
+    "CategoryClosure",
     "Product",
     "Price",
+    "PriceLatest",
+    "PriceDaily",
+    "PriceVersion",
     "ScrapingJob",
     "ScrapingJobStatus",
+    "Watch",
+    "PriceAlert",
+    "PriceAlertReason",
+    "PageCache",
+    "ScrapeSchedule",
 ]
\ No newline at end of file
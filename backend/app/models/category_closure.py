@@ -0,0 +1,17 @@
+from sqlmodel import SQLModel, Field
+
+
+class CategoryClosure(SQLModel, table=True):
+    """
+    One row per ancestor/descendant pair of the category tree, including every
+    category paired with itself at depth 0. Maintained by crud_category, so a
+    whole subtree is a single lookup on ancestor_id.
+    """
+    __tablename__ = "category_closure"
+
+    ancestor_id: int = Field(primary_key=True, foreign_key="categories.id")
+    descendant_id: int = Field(primary_key=True, foreign_key="categories.id", index=True)
+    depth: int = Field(default=0)
+
+    def __repr__(self) -> str:
+        return f"CategoryClosure(ancestor_id={self.ancestor_id}, descendant_id={self.descendant_id}, depth={self.depth})"
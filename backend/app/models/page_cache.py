@@ -0,0 +1,29 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import Column, DateTime, JSON
+
+
+class PageCache(SQLModel, table=True):
+    """
+    What the last fetch of a scraped page returned: the validators that make
+    the next fetch conditional, the hash of its body in the page store, and
+    the links found on it, so an unchanged page is followed without parsing.
+    product_ids are the products its items matched when it was last parsed,
+    whose prices a fetch that finds it unchanged confirms; None for pages
+    cached before they were recorded, which are parsed again.
+    """
+    __tablename__ = "page_cache"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    supermarket_id: int = Field(index=True, foreign_key="supermarkets.id")
+    url: str = Field(index=True, unique=True)
+    etag: Optional[str] = Field(default=None)
+    last_modified: Optional[str] = Field(default=None)
+    content_hash: str = Field(max_length=64)
+    links: List[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    product_ids: Optional[List[int]] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    fetched_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+    def __repr__(self) -> str:
+        return f"PageCache(id={self.id}, url={self.url}, content_hash={self.content_hash})"
@@ -1,17 +1,20 @@
 from sqlmodel import SQLModel, Field
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import UniqueConstraint, Index, func, Column, DateTime
+from sqlalchemy import UniqueConstraint, Index, func, Column, DateTime, text
 
 
 class Price(SQLModel, table=True):
     """
     Represents a price of a product.
+    On PostgreSQL the table is range-partitioned by month of scraped_at (see app.core.partitions).
     """
     __tablename__ = "prices"
     __table_args__ = (
         UniqueConstraint("product_id", "supermarket_id", "scraped_at", name="uix_price_composite"),
         Index("idx_price_composite", "product_id", "supermarket_id", "scraped_at"),
+        # When each row was last seen, for finding where a product's history window starts
+        Index("idx_price_product_seen", "product_id", text("coalesce(last_seen_at, scraped_at)")),
     )
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -28,9 +31,14 @@ class Price(SQLModel, table=True):
             nullable=False
         )
     ) 
+    # When unchanged observations are compacted, the last time this price was seen
+    last_seen_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True)
+    )
     
     def __repr__(self) -> str:
-        return f"Price(id={self.id}, product_id={self.product_id}, supermarket_id={self.supermarket_id}, price={self.price}, original_price={self.original_price}, url={self.url}, scraped_at={self.scraped_at})"
+        return f"Price(id={self.id}, product_id={self.product_id}, supermarket_id={self.supermarket_id}, price={self.price}, original_price={self.original_price}, url={self.url}, scraped_at={self.scraped_at}, last_seen_at={self.last_seen_at})"
 
     class Config:
         json_schema_extra = {
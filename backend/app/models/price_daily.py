@@ -0,0 +1,25 @@
+from sqlmodel import SQLModel, Field
+from datetime import date, datetime
+from sqlalchemy import Column, DateTime
+
+
+class PriceDaily(SQLModel, table=True):
+    """
+    Represents the daily open/high/low/close rollup of a product's price at a supermarket.
+    Maintained incrementally by price ingestion; days are UTC calendar days.
+    """
+    __tablename__ = "price_daily"
+
+    product_id: int = Field(primary_key=True, foreign_key="products.id")
+    supermarket_id: int = Field(primary_key=True, foreign_key="supermarkets.id")
+    day: date = Field(primary_key=True)
+    open: float
+    high: float
+    low: float
+    close: float
+    count: int = Field(default=0)
+    open_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    close_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+    def __repr__(self) -> str:
+        return f"PriceDaily(product_id={self.product_id}, supermarket_id={self.supermarket_id}, day={self.day}, open={self.open}, high={self.high}, low={self.low}, close={self.close}, count={self.count})"
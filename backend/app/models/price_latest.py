@@ -0,0 +1,25 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, DateTime
+
+
+class PriceLatest(SQLModel, table=True):
+    """
+    Represents the latest known price of a product at a supermarket.
+    Kept up to date by price ingestion so comparisons never scan the price history.
+    """
+    __tablename__ = "price_latest"
+
+    product_id: int = Field(primary_key=True, foreign_key="products.id")
+    supermarket_id: int = Field(primary_key=True, foreign_key="supermarkets.id")
+    price_id: int
+    price: float
+    url: Optional[str] = Field(default=None, max_length=500)
+    original_price: Optional[float] = Field(default=None)
+    scraped_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+
+    def __repr__(self) -> str:
+        return f"PriceLatest(product_id={self.product_id}, supermarket_id={self.supermarket_id}, price={self.price}, scraped_at={self.scraped_at})"
@@ -0,0 +1,16 @@
+from sqlmodel import SQLModel, Field
+
+
+class PriceVersion(SQLModel, table=True):
+    """
+    Represents how many times a product's price history has changed.
+    Bumped by price ingestion in the same transaction as the prices, so
+    history requests can be validated without reading the history.
+    """
+    __tablename__ = "price_versions"
+
+    product_id: int = Field(primary_key=True, foreign_key="products.id")
+    version: int = Field(default=0)
+
+    def __repr__(self) -> str:
+        return f"PriceVersion(product_id={self.product_id}, version={self.version})"
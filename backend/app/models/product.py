@@ -1,7 +1,10 @@
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import func, Column, DateTime
+from sqlalchemy import event, func, Column, DateTime
+
+from app.core.matching import blocking_key
+from app.core.search import drop_product_search, install_product_search
 
 
 class Product(SQLModel, table=True):
@@ -17,6 +20,8 @@ class Product(SQLModel, table=True):
     description: Optional[str] = Field(default=None)
     image_url: Optional[str] = Field(default=None, max_length=500)
     category_id: int = Field(index=True, foreign_key="categories.id")
+    # Blocking key of the name for batch matching, kept up to date on every insert and update
+    match_block: Optional[str] = Field(default=None, index=True, max_length=100)
     created_at: datetime = Field(
         sa_column=Column(
             DateTime(timezone=True), 
@@ -45,4 +50,17 @@ class Product(SQLModel, table=True):
                 "description": "Milk description and additional details",
                 "image_url": "https://w7.pngwing.com/pngs/600/735/png-transparent-coffee-milk-milk-bottle-milk-thumbnail.png",
             }
-        }
\ No newline at end of file
+        }
+
+
+# The full-text index lives outside the table definition, create and drop it along with the table
+event.listen(Product.__table__, "after_create", lambda target, connection, **kw: install_product_search(connection))
+event.listen(Product.__table__, "before_drop", lambda target, connection, **kw: drop_product_search(connection))
+
+
+def _set_match_block(mapper, connection, target: Product) -> None:
+    target.match_block = blocking_key(target.name)
+
+
+event.listen(Product, "before_insert", _set_match_block)
+event.listen(Product, "before_update", _set_match_block)
@@ -0,0 +1,32 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, DateTime, Index
+
+
+class ScrapeSchedule(SQLModel, table=True):
+    """
+    When a product's page at a supermarket is next due for scraping. The
+    interval follows how often the price has changed (see
+    app.scraper.scheduler): volatile prices are checked often, stable ones
+    rarely.
+    """
+    __tablename__ = "scrape_schedule"
+    __table_args__ = (
+        Index("idx_scrape_schedule_due", "next_due_at"),
+        Index("idx_scrape_schedule_url", "supermarket_id", "url"),
+    )
+
+    product_id: int = Field(primary_key=True, foreign_key="products.id")
+    supermarket_id: int = Field(primary_key=True, foreign_key="supermarkets.id")
+    url: str = Field(max_length=500)
+    # Estimated price changes per day
+    change_rate: float = Field(default=0.0)
+    interval_seconds: float = Field(default=0.0)
+    checked_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    next_due_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    # Set while the page is in a dispatched job, so it isn't dispatched twice
+    leased_until: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True))
+
+    def __repr__(self) -> str:
+        return f"ScrapeSchedule(product_id={self.product_id}, supermarket_id={self.supermarket_id}, change_rate={self.change_rate}, next_due_at={self.next_due_at})"
@@ -1,8 +1,8 @@
 from sqlmodel import SQLModel, Field
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Dict, List, Optional
 from enum import Enum
-from sqlalchemy import func, Column, DateTime
+from sqlalchemy import func, Column, DateTime, JSON
 
 
 class ScrapingJobStatus(str, Enum):
@@ -36,6 +36,12 @@ class ScrapingJob(SQLModel, table=True):
     products_scraped: Optional[int] = Field(default=0)
     errors_count: Optional[int] = Field(default=0)
     error_message: Optional[str] = Field(default=None)
+    # Set by each claim; only its holder may record progress on or finish the job
+    claim_token: Optional[str] = Field(default=None, max_length=32)
+    # Pages to scrape, most urgent first, for jobs made by the scheduler; None crawls the whole site
+    urls: Optional[List[str]] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    # How the run went: pages, requests, latency, throttling and the limits it settled on
+    metrics: Optional[Dict[str, float]] = Field(default=None, sa_column=Column(JSON, nullable=True))
     
     def __repr__(self) -> str:
         return f"ScrapingJob(id={self.id}, supermarket_id={self.supermarket_id}, products_scraped={self.products_scraped}, errors_count={self.errors_count}, error_message={self.error_message})"
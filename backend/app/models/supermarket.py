@@ -14,6 +14,9 @@ class Supermarket(SQLModel, table=True):
     name: str = Field(index=True, unique=True, max_length=255)
     website_url: str = Field(max_length=500)
     logo_url: Optional[str] = Field(default=None, max_length=500)
+    # Ceilings for scraping the site; the scraper adapts below them
+    max_concurrency: Optional[int] = Field(default=None)
+    max_requests_per_second: Optional[float] = Field(default=None)
     created_at: Optional[datetime] = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column(
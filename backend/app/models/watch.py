@@ -0,0 +1,73 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime, timezone
+from typing import Optional
+from enum import Enum
+from sqlalchemy import func, Column, DateTime, Index
+
+
+class PriceAlertReason(str, Enum):
+    TARGET_PRICE = "target_price"
+    PRICE_DROP = "price_drop"
+
+
+class Watch(SQLModel, table=True):
+    """
+    Represents a subscriber watching a product for a target price or a
+    percentage drop, at one supermarket or at any of them.
+    """
+    __tablename__ = "watches"
+    __table_args__ = (
+        Index("idx_watch_product_active", "product_id", "is_active"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    subscriber: str = Field(max_length=255, index=True)
+    product_id: int = Field(foreign_key="products.id")
+    supermarket_id: Optional[int] = Field(default=None, foreign_key="supermarkets.id")
+    target_price: Optional[float] = Field(default=None)
+    drop_percent: Optional[float] = Field(default=None)
+    is_active: bool = Field(default=True)
+    created_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(
+            DateTime(timezone=True),
+            server_default=func.now(),
+            nullable=False
+        )
+    )
+
+    def __repr__(self) -> str:
+        return f"Watch(id={self.id}, subscriber='{self.subscriber}', product_id={self.product_id}, supermarket_id={self.supermarket_id}, target_price={self.target_price}, drop_percent={self.drop_percent})"
+
+
+class PriceAlert(SQLModel, table=True):
+    """
+    Outbox of watch matches. Rows are written in the same transaction as the
+    prices that triggered them and marked delivered by whoever sends them on.
+    """
+    __tablename__ = "price_alerts"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    watch_id: int = Field(foreign_key="watches.id", index=True)
+    product_id: int = Field(foreign_key="products.id")
+    supermarket_id: int = Field(foreign_key="supermarkets.id")
+    price_id: Optional[int] = Field(default=None)
+    reason: PriceAlertReason
+    price: float
+    previous_price: Optional[float] = Field(default=None)
+    scraped_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    created_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(
+            DateTime(timezone=True),
+            server_default=func.now(),
+            nullable=False
+        )
+    )
+    delivered_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True)
+    )
+
+    def __repr__(self) -> str:
+        return f"PriceAlert(id={self.id}, watch_id={self.watch_id}, reason={self.reason}, price={self.price}, previous_price={self.previous_price})"
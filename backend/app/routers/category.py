@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 
+from app.core.pagination import InvalidCursor, decode_cursor, set_next_cursor
 from app.database import get_session
 from app.schemas.category import CategoryCreate, CategoryRead, CategoryUpdate
-from app.crud import crud_category
+from app.schemas.product import ProductRead
+from app.crud import crud_category, crud_product
 
 
 router = APIRouter(
@@ -15,33 +17,82 @@ router = APIRouter(
 
 @router.post("/", response_model=CategoryRead, status_code=status.HTTP_201_CREATED)
 def create_category(*, session: Session = Depends(get_session), category_in: CategoryCreate):
-    """Create a new category"""
+    """Create a new category, optionally under a parent category"""
+    if category_in.parent_id is not None and not crud_category.get_category_cached(session=session, category_id=category_in.parent_id):
+        raise HTTPException(status_code=404, detail="Parent category not found")
     category = crud_category.create_category(session=session, category_in=category_in)
     return category
 
 
 @router.get("/", response_model=List[CategoryRead])
-def read_categories(session: Session = Depends(get_session), skip: int = 0, limit: int = 100):
-    """Get all categories"""
-    categories = crud_category.get_categories(session=session, skip=skip, limit=limit)
+def read_categories(
+    response: Response,
+    session: Session = Depends(get_session),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Get all categories. Pass the X-Next-Cursor header of a page as cursor to get the next one"""
+    after_id = None
+    if cursor is not None:
+        try:
+            (after_id,) = decode_cursor(cursor, int)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    categories = crud_category.get_categories(session=session, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, categories, limit, key=lambda row: (row.id,))
     return categories
 
 
 @router.get("/{category_id}", response_model=CategoryRead)
 def read_category(*, session: Session = Depends(get_session), category_id: int):
     """Get a specific category by ID"""
-    category = crud_category.get_category(session=session, category_id=category_id)
+    category = crud_category.get_category_cached(session=session, category_id=category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
 
 
+@router.get("/{category_id}/subcategories", response_model=List[CategoryRead])
+def read_subcategories(*, session: Session = Depends(get_session), category_id: int):
+    """Get every descendant of a category, closest first"""
+    if not crud_category.get_category_cached(session=session, category_id=category_id):
+        raise HTTPException(status_code=404, detail="Category not found")
+    return crud_category.get_subcategories(session=session, category_id=category_id)
+
+
+@router.get("/{category_id}/products", response_model=List[ProductRead])
+def read_category_products(
+    *,
+    session: Session = Depends(get_session),
+    category_id: int,
+    include_subcategories: bool = False,
+    skip: int = 0,
+    limit: int = 100
+):
+    """Get the products of a category or, with include_subcategories, of its whole subtree"""
+    if not crud_category.get_category_cached(session=session, category_id=category_id):
+        raise HTTPException(status_code=404, detail="Category not found")
+    return crud_product.get_products_by_category(
+        session=session,
+        category_id=category_id,
+        skip=skip,
+        limit=limit,
+        include_subcategories=include_subcategories
+    )
+
+
 @router.put("/{category_id}", response_model=CategoryRead)
 def update_category(*, session: Session = Depends(get_session), category_id: int, category_in: CategoryUpdate):
-    """Update a category"""
+    """Update a category. Changing parent_id moves it along with its subcategories"""
     category = crud_category.get_category(session=session, category_id=category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
+    if category_in.parent_id is not None:
+        if not crud_category.get_category(session=session, category_id=category_in.parent_id):
+            raise HTTPException(status_code=404, detail="Parent category not found")
+        if crud_category.is_in_subtree(session=session, category_id=category_id, descendant_id=category_in.parent_id):
+            raise HTTPException(status_code=400, detail="A category cannot be moved under itself or its subcategories")
     category = crud_category.update_category(
         session=session,
         db_category=category,
@@ -52,7 +103,9 @@ def update_category(*, session: Session = Depends(get_session), category_id: int
 
 @router.delete("/{category_id}", response_model=CategoryRead)
 def delete_category(*, session: Session = Depends(get_session), category_id: int):
-    """Delete a category"""
+    """Delete a category that has no subcategories"""
+    if crud_category.has_subcategories(session=session, category_id=category_id):
+        raise HTTPException(status_code=400, detail="Category has subcategories")
     category = crud_category.delete_category(session=session, category_id=category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
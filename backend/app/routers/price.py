@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlmodel import Session
+from typing import AsyncIterator, List, Optional, Tuple, Union
 from datetime import datetime, timedelta, timezone
 
-from app.database import get_session
-from app.schemas.price import PriceCreate, PriceRead, PriceComparison, PriceComparisonItem, CompareBulkRequest
-from app.crud import crud_price
-from app.models.price import Price
-from app.models.product import Product
-from app.models.supermarket import Supermarket
+from app.config import settings
+from app.core.basket import optimize_basket
+from app.core.export import MEDIA_TYPES, export_prices
+from app.core.http_cache import conditional_response, make_etag
+from app.core.pagination import InvalidCursor, decode_cursor, set_next_cursor
+from app.core.price_stats import get_price_stats
+from app.database import engine, get_session
+from app.schemas.basket import BasketRequest, BasketResult
+from app.schemas.price import (
+    PriceCreate, PriceRead, PriceComparison, PriceComparisonItem, CompareBulkRequest, PriceBulkResult,
+    PriceStreamError, PriceStreamResult, PriceConflict, PriceDailyRead, PriceHistoryResolution,
+    PriceExportFormat, PriceStats,
+)
+from app.crud import crud_price, crud_product, crud_supermarket
+from app.models.price_latest import PriceLatest
 
 
 router = APIRouter(
@@ -16,74 +28,156 @@ router = APIRouter(
     tags=["prices"],
 )
 
+MAX_BULK_PRICES = 10000
+MAX_COMPARE_PRODUCTS = 1000
+MAX_NDJSON_LINE_BYTES = 64 * 1024
+MAX_STREAM_ERRORS = 1000
+
+
+async def _iter_ndjson_lines(request: Request) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Yield (line_number, line) pairs from the request body as chunks arrive.
+
+    Lines longer than MAX_NDJSON_LINE_BYTES are yielded as None and skipped,
+    so a malformed upload cannot grow the buffer without bound. Each chunk is
+    split once; only the unfinished line at its end is carried over.
+    """
+    tail = b""
+    line_number = 0
+    oversized = False
+    async for chunk in request.stream():
+        lines = chunk.split(b"\n")
+        lines[0] = tail + lines[0]
+        tail = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield line_number, None if oversized or len(line) > MAX_NDJSON_LINE_BYTES else line
+            oversized = False
+        if len(tail) > MAX_NDJSON_LINE_BYTES:
+            tail = b""
+            oversized = True
+    if tail or oversized:
+        yield line_number + 1, None if oversized or len(tail) > MAX_NDJSON_LINE_BYTES else tail
+
 
 @router.post("/", response_model=PriceRead, status_code=status.HTTP_201_CREATED)
 def create_price(
     *,
     session: Session = Depends(get_session),
-    price_in: PriceCreate
+    price_in: PriceCreate,
+    on_conflict: PriceConflict = PriceConflict.NOTHING,
+    compact: bool = False
 ):
     """Create a new price record"""
     # Validate product exists
-    product = session.get(Product, price_in.product_id)
-    if not product:
+    if crud_product.get_product_name(session=session, product_id=price_in.product_id) is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Validate supermarket exists
-    supermarket = session.get(Supermarket, price_in.supermarket_id)
+    supermarket = crud_supermarket.get_supermarket_cached(session=session, supermarket_id=price_in.supermarket_id)
     if not supermarket:
         raise HTTPException(status_code=404, detail="Supermarket not found")
     
-    price = crud_price.create_price(session=session, price_in=price_in)
+    price = crud_price.create_price(session=session, price_in=price_in, on_conflict=on_conflict, compact=compact)
     return price
 
 
-@router.get("/compare/{product_id}", response_model=PriceComparison)
-def compare_product_prices(
+@router.post("/bulk", response_model=PriceBulkResult, status_code=status.HTTP_201_CREATED)
+def create_prices_bulk(
     *,
     session: Session = Depends(get_session),
-    product_id: int
+    prices_in: List[PriceCreate],
+    on_conflict: PriceConflict = PriceConflict.NOTHING,
+    compact: bool = False
 ):
-    """⭐ Compare latest prices for a product across all supermarkets"""
-    product = session.get(Product, product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    # Get latest prices (last 24 hours)
-    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
-    statement = (
-        select(Price)
-        .where(Price.product_id == product_id)
-        .where(Price.scraped_at >= yesterday)
-        .order_by(Price.scraped_at.desc())
+    """Create many price records in a single transaction"""
+    if not prices_in:
+        raise HTTPException(status_code=400, detail="Prices list cannot be empty")
+
+    if len(prices_in) > MAX_BULK_PRICES:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_BULK_PRICES} prices per request")
+
+    return crud_price.create_prices_bulk(session=session, prices_in=prices_in, on_conflict=on_conflict, compact=compact)
+
+
+@router.post("/stream", response_model=PriceStreamResult, status_code=status.HTTP_201_CREATED)
+async def stream_prices(
+    *,
+    request: Request,
+    session: Session = Depends(get_session),
+    batch_size: int = Query(default=settings.PRICE_INGEST_BATCH_SIZE, gt=0, le=MAX_BULK_PRICES),
+    on_conflict: PriceConflict = PriceConflict.NOTHING,
+    compact: bool = False
+):
+    """Ingest newline-delimited PriceCreate records, committing them in batches as they arrive"""
+    lines = accepted = rejected = duplicates = compacted = 0
+    errors: List[PriceStreamError] = []
+
+    def reject(line_number: int, error: str):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < MAX_STREAM_ERRORS:
+            errors.append(PriceStreamError(line=line_number, error=error))
+
+    batch: List[PriceCreate] = []
+    batch_lines: List[int] = []
+
+    async def flush():
+        nonlocal accepted, duplicates, compacted
+        # The next chunk is only read once the batch is stored, so a slow
+        # database pushes back on the client instead of filling memory.
+        result = await run_in_threadpool(
+            crud_price.create_prices_bulk, session=session, prices_in=batch, on_conflict=on_conflict, compact=compact
+        )
+        accepted += result.accepted
+        duplicates += result.duplicates
+        compacted += result.compacted
+        for item in result.results:
+            if not item.accepted:
+                reject(batch_lines[item.index], item.error)
+        batch.clear()
+        batch_lines.clear()
+
+    async for line_number, line in _iter_ndjson_lines(request):
+        lines = line_number
+        if line is None:
+            reject(line_number, f"Line exceeds {MAX_NDJSON_LINE_BYTES} bytes")
+            continue
+        if not line.strip():
+            continue
+        try:
+            batch.append(PriceCreate.model_validate_json(line))
+        except ValidationError as e:
+            reject(line_number, "; ".join(error["msg"] for error in e.errors()))
+            continue
+        batch_lines.append(line_number)
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+
+    return PriceStreamResult(
+        lines=lines, accepted=accepted, rejected=rejected, duplicates=duplicates, compacted=compacted, errors=errors
     )
-    all_prices = session.exec(statement).all()
-    
-    if not all_prices:
-        raise HTTPException(status_code=404, detail="No recent prices found for this product")
-    
-    # Get most recent per supermarket
-    supermarket_prices = {}
-    for price in all_prices:
-        if price.supermarket_id not in supermarket_prices:
-            supermarket_prices[price.supermarket_id] = price
-    
+
+
+def _build_comparison(product_id: int, product_name: str, latest_prices: List[Tuple[PriceLatest, Optional[str]]]) -> PriceComparison:
     # Find cheapest
-    price_values = [p.price for p in supermarket_prices.values()]
+    price_values = [latest.price for latest, _ in latest_prices]
     cheapest_price = min(price_values)
     most_expensive = max(price_values)
     
     # Build comparison items
     comparison_items = []
-    for price in supermarket_prices.values():
-        supermarket = session.get(Supermarket, price.supermarket_id)
+    for latest, supermarket_name in latest_prices:
         comparison_items.append(PriceComparisonItem(
-            supermarket_id=price.supermarket_id,
-            supermarket_name=supermarket.name if supermarket else "Unknown",
-            price=price.price,
-            url=price.url,
-            is_cheapest=price.price == cheapest_price,
-            scraped_at=price.scraped_at
+            supermarket_id=latest.supermarket_id,
+            supermarket_name=supermarket_name or "Unknown",
+            price=latest.price,
+            url=latest.url,
+            is_cheapest=latest.price == cheapest_price,
+            scraped_at=latest.scraped_at
         ))
     
     # Sort by price
@@ -91,7 +185,7 @@ def compare_product_prices(
     
     return PriceComparison(
         product_id=product_id,
-        product_name=product.name,
+        product_name=product_name,
         prices=comparison_items,
         cheapest_price=cheapest_price,
         most_expensive_price=most_expensive,
@@ -100,6 +194,42 @@ def compare_product_prices(
     )
 
 
+@router.get("/compare/{product_id}", response_model=PriceComparison)
+def compare_product_prices(
+    *,
+    request: Request,
+    response: Response,
+    session: Session = Depends(get_session),
+    product_id: int
+):
+    """⭐ Compare latest prices for a product across all supermarkets. Supports conditional requests."""
+    product_name = crud_product.get_product_name(session=session, product_id=product_id)
+    if product_name is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    # Get latest prices still fresh
+    since = datetime.now(timezone.utc) - timedelta(hours=settings.PRICE_FRESHNESS_HOURS)
+    latest_prices = crud_price.get_latest_prices(session=session, product_ids=[product_id], since=since)
+    
+    if not latest_prices:
+        raise HTTPException(status_code=404, detail="No recent prices found for this product")
+
+    # price_latest holds one small row per supermarket, so its contents are the validator
+    rows = sorted(
+        (latest.supermarket_id, latest.price_id, latest.price, latest.original_price, latest.url, latest.scraped_at, supermarket_name)
+        for latest, supermarket_name, _ in latest_prices
+    )
+    not_modified = conditional_response(
+        request, response,
+        etag=make_etag("compare", product_id, product_name, rows),
+        last_modified=max(latest.scraped_at for latest, _, _ in latest_prices),
+    )
+    if not_modified:
+        return not_modified
+    
+    return _build_comparison(product_id, product_name, [(latest, supermarket_name) for latest, supermarket_name, _ in latest_prices])
+
+
 @router.post("/compare-bulk", response_model=List[PriceComparison])
 def compare_multiple_products(
     *,
@@ -110,59 +240,164 @@ def compare_multiple_products(
     if not request.product_ids:
         raise HTTPException(status_code=400, detail="Product IDs list cannot be empty")
     
-    if len(request.product_ids) > 50:
-        raise HTTPException(status_code=400, detail="Maximum 50 products per request")
+    if len(request.product_ids) > MAX_COMPARE_PRODUCTS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_COMPARE_PRODUCTS} products per request")
     
-    comparisons = []
-    for product_id in request.product_ids:
-        try:
-            comparison = compare_product_prices(session=session, product_id=product_id)
-            comparisons.append(comparison)
-        except HTTPException:
-            # Skip products without prices
-            continue
+    since = datetime.now(timezone.utc) - timedelta(hours=settings.PRICE_FRESHNESS_HOURS)
+    latest_prices = crud_price.get_latest_prices(session=session, product_ids=set(request.product_ids), since=since)
+    
+    by_product = {}
+    for latest, supermarket_name, product_name in latest_prices:
+        by_product.setdefault(latest.product_id, (product_name, []))[1].append((latest, supermarket_name))
     
-    return comparisons
+    # Products without recent prices are skipped
+    return [
+        _build_comparison(product_id, *by_product[product_id])
+        for product_id in request.product_ids
+        if product_id in by_product
+    ]
+
+
+@router.post("/basket", response_model=BasketResult)
+def optimize_basket_prices(
+    *,
+    session: Session = Depends(get_session),
+    basket: BasketRequest
+):
+    """
+    Cheapest single supermarket and cheapest split across at most max_stores
+    supermarkets for a basket, using prices seen in the last
+    PRICE_FRESHNESS_HOURS.
+    """
+    if not basket.items:
+        raise HTTPException(status_code=400, detail="Basket cannot be empty")
+
+    if len(basket.items) > MAX_COMPARE_PRODUCTS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_COMPARE_PRODUCTS} products per request")
+
+    # Repeated products add up
+    quantities = {}
+    for item in basket.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    since = datetime.now(timezone.utc) - timedelta(hours=settings.PRICE_FRESHNESS_HOURS)
+    rows = crud_price.get_latest_price_rows(session=session, product_ids=list(quantities), since=since)
+    return optimize_basket(quantities, rows, basket.max_stores)
 
 
-@router.get("/product/{product_id}/history", response_model=List[PriceRead])
+@router.get("/product/{product_id}/history", response_model=Union[List[PriceRead], List[PriceDailyRead]])
 def get_price_history(
     *,
+    request: Request,
+    response: Response,
     session: Session = Depends(get_session),
     product_id: int,
-    days: int = 30
+    days: int = 30,
+    resolution: PriceHistoryResolution = PriceHistoryResolution.RAW
 ):
-    """Get price history for a product"""
-    product = session.get(Product, product_id)
-    if not product:
+    """
+    Get price history for a product. resolution=daily returns one
+    open/high/low/close rollup per supermarket and day instead of every
+    observation; resolution=auto does so for ranges longer than
+    PRICE_HISTORY_RAW_MAX_DAYS. Supports conditional requests with
+    If-None-Match. There is no Last-Modified: overwriting a stored price
+    changes the history without any newer timestamp to show for it.
+    """
+    if crud_product.get_product_name(session=session, product_id=product_id) is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
     cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-    statement = (
-        select(Price)
-        .where(Price.product_id == product_id)
-        .where(Price.scraped_at >= cutoff_date)
-        .order_by(Price.scraped_at.desc())
+    if resolution == PriceHistoryResolution.AUTO:
+        resolution = PriceHistoryResolution.DAILY if days > settings.PRICE_HISTORY_RAW_MAX_DAYS else PriceHistoryResolution.RAW
+
+    if resolution == PriceHistoryResolution.DAILY:
+        version = crud_price.get_daily_price_history_version(session=session, product_id=product_id, since=cutoff_date)
+    else:
+        version = crud_price.get_price_history_version(session=session, product_id=product_id, since=cutoff_date)
+    not_modified = conditional_response(
+        request, response, etag=make_etag("history", product_id, days, resolution.value, *version)
     )
-    prices = session.exec(statement).all()
+    if not_modified:
+        return not_modified
+
+    if resolution == PriceHistoryResolution.DAILY:
+        return crud_price.get_daily_price_history(session=session, product_id=product_id, since=cutoff_date)
+    prices = crud_price.get_price_history(session=session, product_id=product_id, since=cutoff_date)
     return prices
 
 
+@router.get("/stats", response_model=List[PriceStats])
+def get_prices_stats(
+    *,
+    session: Session = Depends(get_session),
+    product_ids: Optional[List[int]] = Query(None),
+    category_id: Optional[int] = None,
+    include_subcategories: bool = False,
+    days: int = 30
+):
+    """
+    Price statistics per product over the last days: mean, median, standard
+    deviation, percentiles, coefficient of variation, min/max and the spread
+    between supermarkets. Without product_ids or category_id every product
+    with prices in the window is included; include_subcategories widens
+    category_id to its whole subtree.
+    """
+    if product_ids is not None and len(product_ids) > MAX_COMPARE_PRODUCTS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_COMPARE_PRODUCTS} products per request")
+
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+    return get_price_stats(
+        session, since=cutoff_date, product_ids=product_ids, category_id=category_id,
+        include_subcategories=include_subcategories
+    )
+
+
+@router.get("/export")
+def export_price_rows(
+    export_format: PriceExportFormat = Query(PriceExportFormat.CSV, alias="format"),
+    supermarket_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Stream every matching price as CSV or NDJSON. Rows are read through a
+    server-side cursor and written as they arrive, so exports of any size use
+    constant memory.
+    """
+    chunks = export_prices(
+        engine,
+        export_format,
+        supermarket_id=supermarket_id,
+        product_id=product_id,
+        since=since,
+        until=until,
+    )
+    filename = f"prices.{export_format.value}"
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/recent", response_model=List[PriceRead])
 def get_recent_prices(
+    response: Response,
     session: Session = Depends(get_session),
     hours: int = 24,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """Get recently scraped prices"""
+    """Get recently scraped prices. Pass the X-Next-Cursor header of a page as cursor to get the next one"""
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, datetime, int)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     cutoff_date = datetime.now(timezone.utc) - timedelta(hours=hours)
-    statement = (
-        select(Price)
-        .where(Price.scraped_at >= cutoff_date)
-        .order_by(Price.scraped_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    prices = session.exec(statement).all()
+    prices = crud_price.get_recent_prices(session=session, since=cutoff_date, skip=skip, limit=limit, after=after)
+    set_next_cursor(response, prices, limit, key=lambda price: (price.scraped_at, price.id))
     return prices 
\ No newline at end of file
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session
 from typing import List, Optional
 
+from app.core.pagination import InvalidCursor, decode_cursor, set_next_cursor
 from app.database import get_session
+from app.schemas.matching import ProductMatchRequest, ProductMatchResult
 from app.schemas.product import ProductCreate, ProductRead, ProductUpdate
 from app.crud import crud_product
 
@@ -12,6 +14,8 @@ router = APIRouter(
     tags=["products"],
 )
 
+MAX_MATCH_ITEMS = 50000
+
 
 @router.post("/", response_model=ProductRead, status_code=status.HTTP_201_CREATED)
 def create_product(*, session: Session = Depends(get_session), product_in: ProductCreate):
@@ -21,9 +25,22 @@ def create_product(*, session: Session = Depends(get_session), product_in: Produ
 
 
 @router.get("/", response_model=List[ProductRead])
-def read_products(session: Session = Depends(get_session), skip: int = 0, limit: int = 100): 
-    """Get all products"""
-    products = crud_product.get_products(session=session, skip=skip, limit=limit)
+def read_products(
+    response: Response,
+    session: Session = Depends(get_session),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Get all products. Pass the X-Next-Cursor header of a page as cursor to get the next one"""
+    after_id = None
+    if cursor is not None:
+        try:
+            (after_id,) = decode_cursor(cursor, int)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    products = crud_product.get_products(session=session, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, products, limit, key=lambda row: (row.id,))
     return products
 
 
@@ -32,20 +49,40 @@ def search_products(
     session: Session = Depends(get_session),
     q: Optional[str] = None,
     category_id: Optional[int] = None,
+    include_subcategories: bool = False,
     skip: int = 0,
     limit: int = 100
 ):
-    """Search products by name, category"""
+    """
+    Search products by name, variant or SKU, most relevant first, optionally
+    within a category or, with include_subcategories, its whole subtree
+    """
     products = crud_product.search_products(
         session=session,
         query=q,
         category_id=category_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        include_subcategories=include_subcategories
     )
     return products
 
 
+@router.post("/match", response_model=ProductMatchResult)
+def match_products(*, session: Session = Depends(get_session), request: ProductMatchRequest):
+    """
+    Resolve scraped items to product IDs by SKU, normalized name and variant,
+    or fuzzy name similarity, each with a confidence score
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Items list cannot be empty")
+
+    if len(request.items) > MAX_MATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_MATCH_ITEMS} items per request")
+
+    return crud_product.match_products(session=session, items=request.items, min_score=request.min_score)
+
+
 @router.get("/{product_id}", response_model=ProductRead)
 def read_product(*, session: Session = Depends(get_session), product_id: int):
     """Get a specific product by ID"""
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 
+from app.core.pagination import InvalidCursor, decode_cursor, set_next_cursor
 from app.database import get_session
 from app.schemas.supermarket import SupermarketCreate, SupermarketRead, SupermarketUpdate
 from app.crud import crud_supermarket
@@ -21,16 +22,29 @@ def create_supermarket(*, session: Session = Depends(get_session), supermarket_i
 
 
 @router.get("/", response_model=List[SupermarketRead])
-def read_supermarkets(session: Session = Depends(get_session), skip: int = 0, limit: int = 100):
-    """Get all supermarkets"""
-    supermarkets = crud_supermarket.get_supermarkets(session=session, skip=skip, limit=limit)
+def read_supermarkets(
+    response: Response,
+    session: Session = Depends(get_session),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Get all supermarkets. Pass the X-Next-Cursor header of a page as cursor to get the next one"""
+    after_id = None
+    if cursor is not None:
+        try:
+            (after_id,) = decode_cursor(cursor, int)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    supermarkets = crud_supermarket.get_supermarkets(session=session, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, supermarkets, limit, key=lambda row: (row.id,))
     return supermarkets
 
 
 @router.get("/{supermarket_id}", response_model=SupermarketRead)
 def read_supermarket(*, session: Session = Depends(get_session), supermarket_id: int):
     """Get a specific supermarket by ID"""
-    supermarket = crud_supermarket.get_supermarket(session=session, supermarket_id=supermarket_id)
+    supermarket = crud_supermarket.get_supermarket_cached(session=session, supermarket_id=supermarket_id)
     if not supermarket:
         raise HTTPException(status_code=404, detail="Supermarket not found")
     return supermarket
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlmodel import Session
+from typing import List, Optional
+
+from app.core.pagination import InvalidCursor, decode_cursor, set_next_cursor
+from app.database import get_session
+from app.schemas.watch import WatchCreate, WatchRead, WatchUpdate, PriceAlertRead
+from app.crud import crud_product, crud_supermarket, crud_watch
+
+
+router = APIRouter(
+    prefix="/watches",
+    tags=["watches"],
+)
+
+
+def _decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    try:
+        (after_id,) = decode_cursor(cursor, int)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id
+
+
+@router.post("/", response_model=WatchRead, status_code=status.HTTP_201_CREATED)
+def create_watch(*, session: Session = Depends(get_session), watch_in: WatchCreate):
+    """Watch a product for a target price or a percentage drop"""
+    if crud_product.get_product_name(session=session, product_id=watch_in.product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if watch_in.supermarket_id is not None and not crud_supermarket.get_supermarket_cached(session=session, supermarket_id=watch_in.supermarket_id):
+        raise HTTPException(status_code=404, detail="Supermarket not found")
+    watch = crud_watch.create_watch(session=session, watch_in=watch_in)
+    return watch
+
+
+@router.get("/", response_model=List[WatchRead])
+def read_watches(
+    response: Response,
+    session: Session = Depends(get_session),
+    subscriber: Optional[str] = None,
+    product_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Get watches, optionally for one subscriber or product"""
+    watches = crud_watch.get_watches(
+        session=session,
+        subscriber=subscriber,
+        product_id=product_id,
+        skip=skip,
+        limit=limit,
+        after_id=_decode_id_cursor(cursor)
+    )
+    set_next_cursor(response, watches, limit, key=lambda row: (row.id,))
+    return watches
+
+
+@router.get("/alerts", response_model=List[PriceAlertRead])
+def read_pending_alerts(
+    response: Response,
+    session: Session = Depends(get_session),
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Get alerts that haven't been marked delivered, oldest first"""
+    alerts = crud_watch.get_pending_alerts(session=session, limit=limit, after_id=_decode_id_cursor(cursor))
+    set_next_cursor(response, alerts, limit, key=lambda row: (row.id,))
+    return alerts
+
+
+@router.post("/alerts/delivered")
+def mark_alerts_delivered(*, session: Session = Depends(get_session), alert_ids: List[int]):
+    """Mark alerts as delivered so they are no longer returned as pending"""
+    if not alert_ids:
+        raise HTTPException(status_code=400, detail="Alert IDs list cannot be empty")
+    delivered = crud_watch.mark_alerts_delivered(session=session, alert_ids=alert_ids)
+    return {"delivered": delivered}
+
+
+@router.get("/{watch_id}", response_model=WatchRead)
+def read_watch(*, session: Session = Depends(get_session), watch_id: int):
+    """Get a specific watch by ID"""
+    watch = crud_watch.get_watch(session=session, watch_id=watch_id)
+    if not watch:
+        raise HTTPException(status_code=404, detail="Watch not found")
+    return watch
+
+
+@router.put("/{watch_id}", response_model=WatchRead)
+def update_watch(*, session: Session = Depends(get_session), watch_id: int, watch_in: WatchUpdate):
+    """Update a watch"""
+    watch = crud_watch.get_watch(session=session, watch_id=watch_id)
+    if not watch:
+        raise HTTPException(status_code=404, detail="Watch not found")
+    watch = crud_watch.update_watch(session=session, db_watch=watch, watch_in=watch_in)
+    return watch
+
+
+@router.delete("/{watch_id}", response_model=WatchRead)
+def delete_watch(*, session: Session = Depends(get_session), watch_id: int):
+    """Delete a watch and its alerts"""
+    watch = crud_watch.delete_watch(session=session, watch_id=watch_id)
+    if not watch:
+        raise HTTPException(status_code=404, detail="Watch not found")
+    return watch
@@ -0,0 +1,34 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class BasketItem(BaseModel):
+    product_id: int = Field(gt=0)
+    quantity: float = Field(default=1, gt=0)
+
+
+class BasketRequest(BaseModel):
+    items: List[BasketItem]
+    max_stores: int = Field(default=2, ge=1, le=10)
+
+
+class BasketLine(BaseModel):
+    product_id: int
+    supermarket_id: int
+    quantity: float
+    price: float
+    subtotal: float
+
+
+class BasketOption(BaseModel):
+    supermarket_ids: List[int]
+    total: float
+    lines: List[BasketLine]
+    missing_product_ids: List[int] = []
+    optimal: bool = True
+
+
+class BasketResult(BaseModel):
+    single_store: Optional[BasketOption] = None
+    split: Optional[BasketOption] = None
+    unavailable_product_ids: List[int] = []
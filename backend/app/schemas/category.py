@@ -9,6 +9,7 @@ class CategoryBase(SQLModel):
     name: str = Field(min_length=1, max_length=255)
     slug: str = Field(max_length=255)
     image_url: Optional[str] = Field(default=None, max_length=500)
+    parent_id: Optional[int] = Field(default=None, gt=0)
 
     @field_validator("name")
     @classmethod
@@ -33,7 +34,6 @@ class CategoryCreate(CategoryBase):
 
 class CategoryRead(CategoryBase):
     id: int
-    parent_id: Optional[int] = None
     created_at: datetime
 
 
@@ -44,4 +44,5 @@ class CategoryRead(CategoryBase):
 class CategoryUpdate(SQLModel):
     name: Optional[str] = Field(default=None, min_length=1, max_length=255)
     slug: Optional[str] = Field(default=None, max_length=255)
-    image_url: Optional[str] = Field(default=None, max_length=500)
\ No newline at end of file
+    image_url: Optional[str] = Field(default=None, max_length=500)
+    parent_id: Optional[int] = Field(default=None, gt=0)
@@ -0,0 +1,36 @@
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class ProductMatchMethod(str, Enum):
+    SKU = "sku"
+    EXACT = "exact"
+    FUZZY = "fuzzy"
+    NONE = "none"
+
+
+class ProductMatchItem(BaseModel):
+    """A scraped item as the store shows it"""
+    name: str = Field(min_length=1, max_length=500)
+    variant: Optional[str] = Field(default=None, max_length=500)
+    sku: Optional[str] = Field(default=None, max_length=100)
+    category_id: Optional[int] = Field(default=None, gt=0)
+
+
+class ProductMatchRequest(BaseModel):
+    items: List[ProductMatchItem]
+    min_score: float = Field(default=0.6, ge=0, le=1)
+
+
+class ProductMatch(BaseModel):
+    index: int
+    product_id: Optional[int] = None
+    method: ProductMatchMethod = ProductMatchMethod.NONE
+    confidence: float = 0.0
+
+
+class ProductMatchResult(BaseModel):
+    matches: List[ProductMatch]
+    matched: int
+    unmatched: int
@@ -1,9 +1,28 @@
 from typing import Optional, List
+from enum import Enum
 from sqlmodel import SQLModel, Field
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import field_validator, BaseModel
 
 
+class PriceConflict(str, Enum):
+    """What to do when a price for the same product, supermarket and scraped_at already exists."""
+    NOTHING = "nothing"
+    UPDATE = "update"
+
+
+class PriceHistoryResolution(str, Enum):
+    """Granularity of price history. auto picks daily rollups for long ranges."""
+    RAW = "raw"
+    DAILY = "daily"
+    AUTO = "auto"
+
+
+class PriceExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
 class PriceBase(SQLModel):
     product_id: int = Field(gt=0)
     supermarket_id: int = Field(gt=0)
@@ -32,6 +51,21 @@ class PriceCreate(PriceBase):
 class PriceRead(PriceBase):
     id: int
     scraped_at: datetime
+    last_seen_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PriceDailyRead(BaseModel):
+    product_id: int
+    supermarket_id: int
+    day: date
+    open: float
+    high: float
+    low: float
+    close: float
+    count: int
 
     class Config:
         from_attributes = True
@@ -65,5 +99,53 @@ class PriceComparison(BaseModel):
     savings_percentage: float
 
 
+class PriceStats(BaseModel):
+    product_id: int
+    count: int
+    stores: int
+    mean: float
+    median: float
+    std: float
+    cv: float
+    min: float
+    max: float
+    p10: float
+    p25: float
+    p75: float
+    p90: float
+    store_spread: float
+
+
 class CompareBulkRequest(BaseModel):
-    product_ids: List[int]
\ No newline at end of file
+    product_ids: List[int]
+
+class PriceBulkItemResult(BaseModel):
+    index: int
+    accepted: bool
+    duplicate: bool = False
+    compacted: bool = False
+    price_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class PriceBulkResult(BaseModel):
+    accepted: int
+    rejected: int
+    duplicates: int = 0
+    compacted: int = 0
+    results: List[PriceBulkItemResult]
+
+
+
+class PriceStreamError(BaseModel):
+    line: int
+    error: str
+
+
+class PriceStreamResult(BaseModel):
+    lines: int
+    accepted: int
+    rejected: int
+    duplicates: int = 0
+    compacted: int = 0
+    errors: List[PriceStreamError]
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from sqlmodel import Field, SQLModel
 from pydantic import field_validator
@@ -18,6 +18,7 @@ class ScrapingJobBase(SQLModel):
     products_scraped: int = 0
     errors_count: int = 0
     error_message: Optional[str] = None
+    urls: Optional[List[str]] = None
 
     @field_validator("products_scraped", "errors_count")
     @classmethod
@@ -43,6 +44,7 @@ class ScrapingJobRead(ScrapingJobBase):
     started_at: datetime
     updated_at: datetime
     completed_at: Optional[datetime] = None
+    metrics: Optional[Dict[str, float]] = None
 
     class Config:
         from_attributes = True
@@ -53,4 +55,5 @@ class ScrapingJobUpdate(SQLModel):
     products_scraped: Optional[int] = None
     errors_count: Optional[int] = None
     error_message: Optional[str] = None
-    completed_at: Optional[datetime] = None
\ No newline at end of file
+    completed_at: Optional[datetime] = None
+    metrics: Optional[Dict[str, float]] = None
\ No newline at end of file
@@ -8,6 +8,8 @@ class SupermarketBase(SQLModel):
     name: str = Field(min_length=1, max_length=255)
     website_url: str = Field(max_length=500)
     logo_url: Optional[str] = Field(default=None, max_length=500)
+    max_concurrency: Optional[int] = Field(default=None, gt=0, le=1000)
+    max_requests_per_second: Optional[float] = Field(default=None, gt=0)
 
     @field_validator("name")
     @classmethod
@@ -45,3 +47,5 @@ class SupermarketUpdate(SQLModel):
     name: Optional[str] = Field(default=None, min_length=1)
     website_url: Optional[str] = None
     logo_url: Optional[str] = None
+    max_concurrency: Optional[int] = Field(default=None, gt=0, le=1000)
+    max_requests_per_second: Optional[float] = Field(default=None, gt=0)
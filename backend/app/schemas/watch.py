@@ -0,0 +1,55 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from pydantic import model_validator
+
+from app.models.watch import PriceAlertReason
+
+
+class WatchBase(SQLModel):
+    subscriber: str = Field(min_length=1, max_length=255)
+    product_id: int = Field(gt=0)
+    supermarket_id: Optional[int] = Field(default=None, gt=0)
+    target_price: Optional[float] = Field(default=None, gt=0)
+    drop_percent: Optional[float] = Field(default=None, gt=0, lt=100)
+    is_active: bool = True
+
+
+class WatchCreate(WatchBase):
+    @model_validator(mode="after")
+    def validate_condition(self) -> "WatchCreate":
+        if self.target_price is None and self.drop_percent is None:
+            raise ValueError("A watch needs a target_price, a drop_percent or both")
+        return self
+
+
+class WatchRead(WatchBase):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WatchUpdate(SQLModel):
+    supermarket_id: Optional[int] = None
+    target_price: Optional[float] = Field(default=None, gt=0)
+    drop_percent: Optional[float] = Field(default=None, gt=0, lt=100)
+    is_active: Optional[bool] = None
+
+
+class PriceAlertRead(SQLModel):
+    id: int
+    watch_id: int
+    product_id: int
+    supermarket_id: int
+    price_id: Optional[int] = None
+    reason: PriceAlertReason
+    price: float
+    previous_price: Optional[float] = None
+    scraped_at: datetime
+    created_at: datetime
+    delivered_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,582 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import httpx
+from pydantic import ValidationError
+from sqlmodel import Session
+
+from app.config import settings
+from app.crud import crud_page_cache, crud_price, crud_product, crud_scraping_job
+from app.crud.crud_page_cache import CachedPage
+from app.models.scraping_job import ScrapingJob
+from app.models.supermarket import Supermarket
+from app.schemas.matching import ProductMatchItem
+from app.schemas.price import PriceCreate
+from app.schemas.scraping_job import JobStatus, ScrapingJobUpdate
+from app.scraper.extraction import Extracted, build_extract_pool, extract_page
+from app.scraper.extractors import Extractor, ScrapedItem, domain_of, get_extractor
+from app.scraper.page_store import PageStore, content_hash
+from app.scraper.progress import MAX_ERROR_MESSAGE_LENGTH, JobProgress
+from app.scraper.scheduler import mark_checked
+from app.scraper.throttle import AdaptiveLimiter
+
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another try: throttling and server-side failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_BACKOFF = 0.5
+
+
+class FetchError(Exception):
+    pass
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds a Retry-After header asks to wait, given as seconds or as an HTTP date."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def build_client() -> httpx.AsyncClient:
+    """Pooled HTTP client: connections to a site are kept alive and reused across pages and jobs."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SCRAPER_MAX_CONNECTIONS,
+            keepalive_expiry=30.0,
+        ),
+        timeout=settings.SCRAPER_TIMEOUT,
+        headers={"User-Agent": settings.SCRAPER_USER_AGENT},
+        follow_redirects=True,
+    )
+
+
+class _Batch(NamedTuple):
+    """What a job has gathered since its last flush, handed to the ingest thread whole."""
+    supermarket_id: int
+    items: List[Tuple[ScrapedItem, Dict]]
+    pages: List[Dict]
+    checked: List[str]
+    confirming: Set[int]
+
+
+class _Ingested(NamedTuple):
+    """What became of a batch once it was committed."""
+    errors: List[str]
+    unmatched: int
+    confirmed: int
+    accepted: int
+    rejected: int
+
+
+class _JobRun:
+    """Progress of one job while it runs."""
+
+    def __init__(
+        self,
+        job: ScrapingJob,
+        supermarket: Supermarket,
+        extractor: Extractor,
+        cache: Dict[str, CachedPage],
+        limiter: AdaptiveLimiter,
+        progress: JobProgress
+    ):
+        self.job = job
+        self.supermarket = supermarket
+        self.extractor = extractor
+        self.domain = domain_of(supermarket.website_url)
+        self.cache = cache
+        self.limiter = limiter
+        self.progress = progress
+        self.started = time.monotonic()
+        self.backoffs_before = limiter.decreases
+        # Items with the cache entry of the page they came from, which records their products
+        self.pending: List[Tuple[ScrapedItem, Dict]] = []
+        # Cache entries of the fetched pages, saved with their items
+        self.pending_pages: List[Dict] = []
+        # Products of unchanged pages, whose latest prices are confirmed with the batch
+        self.confirming: List[int] = []
+        # URLs fetched since the last flush, for the revisit schedule
+        self.checked: List[str] = []
+        self.pages = 0
+        self.unchanged = 0
+        self.unmatched = 0
+        self.confirmed = 0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.transport_errors = 0
+        self.latency = 0.0
+        self.peak_concurrency = 0
+
+    def take_batch(self) -> Optional[_Batch]:
+        """Everything gathered since the last flush, None when there is nothing."""
+        if not self.pending and not self.pending_pages and not self.checked:
+            return None
+        batch = _Batch(self.supermarket.id, self.pending, self.pending_pages, self.checked, set(self.confirming))
+        self.pending, self.pending_pages, self.checked, self.confirming = [], [], [], []
+        return batch
+
+    def error(self, message: str) -> None:
+        self.progress.error(message)
+        logger.warning("Scraping job %s: %s", self.job.id, message)
+
+    def record(self, status: Optional[int], latency: float) -> None:
+        self.requests += 1
+        self.latency += latency
+        if status is None:
+            self.transport_errors += 1
+        elif status == 429:
+            self.throttled += 1
+        elif status >= 500:
+            self.server_errors += 1
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "pages": self.pages,
+            "unchanged_pages": self.unchanged,
+            "unmatched_items": self.unmatched,
+            "confirmed_prices": self.confirmed,
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "server_errors": self.server_errors,
+            "transport_errors": self.transport_errors,
+            "mean_latency_ms": round(1000 * self.latency / self.requests, 1) if self.requests else 0.0,
+            "peak_concurrency": self.peak_concurrency,
+            "backoffs": self.limiter.decreases - self.backoffs_before,
+            **self.limiter.snapshot(),
+            "progress_flushes": self.progress.flushes,
+            "duration_s": round(time.monotonic() - self.started, 3),
+        }
+
+
+class ScrapeEngine:
+    """
+    Runs scraping jobs on asyncio as a pipeline of three stages joined by
+    bounded queues, so a stage that falls behind slows down the ones feeding
+    it instead of piling up pages in memory:
+
+    - fetch: pages come through one pooled client, admitted by an
+      AdaptiveLimiter per site that every job for the site shares. Its
+      ceilings are the supermarket's max_concurrency (else the extractor's
+      concurrency) and max_requests_per_second (else SCRAPER_RATE_LIMIT);
+    - parse: bodies are stored and extracted in a pool of worker processes,
+      keeping CPU-bound parsing off the event loop and spread over all cores;
+    - ingest: items are matched to products and ingested in batches, on a
+      thread with a session of its own, so matching and writes never hold
+      up the event loop. Batches of all the engine's jobs take turns on it,
+      each in a transaction of its own. The job's counters are kept in a
+      JobProgress, written from the event loop through the engine's
+      session once enough has changed or enough time has passed. A
+      heartbeat rewrites them every progress_interval seconds, so that a
+      run of unchanged pages isn't taken for a dead job. A batch is
+      counted only once it is stored.
+
+    parse_processes=0 parses on the event loop instead, for extractors that
+    can't be pickled.
+
+    Fetches are conditional on the validators of the previous fetch, and
+    bodies go to the page store. A page that answers 304, or whose body
+    hashes the same as last time, is neither parsed nor ingested again; the
+    links cached for it are followed as before, and the latest prices of the
+    products it had are confirmed as seen again with the batch, so they stay
+    current. conditional=False fetches and ingests every page in full, after
+    an extractor change for instance.
+
+    A job with urls, as the scheduler creates, fetches just those pages
+    without following their links. Every page fetched is marked checked in
+    the revisit schedule, with the batch it is ingested in.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        client: Optional[httpx.AsyncClient] = None,
+        batch_size: int = settings.SCRAPER_BATCH_SIZE,
+        max_pages: int = settings.SCRAPER_MAX_PAGES,
+        max_retries: int = settings.SCRAPER_MAX_RETRIES,
+        min_match_score: float = settings.SCRAPER_MIN_MATCH_SCORE,
+        page_store: Optional[PageStore] = None,
+        conditional: bool = True,
+        pool: Optional[Executor] = None,
+        parse_processes: Optional[int] = settings.SCRAPER_PARSE_PROCESSES,
+        queue_size: int = settings.SCRAPER_PIPELINE_QUEUE_SIZE,
+        progress_interval: float = settings.SCRAPER_PROGRESS_FLUSH_INTERVAL
+    ):
+        self.session = session
+        self.client = client
+        self.batch_size = batch_size
+        self.max_pages = max_pages
+        self.max_retries = max_retries
+        self.min_match_score = min_match_score
+        self.page_store = page_store or PageStore()
+        self.conditional = conditional
+        self.pool = pool
+        self.parse_processes = parse_processes
+        self.queue_size = queue_size
+        self.progress_interval = progress_interval
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._ingest_thread: Optional[ThreadPoolExecutor] = None
+        self._ingest_session: Optional[Session] = None
+
+    @asynccontextmanager
+    async def open(self) -> AsyncIterator["ScrapeEngine"]:
+        """
+        Provide the HTTP client and the parsing pool, unless given, and the
+        ingest thread with its session, for the jobs run inside.
+        """
+        own_client = self.client is None
+        own_pool = self.pool is None and self.parse_processes != 0
+        own_ingest = self._ingest_thread is None
+        if own_client:
+            self.client = build_client()
+        if own_pool:
+            self.pool = build_extract_pool(self.parse_processes)
+        if own_ingest:
+            self._ingest_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-ingest")
+            self._ingest_session = Session(self.session.get_bind())
+        try:
+            yield self
+        finally:
+            if own_client:
+                await self.client.aclose()
+                self.client = None
+            if own_pool:
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = None
+            if own_ingest:
+                # A batch already handed over is left to finish
+                await asyncio.get_running_loop().run_in_executor(None, self._ingest_thread.shutdown)
+                self._ingest_session.close()
+                self._ingest_thread = self._ingest_session = None
+
+    async def run_jobs(self, jobs: Sequence[ScrapingJob]) -> List[ScrapingJob]:
+        async with self.open():
+            return list(await asyncio.gather(*(self._run(job) for job in jobs)))
+
+    async def run(self, job: ScrapingJob) -> ScrapingJob:
+        return (await self.run_jobs([job]))[0]
+
+    def _update(self, job: ScrapingJob, **fields) -> ScrapingJob:
+        return crud_scraping_job.update_job(self.session, job, ScrapingJobUpdate(**fields))
+
+    async def _run(self, job: ScrapingJob) -> ScrapingJob:
+        supermarket = self.session.get(Supermarket, job.supermarket_id)
+        if supermarket is None:
+            return self._update(job, status=JobStatus.FAILED, error_message="Supermarket not found")
+
+        cache = crud_page_cache.get_cached_pages(self.session, supermarket.id) if self.conditional else {}
+        extractor = get_extractor(supermarket.website_url)
+        # Jobs claimed from the queue are IN_PROGRESS already
+        if job.status != JobStatus.IN_PROGRESS:
+            job = crud_scraping_job.start_job(self.session, job)
+        run = _JobRun(
+            job, supermarket, extractor, cache, self._limiter(supermarket, extractor),
+            JobProgress(self.session, job, flush_interval=self.progress_interval),
+        )
+        try:
+            await self._crawl(run)
+            await self._flush(run)
+            # Nothing fetched at all means the site, not a page, is the problem
+            status = JobStatus.COMPLETED if run.pages else JobStatus.FAILED
+        except crud_scraping_job.StaleClaim:
+            # Requeued and possibly claimed again: the job is no longer this run's to record
+            logger.warning("Scraping job %s was requeued while running; stopping", job.id)
+            self.session.rollback()
+            raise
+        except Exception as e:
+            logger.exception("Scraping job %s failed", job.id)
+            self.session.rollback()
+            run.progress.last_error = f"{type(e).__name__}: {e}"[:MAX_ERROR_MESSAGE_LENGTH]
+            status = JobStatus.FAILED
+
+        logger.info(
+            "Scraping job %s %s: %s pages (%s unchanged), %s prices, %s unmatched items, %s errors",
+            job.id, status.value, run.pages, run.unchanged, run.progress.products_scraped, run.unmatched,
+            run.progress.errors_count,
+        )
+        # Always written, whatever is still waiting for a flush
+        return run.progress.finish(ScrapingJobUpdate(status=status, metrics=run.metrics()))
+
+    def _limiter(self, supermarket: Supermarket, extractor: Extractor) -> AdaptiveLimiter:
+        # Keyed by site, so supermarkets sharing a domain share its limits
+        domain = domain_of(supermarket.website_url)
+        if domain not in self._limiters:
+            self._limiters[domain] = AdaptiveLimiter(
+                max_concurrency=supermarket.max_concurrency or extractor.concurrency,
+                max_rate=supermarket.max_requests_per_second or settings.SCRAPER_RATE_LIMIT,
+            )
+        return self._limiters[domain]
+
+    async def _crawl(self, run: _JobRun) -> None:
+        frontier: asyncio.Queue = asyncio.Queue()
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        extracted: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        seen = set()
+
+        def enqueue(url: str) -> None:
+            # Only pages of the supermarket's own site, each once
+            if url not in seen and len(seen) < self.max_pages and domain_of(url) == run.domain:
+                seen.add(url)
+                frontier.put_nowait(url)
+
+        # Jobs from the scheduler fetch the pages they list and nothing else
+        follow = not run.job.urls
+        for url in run.job.urls or run.extractor.start_urls(run.supermarket.website_url):
+            enqueue(url)
+
+        # A URL is done once its links are in the frontier: after the fetch
+        # stage for failed and unchanged pages, after the parse stage otherwise
+        async def fetch_stage() -> None:
+            while True:
+                url = await frontier.get()
+                try:
+                    response = await self._fetch(run, url)
+                    links = self._unchanged(run, url, response)
+                except Exception as e:
+                    run.error(str(e) if isinstance(e, FetchError) else f"{url}: {type(e).__name__}: {e}")
+                    frontier.task_done()
+                    continue
+                run.pages += 1
+                run.checked.append(url)
+                if links is None:
+                    await fetched.put((url, response))
+                    continue
+                for link in links if follow else ():
+                    enqueue(link)
+                frontier.task_done()
+
+        async def parse_stage() -> None:
+            while True:
+                url, response = await fetched.get()
+                try:
+                    digest, items, links = await self._extract(run.extractor, url, response)
+                except Exception as e:
+                    run.error(f"{url}: {type(e).__name__}: {e}")
+                else:
+                    for link in links if follow else ():
+                        enqueue(link)
+                    await extracted.put((items, self._page_entry(run, url, response, digest, links, [])))
+                finally:
+                    fetched.task_done()
+                    frontier.task_done()
+
+        async def ingest_stage() -> None:
+            while True:
+                items, page = await extracted.get()
+                run.pending.extend((item, page) for item in items)
+                run.pending_pages.append(page)
+                if len(run.pending) >= self.batch_size or len(run.pending_pages) >= self.batch_size:
+                    await self._flush(run)
+                extracted.task_done()
+
+        async def heartbeat_stage() -> None:
+            # Fetches and unchanged pages move no counter, and a job has to show it is alive all the same
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                run.progress.heartbeat()
+
+        async def drained() -> None:
+            await frontier.join()
+            await extracted.join()
+
+        # Enough parse tasks to keep every worker process busy
+        parsers = (self.parse_processes or os.cpu_count() or 1) if self.pool is not None else 1
+        stages = [
+            # The limiter decides how many of these actually have a request out
+            *(asyncio.create_task(fetch_stage()) for _ in range(run.limiter.max_concurrency)),
+            *(asyncio.create_task(parse_stage()) for _ in range(parsers)),
+            asyncio.create_task(ingest_stage()),
+            asyncio.create_task(heartbeat_stage()),
+        ]
+        done = asyncio.create_task(drained())
+        try:
+            # Stages only finish by raising, which has to stop the crawl
+            await asyncio.wait([done, *stages], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (done, *stages):
+                task.cancel()
+            results = await asyncio.gather(done, *stages, return_exceptions=True)
+        # Cancelled tasks return CancelledError, which is not an Exception
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def _extract(self, extractor: Extractor, url: str, response: httpx.Response) -> Extracted:
+        args = (extractor, self.page_store, url, response.content, response.charset_encoding)
+        if self.pool is None:
+            return extract_page(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, extract_page, *args)
+
+    async def _fetch(self, run: _JobRun, url: str) -> httpx.Response:
+        """GET a page, conditionally when it is cached. The response is a 200 or a 304."""
+        cached = run.cache.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        error = ""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                run.retries += 1
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            started = await run.limiter.acquire()
+            run.peak_concurrency = max(run.peak_concurrency, run.limiter.in_flight)
+            response = None
+            try:
+                response = await self.client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+                continue
+            finally:
+                status = response.status_code if response is not None else None
+                retry_after = _retry_after(response) if response is not None else None
+                run.record(status, await run.limiter.release(started, status, retry_after))
+            if response.status_code < 400:
+                return response
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+        raise FetchError(f"{url}: {error}")
+
+    def _unchanged(self, run: _JobRun, url: str, response: httpx.Response) -> Optional[List[str]]:
+        """The cached links of a page that has not changed since it was cached, None when it needs parsing."""
+        cached = run.cache.get(url)
+        if cached is None:
+            if response.status_code == 304:
+                raise FetchError(f"{url}: HTTP 304 for a page that is not cached")
+            return None
+        if response.status_code != 304 and content_hash(response.content) != cached.content_hash:
+            return None
+        # Cached before its products were recorded: parsed once more to learn them
+        if cached.product_ids is None:
+            return None
+
+        run.unchanged += 1
+        run.confirming.extend(cached.product_ids)
+        # New validators for the same content are still worth keeping
+        page = self._page_entry(run, url, response, cached.content_hash, cached.links, cached.product_ids)
+        if (page["etag"], page["last_modified"]) != (cached.etag, cached.last_modified):
+            run.pending_pages.append(page)
+        return cached.links
+
+    def _page_entry(
+        self, run: _JobRun, url: str, response: httpx.Response, digest: str, links: List[str], product_ids: List[int]
+    ) -> Dict:
+        cached = run.cache.get(url)
+        return {
+            "supermarket_id": run.supermarket.id,
+            "url": url,
+            "etag": response.headers.get("etag") or (cached.etag if cached else None),
+            "last_modified": response.headers.get("last-modified") or (cached.last_modified if cached else None),
+            "content_hash": digest,
+            "links": links,
+            "product_ids": product_ids,
+            "fetched_at": datetime.now(timezone.utc),
+        }
+
+    async def _flush(self, run: _JobRun) -> None:
+        """Ingest what the job has gathered on the ingest thread, then count it."""
+        batch = run.take_batch()
+        if batch is None:
+            return
+        ingested = await asyncio.get_running_loop().run_in_executor(self._ingest_thread, self._ingest, batch)
+        # Counted once stored: the totals finish() writes must not include a batch that was rolled back
+        for message in ingested.errors:
+            run.error(message)
+        run.unmatched += ingested.unmatched
+        run.confirmed += ingested.confirmed
+        run.progress.add(products=ingested.accepted, errors=ingested.rejected)
+
+    def _ingest(self, batch: _Batch) -> _Ingested:
+        """
+        Match a batch's items to products and ingest their prices, confirm
+        those of its unchanged pages, and save its pages and schedule, in one
+        transaction of the ingest session. Runs on the ingest thread.
+        """
+        session = self._ingest_session
+        try:
+            return self._store_batch(session, batch)
+        except Exception:
+            # Left clean for the next batch, whichever job it is from
+            session.rollback()
+            raise
+
+    def _store_batch(self, session: Session, batch: _Batch) -> _Ingested:
+        errors: List[str] = []
+        mark_checked(session, batch.supermarket_id, batch.checked)
+
+        valid: List[Tuple[ScrapedItem, Dict]] = []
+        match_items: List[ProductMatchItem] = []
+        for item, page in batch.items:
+            try:
+                match_items.append(ProductMatchItem(name=item.name, variant=item.variant, sku=item.sku))
+            except ValidationError as e:
+                errors.append(f"{item.url}: invalid item: {e.errors()[0]['msg']}")
+                continue
+            valid.append((item, page))
+
+        matches = crud_product.match_products(session, match_items, min_score=self.min_match_score).matches
+        now = datetime.now(timezone.utc)
+        prices = []
+        unmatched = 0
+        for (item, page), match in zip(valid, matches):
+            if match.product_id is None:
+                unmatched += 1
+                continue
+            try:
+                prices.append(PriceCreate(
+                    product_id=match.product_id,
+                    supermarket_id=batch.supermarket_id,
+                    price=item.price,
+                    url=item.url,
+                    original_price=item.original_price,
+                    scraped_at=now,
+                ))
+            except ValidationError as e:
+                errors.append(f"{item.url}: invalid price: {e.errors()[0]['msg']}")
+                continue
+            page["product_ids"].append(match.product_id)
+
+        for page in batch.pages:
+            page["product_ids"] = sorted(set(page["product_ids"]))
+        crud_page_cache.save_pages(session, batch.pages)
+
+        # A product with a new price in the batch needs no confirming
+        confirming = batch.confirming - {price.product_id for price in prices}
+        confirmed = crud_price.confirm_latest_prices(session, batch.supermarket_id, confirming, now)
+        result = crud_price.create_prices_bulk(session, prices, compact=True) if prices else None
+        # Commits the batch's pages, schedule and confirmations
+        session.commit()
+        return _Ingested(
+            errors=errors,
+            unmatched=unmatched,
+            confirmed=confirmed,
+            accepted=result.accepted if result is not None else 0,
+            rejected=result.rejected if result is not None else 0,
+        )
+
+
+def run_job(session: Session, job: ScrapingJob) -> ScrapingJob:
+    """Run one job to completion from synchronous code."""
+    return asyncio.run(ScrapeEngine(session).run(job))
@@ -0,0 +1,23 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from app.scraper.extractors import Extractor, ScrapedItem
+from app.scraper.page_store import PageStore
+
+
+# What a worker process sends back for a page: its content hash, items and links
+Extracted = Tuple[str, List[ScrapedItem], List[str]]
+
+
+def extract_page(extractor: Extractor, page_store: PageStore, url: str, body: bytes, encoding: Optional[str]) -> Extracted:
+    """Store a fetched body and extract it. The CPU-heavy part of a scrape, run in a worker process."""
+    digest = page_store.put(body)
+    result = extractor.extract(url, body.decode(encoding or "utf-8", errors="replace"))
+    return digest, result.items, result.links
+
+
+def build_extract_pool(processes: Optional[int] = None) -> ProcessPoolExecutor:
+    """Worker processes for extract_page, one per core unless processes says otherwise."""
+    # Spawned, not forked: workers must not inherit the event loop, DB connections or open sockets
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
@@ -0,0 +1,146 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Type
+from urllib.parse import urljoin, urlsplit
+
+import lxml.html
+from lxml import etree
+
+from app.config import settings
+
+
+class ScrapedItem(NamedTuple):
+    """A product offer as a supermarket's site shows it, before it is matched to a product."""
+    name: str
+    price: float
+    url: Optional[str] = None
+    sku: Optional[str] = None
+    variant: Optional[str] = None
+    original_price: Optional[float] = None
+
+
+@dataclass
+class PageResult:
+    items: List[ScrapedItem] = field(default_factory=list)
+    # Further pages of the same site to fetch, such as the next page of a listing
+    links: List[str] = field(default_factory=list)
+
+
+class Extractor:
+    """
+    Turns the pages of one supermarket's site into scraped items. Subclasses
+    are registered per domain with register_extractor.
+
+    extract runs in a worker process: extractors are pickled to get there, so
+    they must be defined at module level, and they get nothing but the page.
+    """
+    # Requests in flight to the site at the same time
+    concurrency: int = settings.SCRAPER_CONCURRENCY
+
+    def start_urls(self, website_url: str) -> List[str]:
+        return [website_url]
+
+    def extract(self, url: str, html: str) -> PageResult:
+        raise NotImplementedError
+
+
+EXTRACTORS: Dict[str, Type[Extractor]] = {}
+
+
+def domain_of(url: str) -> str:
+    """Lower-cased host of a URL without a leading www."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host.removeprefix("www.")
+
+
+def register_extractor(*domains: str) -> Callable[[Type[Extractor]], Type[Extractor]]:
+    """Class decorator registering an extractor for the sites of the given domains."""
+    def register(cls: Type[Extractor]) -> Type[Extractor]:
+        for domain in domains:
+            EXTRACTORS[domain.lower().removeprefix("www.")] = cls
+        return cls
+    return register
+
+
+def get_extractor(website_url: str) -> Extractor:
+    """The extractor registered for a site's domain, JSON-LD extraction otherwise."""
+    return EXTRACTORS.get(domain_of(website_url), JsonLdExtractor)()
+
+
+def _price(value: Any) -> Optional[float]:
+    # schema.org prices use a dot for decimals and no thousands separator
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if price >= 0 else None
+
+
+_LOWER = ("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_JSON_LD = etree.XPath(
+    f"//script[translate(normalize-space(@type), '{_LOWER[0]}', '{_LOWER[1]}') = 'application/ld+json']/text()"
+)
+# rel holds space-separated tokens, in any case
+_NEXT_LINKS = etree.XPath(
+    "//*[self::a or self::link][@href]"
+    f"[contains(concat(' ', translate(normalize-space(@rel), '{_LOWER[0]}', '{_LOWER[1]}'), ' '), ' next ')]/@href"
+)
+
+
+class JsonLdExtractor(Extractor):
+    """
+    Reads schema.org Product entries, alone or inside an ItemList, from the
+    JSON-LD of a page and follows rel="next" pagination links. Most grocery
+    storefronts publish these for search engines.
+    """
+
+    def _products(self, node: Any) -> Iterator[Dict]:
+        if isinstance(node, list):
+            for child in node:
+                yield from self._products(child)
+        elif isinstance(node, dict):
+            kind = node.get("@type")
+            kinds = kind if isinstance(kind, list) else [kind]
+            if "Product" in kinds:
+                yield node
+            elif "ListItem" in kinds and "item" in node:
+                yield from self._products(node["item"])
+            for key in ("@graph", "itemListElement"):
+                if key in node:
+                    yield from self._products(node[key])
+
+    def _item(self, url: str, product: Dict) -> Optional[ScrapedItem]:
+        offers = product.get("offers")
+        offer = offers[0] if isinstance(offers, list) and offers else offers
+        if not isinstance(offer, dict):
+            return None
+        price = _price(offer.get("price", offer.get("lowPrice")))
+        name = str(product.get("name") or "").strip()
+        if price is None or not name:
+            return None
+        sku = str(product.get("sku") or "").strip()
+        size = product.get("size")
+        return ScrapedItem(
+            name=name,
+            price=price,
+            url=urljoin(url, offer.get("url") or product.get("url") or url),
+            sku=sku or None,
+            variant=size.strip() or None if isinstance(size, str) else None,
+        )
+
+    def extract(self, url: str, html: str) -> PageResult:
+        if not html.strip():
+            return PageResult()
+        document = lxml.html.fromstring(html)
+
+        result = PageResult(links=[urljoin(url, link.strip()) for link in _NEXT_LINKS(document)])
+        for block in _JSON_LD(document):
+            try:
+                data = json.loads(block)
+            except ValueError:
+                continue
+            for product in self._products(data):
+                item = self._item(url, product)
+                if item is not None:
+                    result.items.append(item)
+        return result
@@ -0,0 +1,50 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+import zstandard
+
+from app.config import settings
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageStore:
+    """
+    Raw page bodies on disk, zstd-compressed and named by the SHA-256 of the
+    uncompressed body, so a body served on many URLs or runs is stored once.
+    Pages can be extracted again from here without refetching them.
+    """
+
+    def __init__(self, root: Optional[Path] = None, level: int = settings.SCRAPER_PAGE_STORE_LEVEL):
+        self.root = Path(root or settings.SCRAPER_PAGE_STORE_DIR)
+        self.level = level
+
+    def path(self, digest: str) -> Path:
+        # Two levels of fan-out keep directories small
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.zst"
+
+    def __contains__(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def put(self, body: bytes) -> str:
+        """Store a body unless it is stored already, and return its hash."""
+        digest = content_hash(body)
+        path = self.path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Written aside and renamed, so readers never see a partial file
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(zstandard.ZstdCompressor(level=self.level).compress(body))
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            compressed = self.path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+        return zstandard.ZstdDecompressor().decompress(compressed)
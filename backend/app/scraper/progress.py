@@ -0,0 +1,107 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.config import settings
+from app.crud import crud_scraping_job
+from app.models.scraping_job import ScrapingJob
+from app.schemas.scraping_job import ScrapingJobUpdate
+
+
+MAX_ERROR_MESSAGE_LENGTH = 1000
+
+
+class JobProgress:
+    """
+    A running job's counters and last error, kept in memory and written to
+    scraping_jobs at most every flush_interval seconds or flush_every
+    updates, whichever comes first, instead of a transaction per update.
+    finish() always writes the final counts with the job's outcome.
+
+    requeue_stale_jobs takes a job whose row stops being updated for one
+    whose worker died, so heartbeat() has to be called regularly too: it
+    rewrites the counters, changed or not, once flush_interval has passed.
+
+    Writes only apply while the job still holds the claim it had when this
+    was created. Once it has been requeued they raise StaleClaim.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        job: ScrapingJob,
+        flush_interval: float = settings.SCRAPER_PROGRESS_FLUSH_INTERVAL,
+        flush_every: int = settings.SCRAPER_PROGRESS_FLUSH_EVERY
+    ):
+        self.session = session
+        self.job = job
+        self.claim_token = job.claim_token
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.products_scraped = job.products_scraped or 0
+        self.errors_count = job.errors_count or 0
+        self.last_error: Optional[str] = job.error_message
+        self.flushes = 0
+        self._pending = 0
+        self._written_at = time.monotonic()
+
+    def add(self, products: int = 0, errors: int = 0, commit: bool = True) -> None:
+        self.products_scraped += products
+        self.errors_count += errors
+        self._record(products + errors, commit)
+
+    def error(self, message: str, commit: bool = True) -> None:
+        self.errors_count += 1
+        self.last_error = message[:MAX_ERROR_MESSAGE_LENGTH]
+        self._record(1, commit)
+
+    def _record(self, updates: int, commit: bool) -> None:
+        self._pending += updates
+        if self._pending >= self.flush_every or time.monotonic() - self._written_at >= self.flush_interval:
+            self.flush(commit)
+
+    def flush(self, commit: bool = True) -> None:
+        """
+        Write the counters if anything changed since the last write. With
+        commit=False the write joins the caller's transaction.
+        """
+        if self._pending:
+            self._write(commit)
+
+    def heartbeat(self) -> None:
+        """Write the counters, and so updated_at, if flush_interval has passed since the last write."""
+        if time.monotonic() - self._written_at >= self.flush_interval:
+            self._write(commit=True)
+
+    def _write(self, commit: bool) -> None:
+        result = self.session.execute(
+            update(ScrapingJob)
+            .where(crud_scraping_job.is_claimed_by(self.job.id, self.claim_token))
+            .values(
+                products_scraped=self.products_scraped,
+                errors_count=self.errors_count,
+                error_message=self.last_error,
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
+        if result.rowcount != 1:
+            raise crud_scraping_job.StaleClaim(f"Scraping job {self.job.id} is no longer held by this claim")
+        if commit:
+            self.session.commit()
+        self._pending = 0
+        self._written_at = time.monotonic()
+        self.flushes += 1
+
+    def finish(self, job_in: ScrapingJobUpdate) -> ScrapingJob:
+        """Acknowledge the job as COMPLETED or FAILED along with its final counts."""
+        self._pending = 0
+        job_in = job_in.model_copy(update={
+            "products_scraped": self.products_scraped,
+            "errors_count": self.errors_count,
+            "error_message": job_in.error_message or self.last_error,
+        })
+        self.job = crud_scraping_job.ack_job(self.session, self.job, self.claim_token, job_in)
+        return self.job
@@ -0,0 +1,244 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, or_, update
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.crud.crud_price import dialect_insert, seen_since
+from app.crud.crud_product import LOOKUP_CHUNK_SIZE
+from app.models.price import Price
+from app.models.scrape_schedule import ScrapeSchedule
+from app.models.scraping_job import ScrapingJob
+
+
+# Incremental scheduling: every (product, supermarket) pair gets a revisit
+# interval from how often its price has changed, and pages that are due are
+# dispatched as ScrapingJobs listing their URLs, most urgent first.
+
+# A prior of half a change per week of history, so a pair seen for a day
+# without changing isn't taken for a price that never moves
+PRIOR_CHANGES = 0.5
+PRIOR_DAYS = 7.0
+SECONDS_PER_DAY = 86400.0
+
+
+class PairHistory(NamedTuple):
+    product_id: int
+    supermarket_id: int
+    url: Optional[str]
+    changes: int
+    first_seen: datetime
+    last_seen: datetime
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def change_rate(changes: int, span_days: float) -> float:
+    """Estimated price changes per day, from the changes seen over span_days."""
+    return (changes + PRIOR_CHANGES) / (max(span_days, 0.0) + PRIOR_DAYS)
+
+
+def revisit_intervals(
+    rates: Sequence[float],
+    daily_budget: float = settings.SCRAPER_DAILY_PAGE_BUDGET,
+    min_hours: float = settings.SCRAPER_MIN_INTERVAL_HOURS,
+    max_hours: float = settings.SCRAPER_MAX_INTERVAL_HOURS
+) -> List[float]:
+    """
+    Revisit intervals in seconds that spend about daily_budget fetches a day.
+    A pair changing rate times a day and checked every I days goes unnoticed
+    for rate * I / 2 changes' worth of time on average; minimising the sum of
+    that over all pairs with sum(1 / I) fixed at the budget gives intervals
+    proportional to 1 / sqrt(rate). Checking proportionally to the rate would
+    spend most of the budget on the few most volatile prices. max_hours
+    wins over the budget: a price must be confirmed before it drops out of
+    comparisons, however stable.
+    """
+    if not rates:
+        return []
+    scale = sum(math.sqrt(rate) for rate in rates) / daily_budget
+    low, high = min_hours * 3600, max_hours * 3600
+    return [min(max(scale / math.sqrt(rate) * SECONDS_PER_DAY, low), high) for rate in rates]
+
+
+def load_histories(session: Session, since: datetime) -> List[PairHistory]:
+    """Per pair seen since the cutoff: its newest URL, how often its price changed and the span observed."""
+    pair = (Price.product_id, Price.supermarket_id)
+    seen = func.coalesce(Price.last_seen_at, Price.scraped_at)
+    ordered = (
+        select(
+            Price.product_id,
+            Price.supermarket_id,
+            Price.url,
+            Price.price,
+            Price.scraped_at,
+            seen.label("seen"),
+            func.lag(Price.price).over(partition_by=pair, order_by=Price.scraped_at).label("previous"),
+            func.row_number().over(partition_by=pair, order_by=Price.scraped_at.desc()).label("recency"),
+        )
+        .where(seen_since(since))
+        .subquery()
+    )
+    statement = (
+        select(
+            ordered.c.product_id,
+            ordered.c.supermarket_id,
+            func.max(case((ordered.c.recency == 1, ordered.c.url))),
+            func.sum(case((ordered.c.previous != ordered.c.price, 1), else_=0)),
+            func.min(ordered.c.scraped_at),
+            func.max(ordered.c.seen),
+        )
+        .group_by(ordered.c.product_id, ordered.c.supermarket_id)
+    )
+    return [
+        PairHistory(product_id, supermarket_id, url, int(changes or 0), _as_utc(first_seen), _as_utc(last_seen))
+        for product_id, supermarket_id, url, changes, first_seen, last_seen in session.execute(statement)
+    ]
+
+
+def refresh_schedule(
+    session: Session,
+    now: Optional[datetime] = None,
+    daily_budget: float = settings.SCRAPER_DAILY_PAGE_BUDGET
+) -> int:
+    """
+    Recompute the change rate, interval and next due time of every pair with
+    prices in the volatility window. Returns the number of pairs scheduled.
+    """
+    now = _as_utc(now or datetime.now(timezone.utc))
+    histories = [
+        history for history in load_histories(session, now - timedelta(days=settings.SCRAPER_VOLATILITY_WINDOW_DAYS))
+        if history.url
+    ]
+    if not histories:
+        return 0
+
+    # Pages checked without a price being stored, such as unchanged ones, count as seen
+    checked: Dict[Tuple[int, int], datetime] = {
+        (product_id, supermarket_id): _as_utc(checked_at)
+        for product_id, supermarket_id, checked_at in session.execute(
+            select(ScrapeSchedule.product_id, ScrapeSchedule.supermarket_id, ScrapeSchedule.checked_at)
+        )
+    }
+    rates = [
+        change_rate(history.changes, (history.last_seen - history.first_seen).total_seconds() / SECONDS_PER_DAY)
+        for history in histories
+    ]
+    rows = []
+    for history, rate, interval in zip(histories, rates, revisit_intervals(rates, daily_budget)):
+        checked_at = max(history.last_seen, checked.get((history.product_id, history.supermarket_id), history.last_seen))
+        rows.append({
+            "product_id": history.product_id,
+            "supermarket_id": history.supermarket_id,
+            "url": history.url,
+            "change_rate": rate,
+            "interval_seconds": interval,
+            "checked_at": checked_at,
+            "next_due_at": checked_at + timedelta(seconds=interval),
+        })
+
+    statement = dialect_insert(session, ScrapeSchedule)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ScrapeSchedule.product_id, ScrapeSchedule.supermarket_id],
+        set_={
+            column: getattr(statement.excluded, column)
+            for column in ("url", "change_rate", "interval_seconds", "checked_at", "next_due_at")
+        },
+    )
+    for start in range(0, len(rows), LOOKUP_CHUNK_SIZE):
+        session.execute(statement, rows[start:start + LOOKUP_CHUNK_SIZE])
+    session.commit()
+    return len(rows)
+
+
+def create_due_jobs(
+    session: Session,
+    now: Optional[datetime] = None,
+    max_urls: int = settings.SCRAPER_JOB_MAX_URLS,
+    max_jobs: Optional[int] = None
+) -> List[ScrapingJob]:
+    """
+    Dispatch the pages that are due as PENDING jobs of up to max_urls URLs
+    each. Pages are ranked by the price changes they have likely missed,
+    change rate times time since checked; each job lists its pages in that
+    order and jobs are created most urgent first, which is the order workers
+    claim them in. Dispatched pages are leased so they aren't dispatched
+    again while their job waits.
+    """
+    now = _as_utc(now or datetime.now(timezone.utc))
+    statement = select(
+        ScrapeSchedule.product_id, ScrapeSchedule.supermarket_id, ScrapeSchedule.url,
+        ScrapeSchedule.change_rate, ScrapeSchedule.checked_at,
+    ).where(ScrapeSchedule.next_due_at <= now).where(
+        or_(ScrapeSchedule.leased_until.is_(None), ScrapeSchedule.leased_until <= now)
+    )
+    due = sorted(
+        session.execute(statement),
+        key=lambda row: row.change_rate * (now - _as_utc(row.checked_at)).total_seconds(),
+        reverse=True,
+    )
+
+    # Several products can share a page: it is fetched once
+    pages: Dict[int, Dict[str, List[Tuple[int, int]]]] = {}
+    for row in due:
+        pages.setdefault(row.supermarket_id, {}).setdefault(row.url, []).append((row.product_id, row.supermarket_id))
+    work: List[Tuple[int, List[str]]] = []
+    for supermarket_id, urls in pages.items():
+        ordered = list(urls)
+        work.extend((supermarket_id, ordered[start:start + max_urls]) for start in range(0, len(ordered), max_urls))
+    # Jobs keep the rank of their most urgent page
+    rank = {(row.supermarket_id, row.url): position for position, row in reversed(list(enumerate(due)))}
+    work.sort(key=lambda job: rank[(job[0], job[1][0])])
+    if max_jobs is not None:
+        work = work[:max_jobs]
+
+    jobs = [ScrapingJob(supermarket_id=supermarket_id, urls=urls) for supermarket_id, urls in work]
+    session.add_all(jobs)
+    leased_until = now + timedelta(hours=settings.SCRAPER_SCHEDULE_LEASE_HOURS)
+    leased = [
+        {"product_id": product_id, "supermarket_id": supermarket_id, "leased_until": leased_until}
+        for supermarket_id, urls in work for url in urls for product_id, supermarket_id in pages[supermarket_id][url]
+    ]
+    if leased:
+        session.execute(update(ScrapeSchedule), leased)
+    session.commit()
+    for job in jobs:
+        session.refresh(job)
+    return jobs
+
+
+def mark_checked(session: Session, supermarket_id: int, urls: Sequence[str], now: Optional[datetime] = None) -> None:
+    """
+    Record that pages were fetched, changed or not: their pairs are due again
+    one interval from now. Not committed here; the engine commits it with the
+    batch the pages belong to.
+    """
+    if not urls:
+        return
+    now = _as_utc(now or datetime.now(timezone.utc))
+    urls = list(dict.fromkeys(urls))
+    rows = []
+    for start in range(0, len(urls), LOOKUP_CHUNK_SIZE):
+        statement = (
+            select(ScrapeSchedule.product_id, ScrapeSchedule.interval_seconds)
+            .where(ScrapeSchedule.supermarket_id == supermarket_id)
+            .where(ScrapeSchedule.url.in_(urls[start:start + LOOKUP_CHUNK_SIZE]))
+        )
+        rows.extend(
+            {
+                "product_id": product_id,
+                "supermarket_id": supermarket_id,
+                "checked_at": now,
+                "next_due_at": now + timedelta(seconds=interval),
+                "leased_until": None,
+            }
+            for product_id, interval in session.execute(statement)
+        )
+    if rows:
+        session.execute(update(ScrapeSchedule), rows)
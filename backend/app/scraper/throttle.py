@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+# Responses faster than this are never a sign of overload, however jittery
+MIN_SLOW_LATENCY = 0.25
+
+class TokenBucket:
+    """Spaces requests to rate per second on average, allowing bursts of up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for a while, as a server's Retry-After asks."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveLimiter:
+    """
+    Request admission for one site: a token bucket caps the request rate and
+    an AIMD window caps the requests in flight. The window grows by about one
+    request per window of successful responses, up to max_concurrency, and
+    halves on a 429, a 5xx, a transport error or a response much slower than
+    the site's usual latency, at most once per round trip. A 429 also halves
+    the rate, which recovers gradually towards max_rate.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_rate: float,
+        burst: float = settings.SCRAPER_RATE_BURST,
+        latency_tolerance: float = settings.SCRAPER_LATENCY_TOLERANCE,
+        max_pause: float = settings.SCRAPER_MAX_RETRY_AFTER
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self.latency_tolerance = latency_tolerance
+        self.max_pause = max_pause
+        self.bucket = TokenBucket(max_rate, max(1.0, burst))
+        self.window = float(min(max_concurrency, settings.SCRAPER_CONCURRENCY))
+        self.in_flight = 0
+        self.decreases = 0
+        # Smoothed latency of answered requests; a slow outlier doesn't move it much
+        self.latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._changed = asyncio.Condition()
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    async def acquire(self) -> float:
+        """Wait for a slot in the window and a token; returns the start time to pass to release."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            await self._release_slot()
+            raise
+        return time.monotonic()
+
+    async def _release_slot(self) -> None:
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+    async def release(self, started: float, status: Optional[int], retry_after: Optional[float] = None) -> float:
+        """Report how a request went, by status or None for a transport error, and return its latency."""
+        now = time.monotonic()
+        elapsed = now - started
+        throttled = status == 429
+        if throttled or status is None or status >= 500:
+            self._decrease(now)
+            if throttled:
+                self.bucket.rate = max(self.max_rate / 64, self.bucket.rate / 2)
+            if retry_after:
+                self.bucket.pause(min(retry_after, self.max_pause))
+        else:
+            if self.latency is not None and elapsed > max(MIN_SLOW_LATENCY, self.latency * self.latency_tolerance):
+                self._decrease(now)
+            else:
+                self.window = min(float(self.max_concurrency), self.window + 1 / self.window)
+                self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 16)
+            # Slow responses count too, so a site that stays slower becomes the new normal
+            self.latency = elapsed if self.latency is None else 0.9 * self.latency + 0.1 * elapsed
+        await self._release_slot()
+        return elapsed
+
+    def _decrease(self, now: float) -> None:
+        # The responses of one overloaded window all come back bad: count them once
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        self.window = max(1.0, self.window / 2)
+        self.decreases += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"concurrency": round(self.window, 2), "rate": round(self.rate, 3)}
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.config import settings
+from app.crud import crud_scraping_job
+from app.models.scraping_job import ScrapingJob
+from app.scraper.engine import ScrapeEngine
+
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Scrapes jobs claimed from the scraping_jobs table, keeping up to `jobs`
+    of them running at once. Any number of workers, in any number of
+    processes or hosts, can share one database: claim_jobs hands each job to
+    exactly one of them.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        jobs: int = settings.SCRAPER_WORKER_JOBS,
+        poll_interval: float = settings.SCRAPER_WORKER_POLL_INTERVAL,
+        job_timeout: float = settings.SCRAPER_JOB_TIMEOUT,
+        engine: Optional[ScrapeEngine] = None
+    ):
+        self.session = session
+        self.jobs = jobs
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.engine = engine or ScrapeEngine(session)
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Claim no more jobs; the running ones are finished first."""
+        self._stopping.set()
+
+    def _claim(self, limit: int):
+        # Jobs of a worker that died are taken back once they stop making progress
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.job_timeout)
+        requeued = crud_scraping_job.requeue_stale_jobs(self.session, stale_before)
+        if requeued:
+            logger.warning("Requeued %s stale scraping jobs", requeued)
+        return crud_scraping_job.claim_jobs(self.session, limit=limit)
+
+    async def run(self, once: bool = False) -> int:
+        """
+        Work until stop() is called, or with once=True until the queue is
+        empty. Returns the number of jobs finished.
+        """
+        async with self.engine.open():
+            return await self._work(once)
+
+    async def _work(self, once: bool) -> int:
+        # The claim token is read as soon as the job is claimed, while it is certainly this worker's
+        running: Dict[asyncio.Task, Tuple[ScrapingJob, Optional[str]]] = {}
+        finished = 0
+        try:
+            while True:
+                if not self._stopping.is_set() and len(running) < self.jobs:
+                    for job in self._claim(self.jobs - len(running)):
+                        logger.info("Claimed scraping job %s", job.id)
+                        running[asyncio.create_task(self.engine.run(job))] = (job, job.claim_token)
+                if not running:
+                    if once or self._stopping.is_set():
+                        return finished
+                    stopping = asyncio.create_task(self._stopping.wait())
+                    await asyncio.wait([stopping], timeout=self.poll_interval)
+                    stopping.cancel()
+                    continue
+
+                # Wake up when a job finishes, or to top up from the queue
+                done, _ = await asyncio.wait(running, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    job, _ = running.pop(task)
+                    try:
+                        task.result()
+                    except crud_scraping_job.StaleClaim:
+                        logger.warning("Scraping job %s was requeued while running; its outcome was dropped", job.id)
+                        continue
+                    finished += 1
+        finally:
+            if running:
+                # Interrupted: jobs that did not finish go back to the queue. Jobs
+                # are only cancelled at an await, never halfway through a write.
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                for job, claim_token in running.values():
+                    if crud_scraping_job.release_job(self.session, job, claim_token):
+                        logger.warning("Released scraping job %s", job.id)
@@ -1,6 +1,13 @@
 import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
 from sqlmodel import Session, create_engine, SQLModel
+from typing import List, NamedTuple
 from app.config import settings
+from app.core.cache import supermarket_cache, category_cache, category_subtree_cache, product_name_cache
+from app.database import get_session
+from app.models import Category, Product, Supermarket
+from app.routers import category, price, product, supermarket, watch
 
 
 @pytest.fixture(scope="session")
@@ -25,4 +32,74 @@ def db_session(engine):
     
     session.close()
     transaction.rollback()
-    connection.close()
\ No newline at end of file
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def client(db_session):
+    app = FastAPI()
+    for module in (category, price, product, supermarket, watch):
+        app.include_router(module.router)
+    # Requests share the test's transaction, so they see its data and are rolled back with it
+    app.dependency_overrides[get_session] = lambda: db_session
+    with TestClient(app) as client:
+        yield client
+
+
+class Catalog(NamedTuple):
+    supermarkets: List[Supermarket]
+    category: Category
+    products: List[Product]
+
+
+@pytest.fixture(scope="function")
+def make_catalog(db_session):
+    """
+    Factory for the Supermarkets, Category and Products that tests build on.
+    The first supermarket is "Test Supermarket" at website_url and the first
+    product a litre of milk; any others are numbered.
+    """
+    def make(supermarkets: int = 1, products: int = 1, website_url: str = "https://example.com") -> Catalog:
+        created_supermarkets = [
+            Supermarket(
+                name="Test Supermarket" if i == 0 else f"Test Supermarket {i}",
+                website_url=website_url if i == 0 else f"https://shop{i}.example.com",
+            )
+            for i in range(supermarkets)
+        ]
+        category = Category(
+            name="Lácteos, huevos y refrigerados",
+            slug="lacteos-huevos-y-refrigerados",
+        )
+        db_session.add_all([*created_supermarkets, category])
+        db_session.commit()
+        db_session.refresh(category)
+
+        created_products = [
+            Product(name="Leche Entera Pasteurizada Colanta (1000ML)", variant="1L", category_id=category.id)
+            if i == 0 else Product(name=f"Test Product {i}", category_id=category.id)
+            for i in range(products)
+        ]
+        db_session.add_all(created_products)
+        db_session.commit()
+        for entity in (*created_supermarkets, *created_products):
+            db_session.refresh(entity)
+
+        return Catalog(created_supermarkets, category, created_products)
+
+    return make
+
+
+@pytest.fixture(scope="function")
+def catalog(make_catalog):
+    """A single Supermarket, Category and Product, as (supermarket, category, product)."""
+    (supermarket,), category, (product,) = make_catalog()
+    return supermarket, category, product
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Rolled back rows must not survive in the in-process caches
+    yield
+    for cache in (supermarket_cache, category_cache, category_subtree_cache, product_name_cache):
+        cache.invalidate()
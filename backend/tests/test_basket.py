@@ -0,0 +1,93 @@
+import pytest
+import itertools
+import numpy as np
+from datetime import timedelta
+from dateutil.parser import parse
+from app.core.basket import build_price_matrix, optimize_basket
+from app.models import Supermarket, Category, Product
+from app.schemas.price import PriceCreate
+from app.crud import crud_price
+
+
+class TestBasketOptimizer:
+    """
+    Tests for the basket optimizer
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def brute_force(self, quantities, rows, max_stores):
+        """Best (missing products, total) over every subset of at most max_stores stores"""
+        product_ids = list(quantities)
+        prices, _ = build_price_matrix(rows, product_ids)
+        costs = prices * np.array([quantities[p] for p in product_ids])[:, None]
+        costs = costs[~np.isinf(costs).all(axis=1)]
+        best = (np.inf, np.inf)
+        for size in range(1, max_stores + 1):
+            for stores in itertools.combinations(range(costs.shape[1]), size):
+                cheapest = costs[:, stores].min(axis=1)
+                best = min(best, (np.isinf(cheapest).sum(), np.where(np.isinf(cheapest), 0, cheapest).sum()))
+        return best
+
+    def test_single_store_and_split(self):
+        """Test that the split picks the cheap store for each product within the store limit"""
+        rows = [
+            (1, 1, 2.0), (2, 1, 9.0), (3, 1, 5.0),
+            (1, 2, 8.0), (2, 2, 3.0), (3, 2, 5.0),
+            (1, 3, 3.0), (2, 3, 4.0), (3, 3, 4.5),
+        ]
+        result = optimize_basket({1: 2, 2: 1, 3: 1}, rows, max_stores=2)
+
+        assert result.single_store.supermarket_ids == [3]
+        assert result.single_store.total == 14.5
+        assert result.split.supermarket_ids == [1, 2]
+        assert result.split.total == 12.0
+        assert {line.product_id: line.supermarket_id for line in result.split.lines} == {1: 1, 2: 2, 3: 1}
+
+    def test_coverage_beats_price(self):
+        """Test that a store missing products loses to one that carries the whole basket"""
+        rows = [(1, 1, 1.0), (1, 2, 5.0), (2, 2, 5.0)]
+        result = optimize_basket({1: 1, 2: 1, 3: 1}, rows, max_stores=1)
+
+        assert result.unavailable_product_ids == [3]
+        assert result.single_store.supermarket_ids == [2]
+        assert result.single_store.missing_product_ids == []
+
+    def test_matches_brute_force(self):
+        """Test the branch and bound against trying every subset of stores"""
+        rng = np.random.default_rng(11)
+        for _ in range(100):
+            quantities = {i + 1: float(rng.integers(1, 4)) for i in range(int(rng.integers(1, 10)))}
+            rows = [
+                (product_id, supermarket_id, float(rng.integers(1, 20)))
+                for product_id in quantities
+                for supermarket_id in range(1, int(rng.integers(2, 8)))
+                if rng.random() < 0.7
+            ]
+            if not rows:
+                continue
+            max_stores = int(rng.integers(1, 4))
+
+            split = optimize_basket(quantities, rows, max_stores).split
+            missing, total = self.brute_force(quantities, rows, max_stores)
+            assert len(split.supermarket_ids) <= max_stores
+            assert len(split.missing_product_ids) == missing
+            assert split.total == pytest.approx(total)
+
+    def test_latest_price_rows(self, db_session):
+        """Test reading the basket matrix rows from the latest prices"""
+        supermarket = Supermarket(name="Test Supermarket", website_url="https://example.com")
+        category = Category(name="Lácteos, huevos y refrigerados", slug="lacteos-huevos-y-refrigerados")
+        db_session.add_all([supermarket, category])
+        db_session.commit()
+        product = Product(name="Leche Entera Pasteurizada Colanta (1000ML)", variant="1L", category_id=category.id)
+        db_session.add(product)
+        db_session.commit()
+
+        crud_price.create_prices_bulk(db_session, [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=4.100, scraped_at=self.scraped_at_dt + timedelta(hours=1)),
+        ])
+
+        rows = crud_price.get_latest_price_rows(db_session, [product.id], since=self.scraped_at_dt)
+        assert rows == [(product.id, supermarket.id, 4.100)]
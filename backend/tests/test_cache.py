@@ -0,0 +1,88 @@
+import pytest
+from app.models import Supermarket
+from app.core.cache import TTLCache, supermarket_cache
+from app.crud import crud_supermarket
+from app.schemas.supermarket import SupermarketUpdate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """
+    Tests for the in-process TTL/LRU cache
+    """
+
+    def test_hits_and_misses(self):
+        """Test that lookups are counted and misses are not cached"""
+        cache = TTLCache("test", maxsize=10, ttl=60)
+        assert cache.get_or_load(1, lambda: None) is None
+        assert cache.get_or_load(1, lambda: "Milk") == "Milk"
+        assert cache.get_or_load(1, lambda: "Eggs") == "Milk"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["size"] == 1
+
+    def test_entries_expire(self):
+        """Test that entries are reloaded once their time to live has passed"""
+        clock = FakeClock()
+        cache = TTLCache("test", maxsize=10, ttl=60, clock=clock)
+        cache.set(1, "Milk")
+
+        clock.now = 59
+        assert cache.get(1) == "Milk"
+        clock.now = 61
+        assert cache.get(1) is None
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the least recently used entry is dropped when full"""
+        cache = TTLCache("test", maxsize=2, ttl=60)
+        cache.set(1, "Milk")
+        cache.set(2, "Eggs")
+        cache.get(1)
+        cache.set(3, "Bread")
+
+        assert cache.get(2) is None
+        assert cache.get(1) == "Milk"
+        assert cache.stats()["evictions"] == 1
+
+    def test_get_many_or_load(self):
+        """Test that all misses are loaded with one call"""
+        cache = TTLCache("test", maxsize=10, ttl=60)
+        cache.set(1, "Milk")
+        calls = []
+
+        def load(missing):
+            calls.append(missing)
+            return {key: f"Product {key}" for key in missing if key != 4}
+
+        assert cache.get_many_or_load([1, 2, 3, 4], load) == {1: "Milk", 2: "Product 2", 3: "Product 3"}
+        assert calls == [{2, 3, 4}]
+
+
+class TestSupermarketCache:
+    """
+    Tests for cached supermarket lookups
+    """
+
+    def test_update_invalidates_cached_supermarket(self, db_session):
+        """Test that a cached supermarket is refreshed after an update"""
+        supermarket = Supermarket(name="Carulla", website_url="https://www.carulla.com")
+        db_session.add(supermarket)
+        db_session.commit()
+        db_session.refresh(supermarket)
+
+        cached = crud_supermarket.get_supermarket_cached(db_session, supermarket.id)
+        assert cached.name == "Carulla"
+        assert crud_supermarket.get_supermarket_cached(db_session, supermarket.id) is cached
+
+        crud_supermarket.update_supermarket(db_session, supermarket, SupermarketUpdate(name="Éxito"))
+        assert crud_supermarket.get_supermarket_cached(db_session, supermarket.id).name == "Éxito"
+        assert supermarket_cache.stats()["hits"] >= 1
@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta, timezone
+from sqlmodel import select
+from app.core.price_stats import get_price_stats
+from app.models import CategoryClosure, Supermarket, Product, Price
+from app.crud import crud_category, crud_product
+from app.schemas.category import CategoryCreate, CategoryUpdate
+
+
+class TestCategoryTree:
+    """
+    Tests for the category closure table and subtree queries
+    """
+
+    def setup_data_for_test(self, db_session):
+        """
+        Aux function to create a category tree with one product per category:
+        Lácteos > (Leches > Deslactosadas, Quesos) and Despensa
+        """
+        dairy = crud_category.create_category(db_session, CategoryCreate(name="Lácteos", slug="lacteos"))
+        milk = crud_category.create_category(db_session, CategoryCreate(name="Leches", slug="leches", parent_id=dairy.id))
+        lactose_free = crud_category.create_category(
+            db_session, CategoryCreate(name="Deslactosadas", slug="deslactosadas", parent_id=milk.id)
+        )
+        cheese = crud_category.create_category(db_session, CategoryCreate(name="Quesos", slug="quesos", parent_id=dairy.id))
+        pantry = crud_category.create_category(db_session, CategoryCreate(name="Despensa", slug="despensa"))
+
+        categories = {"dairy": dairy, "milk": milk, "lactose_free": lactose_free, "cheese": cheese, "pantry": pantry}
+        products = {}
+        for key, category in categories.items():
+            product = Product(name=f"Producto {category.name}", category_id=category.id)
+            db_session.add(product)
+            products[key] = product
+        db_session.commit()
+        for product in products.values():
+            db_session.refresh(product)
+
+        return categories, products
+
+    def closure(self, db_session, category_id):
+        statement = select(CategoryClosure.ancestor_id, CategoryClosure.depth).where(
+            CategoryClosure.descendant_id == category_id
+        )
+        return dict(db_session.exec(statement).all())
+
+    def test_closure_rows(self, db_session):
+        """Test that creating categories records every ancestor with its depth"""
+        categories, _ = self.setup_data_for_test(db_session)
+
+        assert self.closure(db_session, categories["lactose_free"].id) == {
+            categories["lactose_free"].id: 0,
+            categories["milk"].id: 1,
+            categories["dairy"].id: 2,
+        }
+        assert self.closure(db_session, categories["pantry"].id) == {categories["pantry"].id: 0}
+
+        subtree = crud_category.get_subtree_ids(db_session, categories["dairy"].id)
+        assert subtree == sorted(categories[key].id for key in ("dairy", "milk", "lactose_free", "cheese"))
+        assert [category.id for category in crud_category.get_subcategories(db_session, categories["dairy"].id)] == [
+            categories["milk"].id, categories["cheese"].id, categories["lactose_free"].id
+        ]
+        assert crud_category.has_subcategories(db_session, categories["milk"].id)
+        assert not crud_category.has_subcategories(db_session, categories["cheese"].id)
+
+    def test_move_subtree(self, db_session):
+        """Test that changing parent_id moves the whole subtree and refreshes the cached tree"""
+        categories, _ = self.setup_data_for_test(db_session)
+        dairy, milk, pantry = categories["dairy"], categories["milk"], categories["pantry"]
+        assert milk.id in crud_category.get_subtree_ids(db_session, dairy.id)
+
+        crud_category.update_category(db_session, milk, CategoryUpdate(parent_id=pantry.id))
+        assert self.closure(db_session, categories["lactose_free"].id) == {
+            categories["lactose_free"].id: 0,
+            milk.id: 1,
+            pantry.id: 2,
+        }
+        assert crud_category.get_subtree_ids(db_session, dairy.id) == sorted([dairy.id, categories["cheese"].id])
+        assert crud_category.get_subtree_ids(db_session, pantry.id) == sorted(
+            [pantry.id, milk.id, categories["lactose_free"].id]
+        )
+
+        # Back to the root of the tree
+        crud_category.update_category(db_session, milk, CategoryUpdate(parent_id=None))
+        assert self.closure(db_session, categories["lactose_free"].id) == {categories["lactose_free"].id: 0, milk.id: 1}
+        assert milk.parent_id is None
+
+    def test_move_under_own_subtree(self, client, db_session, monkeypatch):
+        """Test that moves into a category's own subtree are refused, even when this process's cached tree is stale"""
+        categories, _ = self.setup_data_for_test(db_session)
+        dairy, milk, pantry = categories["dairy"], categories["milk"], categories["pantry"]
+
+        response = client.put(f"/categories/{dairy.id}", json={"parent_id": categories["lactose_free"].id})
+        assert response.status_code == 400
+        assert client.put(f"/categories/{milk.id}", json={"parent_id": milk.id}).status_code == 400
+
+        # Another process moves milk under pantry: the invalidation never reaches this one
+        assert crud_category.get_subtree_ids(db_session, pantry.id) == [pantry.id]
+        monkeypatch.setattr(crud_category, "_invalidate_tree", lambda: None)
+        crud_category.update_category(db_session, milk, CategoryUpdate(parent_id=pantry.id))
+        assert crud_category.get_subtree_ids(db_session, pantry.id) == [pantry.id]
+
+        response = client.put(f"/categories/{pantry.id}", json={"parent_id": milk.id})
+        assert response.status_code == 400
+        assert self.closure(db_session, pantry.id) == {pantry.id: 0}
+        assert client.put(f"/categories/{milk.id}", json={"parent_id": dairy.id}).status_code == 200
+
+    def test_delete_leaf(self, db_session):
+        """Test that deleting a category removes its closure rows"""
+        categories, products = self.setup_data_for_test(db_session)
+        cheese = categories["cheese"]
+        db_session.delete(products["cheese"])
+        db_session.commit()
+
+        crud_category.delete_category(db_session, cheese.id)
+        assert self.closure(db_session, cheese.id) == {}
+        assert cheese.id not in crud_category.get_subtree_ids(db_session, categories["dairy"].id)
+
+    def test_subtree_products_and_search(self, db_session):
+        """Test that product listing and search can cover a whole subtree"""
+        categories, products = self.setup_data_for_test(db_session)
+        dairy = categories["dairy"]
+
+        only_dairy = crud_product.get_products_by_category(db_session, dairy.id)
+        assert [product.id for product in only_dairy] == [products["dairy"].id]
+        all_dairy = crud_product.get_products_by_category(db_session, dairy.id, include_subcategories=True)
+        assert {product.id for product in all_dairy} == {
+            products[key].id for key in ("dairy", "milk", "lactose_free", "cheese")
+        }
+
+        found = crud_product.search_products(db_session, query="producto", category_id=dairy.id, include_subcategories=True)
+        assert len(found) == 4
+        found = crud_product.search_products(db_session, query="producto", category_id=categories["milk"].id)
+        assert [product.id for product in found] == [products["milk"].id]
+
+    def test_subtree_price_stats(self, db_session):
+        """Test that price statistics can aggregate a whole subtree"""
+        categories, products = self.setup_data_for_test(db_session)
+        supermarket = Supermarket(name="Test Supermarket", website_url="https://example.com")
+        db_session.add(supermarket)
+        db_session.commit()
+        db_session.refresh(supermarket)
+
+        now = datetime.now(timezone.utc)
+        for price, key in enumerate(("dairy", "lactose_free", "pantry"), start=1):
+            db_session.add(Price(
+                product_id=products[key].id, supermarket_id=supermarket.id, price=price * 1000,
+                url="https://example.com/product", scraped_at=now,
+            ))
+        db_session.commit()
+
+        since = now - timedelta(days=1)
+        stats = get_price_stats(db_session, since, category_id=categories["dairy"].id, include_subcategories=True)
+        assert {row.product_id for row in stats} == {products["dairy"].id, products["lactose_free"].id}
+        stats = get_price_stats(db_session, since, category_id=categories["dairy"].id)
+        assert [row.product_id for row in stats] == [products["dairy"].id]
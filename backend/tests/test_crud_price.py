@@ -0,0 +1,326 @@
+import pytest
+from datetime import timedelta
+from sqlmodel import select
+from dateutil.parser import parse
+from app.models import Price, PriceLatest
+from app.schemas.price import PriceCreate, PriceConflict
+from app.crud import crud_price
+
+
+class TestBulkPriceIngestion:
+    """
+    Tests for bulk price ingestion
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def test_create_prices_bulk(self, db_session, catalog):
+        """Test that every valid row is inserted and reported with its ID"""
+        supermarket, _, product = catalog
+
+        prices_in = [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=4.100),
+        ]
+        result = crud_price.create_prices_bulk(db_session, prices_in)
+
+        assert result.accepted == 2
+        assert result.rejected == 0
+        assert [r.index for r in result.results] == [0, 1]
+
+        stored = db_session.get(Price, result.results[0].price_id)
+        assert stored.price == 3.900
+        assert db_session.get(Price, result.results[1].price_id).scraped_at is not None
+
+    def test_create_prices_bulk_rejects_unknown_ids(self, db_session, catalog):
+        """Test that rows pointing at missing products or supermarkets are rejected individually"""
+        supermarket, _, product = catalog
+
+        prices_in = [
+            PriceCreate(product_id=999999, supermarket_id=supermarket.id, price=1.0),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=2.0),
+            PriceCreate(product_id=product.id, supermarket_id=999999, price=3.0),
+        ]
+        result = crud_price.create_prices_bulk(db_session, prices_in)
+
+        assert result.accepted == 1
+        assert result.rejected == 2
+        assert result.results[0].error == "Product not found"
+        assert result.results[1].accepted
+        assert result.results[2].error == "Supermarket not found"
+
+        stored = db_session.exec(select(Price).where(Price.product_id == product.id)).all()
+        assert [p.price for p in stored] == [2.0]
+
+    def test_create_prices_bulk_replay_is_idempotent(self, db_session, catalog):
+        """Test that replaying a batch reports duplicates instead of failing"""
+        supermarket, _, product = catalog
+
+        prices_in = [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=4.000, scraped_at=self.scraped_at_dt),
+        ]
+        first = crud_price.create_prices_bulk(db_session, prices_in)
+        assert first.accepted == 2
+        assert first.duplicates == 1
+        assert first.results[0].price_id == first.results[1].price_id
+
+        replay = crud_price.create_prices_bulk(db_session, prices_in)
+        assert replay.accepted == 2
+        assert replay.duplicates == 2
+
+        stored = db_session.exec(select(Price).where(Price.product_id == product.id)).all()
+        assert [p.price for p in stored] == [3.900]
+
+    def test_create_prices_bulk_update_on_conflict(self, db_session, catalog):
+        """Test that on_conflict=update overwrites the stored observation"""
+        supermarket, _, product = catalog
+
+        price_in = PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt)
+        first = crud_price.create_prices_bulk(db_session, [price_in])
+
+        corrected = price_in.model_copy(update={"price": 3.500})
+        second = crud_price.create_prices_bulk(db_session, [corrected], on_conflict=PriceConflict.UPDATE)
+
+        assert second.results[0].price_id == first.results[0].price_id
+        assert not second.results[0].duplicate
+        db_session.expire_all()
+        assert db_session.get(Price, first.results[0].price_id).price == 3.500
+
+    def test_create_price_twice_returns_existing_row(self, db_session, catalog):
+        """Test that a retried single insert returns the stored row"""
+        supermarket, _, product = catalog
+
+        price_in = PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt)
+        first = crud_price.create_price(db_session, price_in)
+        second = crud_price.create_price(db_session, price_in.model_copy(update={"price": 1.0}))
+
+        assert second.id == first.id
+        assert second.price == 3.900
+
+
+class TestPriceCompaction:
+    """
+    Tests for change-only price storage
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def observation(self, supermarket, product, price, hours):
+        return PriceCreate(
+            product_id=product.id,
+            supermarket_id=supermarket.id,
+            price=price,
+            scraped_at=self.scraped_at_dt + timedelta(hours=hours),
+        )
+
+    def test_unchanged_prices_extend_last_seen(self, db_session, catalog):
+        """Test that repeated prices move last_seen_at instead of adding rows"""
+        supermarket, _, product = catalog
+
+        first = crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 3.900, 0),
+            self.observation(supermarket, product, 3.900, 1),
+        ], compact=True)
+        assert first.compacted == 1
+        assert first.results[0].price_id == first.results[1].price_id
+
+        second = crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 3.900, 2),
+            self.observation(supermarket, product, 4.200, 3),
+            self.observation(supermarket, product, 4.200, 4),
+        ], compact=True)
+        assert second.compacted == 2
+        assert second.results[0].price_id == first.results[0].price_id
+
+        db_session.expire_all()
+        stored = crud_price.get_price_history(db_session, product.id, since=self.scraped_at_dt)
+        assert [(p.price, p.scraped_at.hour, p.last_seen_at.hour) for p in stored] == [(4.200, 3, 4), (3.900, 0, 2)]
+
+    def test_runs_do_not_cross_month_boundaries(self, db_session, catalog):
+        """Test that an unchanged price starts a new row in a new month"""
+        supermarket, _, product = catalog
+
+        result = crud_price.create_prices_bulk(db_session, [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=parse("2022-01-31T20:00:00Z")),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=parse("2022-01-31T22:00:00Z")),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=parse("2022-02-01T02:00:00Z")),
+        ], compact=True)
+
+        assert result.compacted == 1
+        assert result.results[0].price_id == result.results[1].price_id
+        assert result.results[2].price_id != result.results[0].price_id
+
+    def test_compacted_run_matches_history_window(self, db_session, catalog):
+        """Test that a run started before the window is still returned when it was seen inside it"""
+        supermarket, _, product = catalog
+
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 3.900, 0),
+            self.observation(supermarket, product, 3.900, 48),
+        ], compact=True)
+
+        since = self.scraped_at_dt + timedelta(hours=24)
+        stored = crud_price.get_price_history(db_session, product.id, since=since)
+        assert [p.price for p in stored] == [3.900]
+
+    def test_history_version_moves_with_extended_runs(self, db_session, catalog):
+        """Test that the history validator changes when only last_seen_at moves"""
+        supermarket, _, product = catalog
+
+        crud_price.create_prices_bulk(db_session, [self.observation(supermarket, product, 3.900, 0)], compact=True)
+        before = crud_price.get_price_history_version(db_session, product.id, since=self.scraped_at_dt)
+
+        crud_price.create_prices_bulk(db_session, [self.observation(supermarket, product, 3.900, 5)], compact=True)
+        after = crud_price.get_price_history_version(db_session, product.id, since=self.scraped_at_dt)
+
+        assert after[0] == before[0] + 1
+
+        # Repeats of a stored observation change nothing
+        crud_price.create_prices_bulk(db_session, [self.observation(supermarket, product, 3.900, 5)], compact=True)
+        assert crud_price.get_price_history_version(db_session, product.id, since=self.scraped_at_dt) == after
+
+    def test_history_version_moves_with_the_window(self, db_session, catalog):
+        """Test that the history validator changes when a row falls out of the window, without any write"""
+        supermarket, _, product = catalog
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 3.900, 0),
+            self.observation(supermarket, product, 4.100, 10),
+        ], compact=True)
+
+        def version(hours):
+            return crud_price.get_price_history_version(db_session, product.id, since=self.scraped_at_dt + timedelta(hours=hours))
+
+        assert version(-12) == version(0)
+        # The first price drops out of the window
+        assert version(0) != version(5)
+        assert version(5) == version(10)
+        assert version(11)[1] is None
+
+
+class TestLatestPrices:
+    """
+    Tests for the maintained latest-price table
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def test_ingestion_updates_latest_price(self, db_session, catalog):
+        """Test that the newest observation wins, whatever order it arrives in"""
+        supermarket, _, product = catalog
+
+        crud_price.create_price(db_session, PriceCreate(
+            product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt + timedelta(hours=2)
+        ))
+        crud_price.create_prices_bulk(db_session, [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=4.100, scraped_at=self.scraped_at_dt),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=4.300, scraped_at=self.scraped_at_dt + timedelta(hours=1)),
+        ])
+
+        db_session.expire_all()
+        latest = db_session.get(PriceLatest, (product.id, supermarket.id))
+        assert latest.price == 3.900
+
+        crud_price.create_prices_bulk(db_session, [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.500, scraped_at=self.scraped_at_dt + timedelta(hours=3)),
+        ])
+        db_session.expire_all()
+        latest = db_session.get(PriceLatest, (product.id, supermarket.id))
+        assert latest.price == 3.500
+
+    def test_get_latest_prices(self, db_session, catalog):
+        """Test reading latest prices with supermarket names inside the window"""
+        supermarket, _, product = catalog
+
+        crud_price.create_prices_bulk(db_session, [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=3.900, scraped_at=self.scraped_at_dt + timedelta(hours=5)),
+        ], compact=True)
+
+        rows = crud_price.get_latest_prices(db_session, [product.id], since=self.scraped_at_dt + timedelta(hours=4))
+        assert [(latest.price, supermarket_name, product_name) for latest, supermarket_name, product_name in rows] == [
+            (3.900, "Test Supermarket", "Leche Entera Pasteurizada Colanta (1000ML)")
+        ]
+        assert crud_price.get_latest_prices(db_session, [product.id], since=self.scraped_at_dt + timedelta(hours=6)) == []
+
+
+class TestDailyRollups:
+    """
+    Tests for the daily price rollups
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def observation(self, supermarket, product, price, hours):
+        return PriceCreate(
+            product_id=product.id,
+            supermarket_id=supermarket.id,
+            price=price,
+            scraped_at=self.scraped_at_dt + timedelta(hours=hours),
+        )
+
+    def test_rollups_merge_across_batches(self, db_session, catalog):
+        """Test that open, high, low, close and count survive out-of-order batches"""
+        supermarket, _, product = catalog
+
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 4.000, 10),
+            self.observation(supermarket, product, 4.500, 12),
+        ])
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 3.800, 2),
+            self.observation(supermarket, product, 4.200, 20),
+            self.observation(supermarket, product, 5.000, 26),
+        ])
+        # Replays are not counted twice
+        crud_price.create_prices_bulk(db_session, [self.observation(supermarket, product, 4.000, 10)])
+
+        db_session.expire_all()
+        rollups = crud_price.get_daily_price_history(db_session, product.id, since=self.scraped_at_dt)
+        assert [(r.day.day, r.open, r.high, r.low, r.close, r.count) for r in rollups] == [
+            (2, 5.000, 5.000, 5.000, 5.000, 1),
+            (1, 3.800, 4.500, 3.800, 4.200, 4),
+        ]
+
+    def test_compacted_observations_are_counted(self, db_session, catalog):
+        """Test that observations folded into a run still count towards the day"""
+        supermarket, _, product = catalog
+
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 3.900, 0),
+            self.observation(supermarket, product, 3.900, 1),
+            self.observation(supermarket, product, 3.900, 2),
+        ], compact=True)
+
+        rollups = crud_price.get_daily_price_history(db_session, product.id, since=self.scraped_at_dt)
+        assert [(r.open, r.close, r.count) for r in rollups] == [(3.900, 3.900, 3)]
+        assert len(crud_price.get_price_history(db_session, product.id, since=self.scraped_at_dt)) == 1
+
+    def test_replays_with_update_recompute_the_day(self, db_session, catalog):
+        """Test that overwriting a stored price corrects the day's rollup instead of counting it again"""
+        supermarket, _, product = catalog
+
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 10.000, 10),
+            self.observation(supermarket, product, 9.000, 12),
+        ])
+        for _ in range(2):
+            result = crud_price.create_prices_bulk(
+                db_session, [self.observation(supermarket, product, 8.000, 10)], on_conflict=PriceConflict.UPDATE
+            )
+            assert result.accepted == 1
+
+        db_session.expire_all()
+        prices = crud_price.get_price_history(db_session, product.id, since=self.scraped_at_dt)
+        assert sorted(price.price for price in prices) == [8.000, 9.000]
+        rollups = crud_price.get_daily_price_history(db_session, product.id, since=self.scraped_at_dt)
+        assert [(r.open, r.high, r.low, r.close, r.count) for r in rollups] == [(8.000, 9.000, 8.000, 9.000, 2)]
+
+        # Overwriting the close, alongside a new observation of the same day
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 12.000, 12),
+            self.observation(supermarket, product, 7.000, 14),
+        ], on_conflict=PriceConflict.UPDATE)
+        db_session.expire_all()
+        rollups = crud_price.get_daily_price_history(db_session, product.id, since=self.scraped_at_dt)
+        assert [(r.open, r.high, r.low, r.close, r.count) for r in rollups] == [(8.000, 12.000, 7.000, 7.000, 3)]
@@ -0,0 +1,61 @@
+import pytest
+import csv
+import io
+import json
+from datetime import timedelta
+from dateutil.parser import parse
+from app.core.export import iter_price_batches, format_price_batches
+from app.schemas.price import PriceCreate, PriceExportFormat
+from app.crud import crud_price
+
+
+class TestPriceExport:
+    """
+    Tests for streaming price exports
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def load_prices(self, db_session, supermarket, product):
+        crud_price.create_prices_bulk(db_session, [
+            PriceCreate(
+                product_id=product.id,
+                supermarket_id=supermarket.id,
+                price=3.900 + hours,
+                url="https://example.com/leche?a=1,b=2",
+                scraped_at=self.scraped_at_dt + timedelta(hours=hours),
+            )
+            for hours in range(5)
+        ])
+
+    def test_csv_export_in_batches(self, db_session, catalog):
+        """Test that every row is exported once across batches, with a header and UTC timestamps"""
+        supermarket, _, product = catalog
+        self.load_prices(db_session, supermarket, product)
+
+        batches = iter_price_batches(db_session.connection(), supermarket_id=supermarket.id, batch_size=2)
+        text = "".join(format_price_batches(batches, PriceExportFormat.CSV))
+
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert len(rows) == 5
+        first = min(rows, key=lambda row: row["scraped_at"])
+        assert first["scraped_at"] == "2022-01-01T00:00:00.000000Z"
+        assert first["url"] == "https://example.com/leche?a=1,b=2"
+        assert first["last_seen_at"] == ""
+
+    def test_ndjson_export_filters(self, db_session, catalog):
+        """Test NDJSON output and the time window filters"""
+        supermarket, _, product = catalog
+        self.load_prices(db_session, supermarket, product)
+
+        batches = iter_price_batches(
+            db_session.connection(),
+            product_id=product.id,
+            since=self.scraped_at_dt + timedelta(hours=1),
+            until=self.scraped_at_dt + timedelta(hours=3),
+        )
+        lines = "".join(format_price_batches(batches, PriceExportFormat.NDJSON)).splitlines()
+
+        records = [json.loads(line) for line in lines]
+        assert sorted(record["price"] for record in records) == [4.900, 5.900]
+        assert all(record["original_price"] is None for record in records)
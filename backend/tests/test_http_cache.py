@@ -0,0 +1,48 @@
+import pytest
+from datetime import datetime, timezone
+from starlette.requests import Request
+from app.core.http_cache import make_etag, is_not_modified
+
+
+def make_request(headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+class TestConditionalRequests:
+    """
+    Tests for ETag and Last-Modified validation
+    """
+
+    last_modified = datetime(2022, 1, 1, 12, 0, 30, 500000, tzinfo=timezone.utc)
+
+    def test_make_etag_is_strong_and_stable(self):
+        """Test that equal parts give the same quoted ETag and different parts differ"""
+        etag = make_etag("history", 1, 30)
+        assert etag.startswith('"') and etag.endswith('"')
+        assert etag == make_etag("history", 1, 30)
+        assert etag != make_etag("history", 1, 31)
+
+    def test_if_none_match(self):
+        """Test ETag matching, including lists, weak copies and wildcards"""
+        etag = make_etag("compare", 1)
+        assert is_not_modified(make_request({"If-None-Match": etag}), etag)
+        assert is_not_modified(make_request({"If-None-Match": f'"other", W/{etag}'}), etag)
+        assert is_not_modified(make_request({"If-None-Match": "*"}), etag)
+        assert not is_not_modified(make_request({"If-None-Match": '"other"'}), etag)
+        assert not is_not_modified(make_request({}), etag)
+
+    def test_if_modified_since(self):
+        """Test that dates are compared at second precision and ignored when an ETag is sent"""
+        etag = make_etag("compare", 1)
+        assert is_not_modified(make_request({"If-Modified-Since": "Sat, 01 Jan 2022 12:00:30 GMT"}), etag, self.last_modified)
+        assert not is_not_modified(make_request({"If-Modified-Since": "Sat, 01 Jan 2022 12:00:29 GMT"}), etag, self.last_modified)
+        assert not is_not_modified(make_request({"If-Modified-Since": "not a date"}), etag, self.last_modified)
+        assert not is_not_modified(make_request({
+            "If-None-Match": '"other"',
+            "If-Modified-Since": "Sat, 01 Jan 2022 12:00:30 GMT",
+        }), etag, self.last_modified)
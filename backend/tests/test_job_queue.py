@@ -0,0 +1,275 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.crud import crud_scraping_job
+from app.models import Supermarket, ScrapingJob, ScrapingJobStatus
+from app.schemas.scraping_job import ScrapingJobUpdate
+from app.scraper.progress import JobProgress
+from app.scraper.worker import Worker
+
+
+class FakeEngine:
+    """Stands in for ScrapeEngine, completing each job it is given."""
+
+    def __init__(self, session):
+        self.session = session
+        self.seen = []
+
+    @asynccontextmanager
+    async def open(self):
+        yield self
+
+    async def run(self, job):
+        self.seen.append((job.id, job.status))
+        await asyncio.sleep(0)
+        return crud_scraping_job.ack_job(
+            self.session, job, job.claim_token, ScrapingJobUpdate(status=ScrapingJobStatus.COMPLETED, products_scraped=1)
+        )
+
+
+class TestJobQueue:
+    """
+    Tests for claiming and acknowledging scraping jobs
+    """
+
+    def setup_data_for_test(self, db_session, count=3):
+        """Aux function to create a Supermarket with pending ScrapingJobs"""
+        supermarket = Supermarket(
+            name="Test Supermarket",
+            website_url="https://example.com",
+        )
+        db_session.add(supermarket)
+        db_session.commit()
+        db_session.refresh(supermarket)
+
+        jobs = [ScrapingJob(supermarket_id=supermarket.id) for _ in range(count)]
+        for job in jobs:
+            db_session.add(job)
+        db_session.commit()
+        for job in jobs:
+            db_session.refresh(job)
+
+        return supermarket, jobs
+
+    def test_claim_jobs(self, db_session):
+        """Test that claiming takes the oldest pending jobs, each only once"""
+        supermarket, jobs = self.setup_data_for_test(db_session)
+
+        claimed = crud_scraping_job.claim_jobs(db_session, limit=2)
+        assert [job.id for job in claimed] == [jobs[0].id, jobs[1].id]
+        assert all(job.status == ScrapingJobStatus.IN_PROGRESS for job in claimed)
+        assert {job.id for job in crud_scraping_job.get_running_jobs(db_session)} == {jobs[0].id, jobs[1].id}
+
+        claimed = crud_scraping_job.claim_jobs(db_session, limit=2)
+        assert [job.id for job in claimed] == [jobs[2].id]
+        assert crud_scraping_job.claim_jobs(db_session) == []
+
+    def test_ack_and_release(self, db_session):
+        """Test that acknowledged jobs finish, and released jobs can be claimed again"""
+        supermarket, jobs = self.setup_data_for_test(db_session, count=2)
+        first, second = crud_scraping_job.claim_jobs(db_session, limit=2)
+        assert first.claim_token is not None
+
+        first = crud_scraping_job.ack_job(
+            db_session, first, first.claim_token, ScrapingJobUpdate(status=ScrapingJobStatus.COMPLETED)
+        )
+        assert first.status == ScrapingJobStatus.COMPLETED
+        assert first.completed_at is not None
+        with pytest.raises(ValueError):
+            crud_scraping_job.ack_job(
+                db_session, second, second.claim_token, ScrapingJobUpdate(status=ScrapingJobStatus.PENDING)
+            )
+
+        assert crud_scraping_job.release_job(db_session, second, second.claim_token)
+        assert [job.id for job in crud_scraping_job.claim_jobs(db_session)] == [second.id]
+
+    def test_stale_claims(self, db_session):
+        """Test that a worker whose job was requeued and claimed again can no longer finish or release it"""
+        supermarket, (job,) = self.setup_data_for_test(db_session, count=1)
+        (job,) = crud_scraping_job.claim_jobs(db_session)
+        stale_token = job.claim_token
+        stale_progress = JobProgress(db_session, job, flush_interval=0)
+
+        assert crud_scraping_job.requeue_stale_jobs(db_session, datetime.now(timezone.utc) + timedelta(minutes=1)) == 1
+        with pytest.raises(crud_scraping_job.StaleClaim):
+            crud_scraping_job.ack_job(db_session, job, stale_token, ScrapingJobUpdate(status=ScrapingJobStatus.COMPLETED))
+        (job,) = crud_scraping_job.claim_jobs(db_session)
+        assert job.claim_token != stale_token
+
+        with pytest.raises(crud_scraping_job.StaleClaim):
+            crud_scraping_job.ack_job(db_session, job, stale_token, ScrapingJobUpdate(status=ScrapingJobStatus.FAILED))
+        with pytest.raises(crud_scraping_job.StaleClaim):
+            stale_progress.add(products=5)
+        assert not crud_scraping_job.release_job(db_session, job, stale_token)
+        db_session.refresh(job)
+        assert (job.status, job.products_scraped, job.completed_at) == (ScrapingJobStatus.IN_PROGRESS, 0, None)
+
+        # The current holder is unaffected, and can only finish the job once
+        job = crud_scraping_job.ack_job(
+            db_session, job, job.claim_token, ScrapingJobUpdate(status=ScrapingJobStatus.COMPLETED)
+        )
+        assert job.status == ScrapingJobStatus.COMPLETED
+        with pytest.raises(crud_scraping_job.StaleClaim):
+            crud_scraping_job.ack_job(db_session, job, job.claim_token, ScrapingJobUpdate(status=ScrapingJobStatus.FAILED))
+
+    def test_requeue_stale_jobs(self, db_session):
+        """Test that jobs without progress for too long go back to the queue"""
+        supermarket, jobs = self.setup_data_for_test(db_session, count=2)
+        stale, fresh = crud_scraping_job.claim_jobs(db_session, limit=2)
+        db_session.execute(
+            update(ScrapingJob)
+            .where(ScrapingJob.id == stale.id)
+            .values(updated_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        )
+        db_session.commit()
+
+        assert crud_scraping_job.requeue_stale_jobs(db_session, datetime.now(timezone.utc) - timedelta(minutes=15)) == 1
+        assert [job.id for job in crud_scraping_job.claim_jobs(db_session, limit=2)] == [stale.id]
+
+    def test_worker_drains_queue(self, db_session):
+        """Test that a worker runs claimed jobs until the queue is empty"""
+        supermarket, jobs = self.setup_data_for_test(db_session, count=5)
+        engine = FakeEngine(db_session)
+
+        finished = asyncio.run(Worker(db_session, jobs=2, engine=engine, poll_interval=0.01).run(once=True))
+
+        assert finished == 5
+        assert sorted(job_id for job_id, _ in engine.seen) == [job.id for job in jobs]
+        # The engine only ever sees jobs the worker claimed
+        assert {status for _, status in engine.seen} == {ScrapingJobStatus.IN_PROGRESS}
+        for job in jobs:
+            db_session.refresh(job)
+            assert job.status == ScrapingJobStatus.COMPLETED
+
+    def test_worker_drops_stale_outcomes(self, db_session):
+        """Test that a worker whose job was taken over mid-run doesn't record its outcome"""
+        supermarket, (job,) = self.setup_data_for_test(db_session, count=1)
+
+        class TakenOverEngine(FakeEngine):
+            async def run(self, job):
+                claim_token = job.claim_token
+                # Another worker requeues the job as stale and claims it
+                crud_scraping_job.requeue_stale_jobs(self.session, datetime.now(timezone.utc) + timedelta(minutes=1))
+                crud_scraping_job.claim_jobs(self.session)
+                return crud_scraping_job.ack_job(
+                    self.session, job, claim_token, ScrapingJobUpdate(status=ScrapingJobStatus.FAILED)
+                )
+
+        finished = asyncio.run(Worker(db_session, engine=TakenOverEngine(db_session), poll_interval=0.01).run(once=True))
+
+        assert finished == 0
+        db_session.refresh(job)
+        assert job.status == ScrapingJobStatus.IN_PROGRESS
+
+    def test_worker_releases_interrupted_jobs(self, db_session):
+        """Test that jobs still running when a worker is cancelled return to the queue"""
+        supermarket, jobs = self.setup_data_for_test(db_session, count=2)
+
+        class HangingEngine(FakeEngine):
+            async def run(self, job):
+                await asyncio.sleep(3600)
+
+        async def interrupt():
+            task = asyncio.create_task(Worker(db_session, jobs=2, engine=HangingEngine(db_session)).run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(interrupt())
+        for job in jobs:
+            db_session.refresh(job)
+            assert job.status == ScrapingJobStatus.PENDING
+
+
+class TestJobProgress:
+    """
+    Tests for batching a running job's progress writes
+    """
+
+    def setup_data_for_test(self, db_session):
+        """Aux function to create a Supermarket with an IN_PROGRESS ScrapingJob"""
+        supermarket = Supermarket(
+            name="Test Supermarket",
+            website_url="https://example.com",
+        )
+        db_session.add(supermarket)
+        db_session.commit()
+        db_session.refresh(supermarket)
+
+        job = ScrapingJob(supermarket_id=supermarket.id, status=ScrapingJobStatus.IN_PROGRESS, claim_token="0" * 32)
+        db_session.add(job)
+        db_session.commit()
+        db_session.refresh(job)
+
+        return supermarket, job
+
+    def stored(self, db_session, job):
+        db_session.expire(job)
+        return job.products_scraped, job.errors_count, job.error_message
+
+    def test_flush_every(self, db_session):
+        """Test that counters are written once enough updates have built up"""
+        supermarket, job = self.setup_data_for_test(db_session)
+        progress = JobProgress(db_session, job, flush_interval=3600, flush_every=10)
+
+        for _ in range(9):
+            progress.add(products=1)
+        assert self.stored(db_session, job) == (0, 0, None)
+
+        progress.error("https://example.com/p/1: HTTP 404")
+        assert self.stored(db_session, job) == (9, 1, "https://example.com/p/1: HTTP 404")
+        assert progress.flushes == 1
+
+        # Nothing new, nothing written
+        progress.flush()
+        assert progress.flushes == 1
+
+    def test_flush_interval(self, db_session):
+        """Test that counters are written once enough time has passed"""
+        supermarket, job = self.setup_data_for_test(db_session)
+        progress = JobProgress(db_session, job, flush_interval=0, flush_every=1000)
+
+        progress.add(products=5)
+        progress.add(products=2, errors=1)
+        assert self.stored(db_session, job) == (7, 1, None)
+        assert progress.flushes == 2
+
+    def test_heartbeat(self, db_session):
+        """Test that a job whose counters don't move still shows it is alive, once per interval"""
+        supermarket, job = self.setup_data_for_test(db_session)
+        an_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+        db_session.execute(update(ScrapingJob).where(ScrapingJob.id == job.id).values(updated_at=an_hour_ago))
+        db_session.commit()
+        progress = JobProgress(db_session, job, flush_interval=3600, flush_every=1000)
+
+        progress.heartbeat()
+        assert progress.flushes == 0
+        progress.flush_interval = 0
+        progress.heartbeat()
+        assert progress.flushes == 1
+        assert self.stored(db_session, job) == (0, 0, None)
+        assert crud_scraping_job.requeue_stale_jobs(db_session, datetime.now(timezone.utc) - timedelta(minutes=15)) == 0
+        db_session.refresh(job)
+        assert job.status == ScrapingJobStatus.IN_PROGRESS
+
+    def test_finish_writes_pending_progress(self, db_session):
+        """Test that finishing a job writes counters that were never flushed"""
+        supermarket, job = self.setup_data_for_test(db_session)
+        progress = JobProgress(db_session, job, flush_interval=3600, flush_every=1000)
+        progress.add(products=3)
+        progress.error("parse failed")
+
+        job = progress.finish(ScrapingJobUpdate(status=ScrapingJobStatus.FAILED, metrics={"pages": 2}))
+        assert job.status == ScrapingJobStatus.FAILED
+        assert job.completed_at is not None
+        assert self.stored(db_session, job) == (3, 1, "parse failed")
+        assert job.metrics == {"pages": 2}
+        assert progress.flushes == 0
+
+        with pytest.raises(ValueError):
+            progress.finish(ScrapingJobUpdate(status=ScrapingJobStatus.IN_PROGRESS))
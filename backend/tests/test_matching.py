@@ -0,0 +1,124 @@
+from app.core.matching import blocking_key, match_key, normalize_tokens
+from app.models import Category, Product
+from app.crud import crud_product
+from app.schemas.matching import ProductMatchItem, ProductMatchMethod
+from app.schemas.product import ProductUpdate
+
+
+class TestProductMatching:
+    """
+    Tests for batch matching of scraped items to products
+    """
+
+    def setup_data_for_test(self, db_session):
+        """Aux function to create a Category and the Products to match against"""
+        category = Category(
+            name="Lácteos, huevos y refrigerados",
+            slug="lacteos-huevos-y-refrigerados",
+        )
+        other_category = Category(
+            name="Despensa",
+            slug="despensa",
+        )
+        db_session.add(category)
+        db_session.add(other_category)
+        db_session.commit()
+        db_session.refresh(category)
+        db_session.refresh(other_category)
+
+        products = [
+            Product(name="Leche Entera Colanta", variant="1000ML", sku="7702129001", category_id=category.id),
+            Product(name="Leche Entera Colanta", variant="900ML", sku="7702129002", category_id=category.id),
+            Product(name="Leche Deslactosada Alquería", variant="1L", category_id=category.id),
+            Product(name="Huevos AA Rojos", variant="x30", category_id=category.id),
+            Product(name="Arroz Diana", variant="500g", category_id=other_category.id),
+        ]
+        for product in products:
+            db_session.add(product)
+        db_session.commit()
+        for product in products:
+            db_session.refresh(product)
+
+        return category, other_category, products
+
+    def test_normalize_tokens(self):
+        """Test that accents, case and quantity spellings are normalized"""
+        assert normalize_tokens("Leche Entera (1000ML)") == ("leche", "entera", "1000ml")
+        assert normalize_tokens("leche entera 1 L") == ("leche", "entera", "1000ml")
+        assert normalize_tokens("Aceite 1,5 Lt") == ("aceite", "1500ml")
+        assert normalize_tokens("Arroz 1.000 g") == ("arroz", "1000g")
+        assert normalize_tokens("Huevos AA x 30") == ("huevos", "aa", "30un")
+        assert normalize_tokens(None) == ()
+
+        assert blocking_key("AA 12 Huevos") == "huevos"
+        assert match_key("Leche Entera", "1L") == match_key("LECHE entera 1000 ml", None)
+        # Word order doesn't matter to the comparison, only to the block
+        assert match_key("Leche Entera", "1L").tokens == match_key("Entera Leche", "1000cc").tokens
+
+    def test_match_block_is_maintained(self, db_session):
+        """Test that the blocking key follows the product name"""
+        _, _, products = self.setup_data_for_test(db_session)
+        assert products[0].match_block == "leche"
+
+        product = crud_product.update_product(db_session, products[4], ProductUpdate(name="Fríjol Diana"))
+        assert product.match_block == "frijol"
+
+    def test_match_by_sku(self, db_session):
+        """Test that SKUs resolve with full confidence, even with a store's own name"""
+        _, _, products = self.setup_data_for_test(db_session)
+
+        result = crud_product.match_products(db_session, [
+            ProductMatchItem(name="LECHE COLANTA ENTERA BOLSA", sku=" 7702129002 "),
+        ])
+        match = result.matches[0]
+        assert match.product_id == products[1].id
+        assert match.method == ProductMatchMethod.SKU
+        assert match.confidence == 1.0
+
+    def test_match_by_normalized_name(self, db_session):
+        """Test exact matches on name and variant after normalization"""
+        _, _, products = self.setup_data_for_test(db_session)
+
+        result = crud_product.match_products(db_session, [
+            ProductMatchItem(name="LECHE ENTERA COLANTA", variant="1 Litro", sku="UNKNOWN-1"),
+            ProductMatchItem(name="Leche Deslactosada Alqueria 1000 ml"),
+        ])
+        assert [match.product_id for match in result.matches] == [products[0].id, products[2].id]
+        assert all(match.method == ProductMatchMethod.EXACT for match in result.matches)
+        assert all(match.confidence == 0.95 for match in result.matches)
+
+    def test_fuzzy_match(self, db_session):
+        """Test that near misses resolve with a lower confidence, and quantities must agree"""
+        _, _, products = self.setup_data_for_test(db_session)
+
+        result = crud_product.match_products(db_session, [
+            ProductMatchItem(name="Leche Colanta Entera Bolsa", variant="900 ml"),
+            ProductMatchItem(name="Huevos Rojos AA Kikes", variant="x 30 und"),
+            ProductMatchItem(name="Leche de Almendras Silk", variant="946ML"),
+            ProductMatchItem(name="Yogurt Alpina", variant="1L"),
+        ])
+        matches = result.matches
+        assert matches[0].product_id == products[1].id
+        assert matches[0].method == ProductMatchMethod.FUZZY
+        assert 0.6 <= matches[0].confidence < 0.95
+        assert matches[1].product_id == products[3].id
+        assert matches[2].product_id is None
+        assert matches[3].product_id is None
+        assert matches[3].method == ProductMatchMethod.NONE
+        assert (result.matched, result.unmatched) == (2, 2)
+
+    def test_match_category_and_min_score(self, db_session):
+        """Test that a category restricts the candidates and min_score filters weak matches"""
+        category, _, products = self.setup_data_for_test(db_session)
+
+        result = crud_product.match_products(db_session, [
+            ProductMatchItem(name="Arroz Diana", variant="500 gr"),
+            ProductMatchItem(name="Arroz Diana", variant="500 gr", category_id=category.id),
+        ])
+        assert [match.product_id for match in result.matches] == [products[4].id, None]
+
+        item = ProductMatchItem(name="Leche Colanta Entera Bolsa", variant="900 ml")
+        loose = crud_product.match_products(db_session, [item], min_score=0.1).matches[0]
+        strict = crud_product.match_products(db_session, [item], min_score=0.99).matches[0]
+        assert loose.product_id == products[1].id
+        assert strict.product_id is None
@@ -314,42 +314,9 @@ class TestPriceModel:
     scraped_at_str = "2022-01-01T00:00:00Z"
     scraped_at_dt = parse(scraped_at_str)
     
-    def setup_data_for_test(self, db_session):
-        """Aux function to create Supermarket, Category, Product for Price tests"""
-        supermarket = Supermarket(
-            name="Test Supermarket",
-            website_url="https://example.com",
-            logo_url="https://example.com/logo.png",
-        )
-        db_session.add(supermarket)
-        
-        category = Category(
-            name="Lácteos, huevos y refrigerados",
-            slug="lacteos-huevos-y-refrigerados",
-            image_url="https://example.com/image.png"
-        )
-        db_session.add(category)
-        db_session.commit()
-        db_session.refresh(supermarket)
-        db_session.refresh(category)
-
-        product = Product(
-            name="Leche Entera Pasteurizada Colanta (1000ML)",
-            variant="1L",
-            sku="7702129001052UND",
-            description="Leche Entera Pasteurizada Colanta de 1L en bolsa.",
-            image_url="https://example.com/image.png",
-            category_id=category.id
-        )
-        db_session.add(product)
-        db_session.commit()
-        db_session.refresh(product)
-        
-        return supermarket, category, product
-
-    def test_create_price(self, db_session):
+    def test_create_price(self, db_session, catalog):
         """Test creating a price record."""
-        supermarket, _, product = self.setup_data_for_test(db_session)
+        supermarket, _, product = catalog
 
         price = Price(
             product_id=product.id,
@@ -370,9 +337,9 @@ class TestPriceModel:
         assert price.original_price == 4.100
         assert price.scraped_at.replace(tzinfo=None) == self.scraped_at_dt.replace(tzinfo=None)
 
-    def test_read_price(self, db_session):
+    def test_read_price(self, db_session, catalog):
         """Test reading a price record."""
-        supermarket, _, product = self.setup_data_for_test(db_session)
+        supermarket, _, product = catalog
 
         initial_price = Price(
             product_id=product.id,
@@ -392,9 +359,9 @@ class TestPriceModel:
         assert result.product_id == product.id
         assert result.scraped_at.replace(tzinfo=None) == self.scraped_at_dt.replace(tzinfo=None)
 
-    def test_update_price(self, db_session):
+    def test_update_price(self, db_session, catalog):
         """Test updating a price record."""
-        supermarket, _, product = self.setup_data_for_test(db_session)
+        supermarket, _, product = catalog
         
         price = Price(
             product_id=product.id,
@@ -416,9 +383,9 @@ class TestPriceModel:
         assert price.price == 5.000
         assert price.original_price == 6.000
 
-    def test_delete_price(self, db_session):
+    def test_delete_price(self, db_session, catalog):
         """Test deleting a price record."""
-        supermarket, _, product = self.setup_data_for_test(db_session)
+        supermarket, _, product = catalog
         
         price = Price(
             product_id=product.id,
@@ -449,42 +416,9 @@ class TestScrapingJobModel:
     scraped_at_str = "2022-01-01T00:00:00Z"
     scraped_at_dt = parse(scraped_at_str)
     
-    def setup_data_for_test(self, db_session):
-        """Aux function to create Supermarket, Category, Product for Price tests"""
-        supermarket = Supermarket(
-            name="Test Supermarket",
-            website_url="https://example.com",
-            logo_url="https://example.com/logo.png",
-        )
-        db_session.add(supermarket)
-        
-        category = Category(
-            name="Lácteos, huevos y refrigerados",
-            slug="lacteos-huevos-y-refrigerados",
-            image_url="https://example.com/image.png"
-        )
-        db_session.add(category)
-        db_session.commit()
-        db_session.refresh(supermarket)
-        db_session.refresh(category)
-
-        product = Product(
-            name="Leche Entera Pasteurizada Colanta (1000ML)",
-            variant="1L",
-            sku="7702129001052UND",
-            description="Leche Entera Pasteurizada Colanta de 1L en bolsa.",
-            image_url="https://example.com/image.png",
-            category_id=category.id
-        )
-        db_session.add(product)
-        db_session.commit()
-        db_session.refresh(product)
-        
-        return supermarket, category, product
-    
-    def test_create_scraping_job(self, db_session):
+    def test_create_scraping_job(self, db_session, catalog):
         """Test creating a scraping job record."""
-        supermarket, _, _ = self.setup_data_for_test(db_session)
+        supermarket, _, _ = catalog
 
         scraping_job = ScrapingJob(
             supermarket_id=supermarket.id,
@@ -505,9 +439,9 @@ class TestScrapingJobModel:
         assert scraping_job.errors_count == 0
         assert scraping_job.error_message is None
 
-    def test_read_scraping_job(self, db_session):
+    def test_read_scraping_job(self, db_session, catalog):
         """Test reading a scraping job record."""
-        supermarket, _, _ = self.setup_data_for_test(db_session)
+        supermarket, _, _ = catalog
 
         initial_job = ScrapingJob(
             supermarket_id=supermarket.id,
@@ -529,9 +463,9 @@ class TestScrapingJobModel:
         assert result.errors_count == 1
         assert result.error_message == "Sample error"
 
-    def test_update_scraping_job(self, db_session):
+    def test_update_scraping_job(self, db_session, catalog):
         """Test updating a scraping job record."""
-        supermarket, _, _ = self.setup_data_for_test(db_session)
+        supermarket, _, _ = catalog
         
         scraping_job = ScrapingJob(
             supermarket_id=supermarket.id,
@@ -558,9 +492,9 @@ class TestScrapingJobModel:
         assert scraping_job.errors_count == 0
         assert scraping_job.error_message == "No errors"
 
-    def test_delete_scraping_job(self, db_session):
+    def test_delete_scraping_job(self, db_session, catalog):
         """Test deleting a scraping job record."""
-        supermarket, _, _ = self.setup_data_for_test(db_session)
+        supermarket, _, _ = catalog
         
         scraping_job = ScrapingJob(
             supermarket_id=supermarket.id,
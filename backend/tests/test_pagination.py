@@ -0,0 +1,68 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from dateutil.parser import parse
+from app.core.pagination import InvalidCursor, encode_cursor, decode_cursor
+from app.models import Supermarket, Product
+from app.schemas.price import PriceCreate
+from app.crud import crud_price, crud_supermarket
+
+
+class TestCursorPagination:
+    """
+    Tests for keyset cursor pagination
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode back to the values they were made from"""
+        scraped_at = datetime(2022, 1, 1, 12, 30, tzinfo=timezone.utc)
+        assert decode_cursor(encode_cursor(scraped_at, 42), datetime, int) == (scraped_at, 42)
+        # Naive datetimes are taken as UTC
+        assert decode_cursor(encode_cursor(datetime(2022, 1, 1), 1), datetime, int)[0] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+    def test_invalid_cursor(self):
+        """Test that tampered or mismatched cursors are rejected"""
+        with pytest.raises(InvalidCursor):
+            decode_cursor("not a cursor", int)
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(1, 2), int)
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor("x"), int)
+
+    def test_recent_prices_pages_without_gaps(self, db_session, catalog):
+        """Test that walking pages by (scraped_at, id) returns every row once, ties included"""
+        supermarket, category, product = catalog
+        other = Product(name="Huevos AA", variant="30 und", category_id=category.id)
+        db_session.add(other)
+        db_session.commit()
+        db_session.refresh(other)
+
+        prices_in = [
+            PriceCreate(product_id=product_id, supermarket_id=supermarket.id, price=float(hours), scraped_at=self.scraped_at_dt + timedelta(hours=hours))
+            for hours in range(3)
+            for product_id in (product.id, other.id)
+        ]
+        crud_price.create_prices_bulk(db_session, prices_in)
+
+        seen, after = [], None
+        while True:
+            page = crud_price.get_recent_prices(db_session, since=self.scraped_at_dt, limit=4, after=after)
+            seen.extend(price.id for price in page)
+            if len(page) < 4:
+                break
+            after = decode_cursor(encode_cursor(page[-1].scraped_at, page[-1].id), datetime, int)
+
+        assert len(seen) == len(set(seen)) == 6
+        stored = crud_price.get_recent_prices(db_session, since=self.scraped_at_dt)
+        assert seen == [price.id for price in stored]
+
+    def test_supermarkets_after_id(self, db_session):
+        """Test that after_id continues from the last ID of the previous page"""
+        first = Supermarket(name="Exito", website_url="https://exito.com")
+        second = Supermarket(name="Carulla", website_url="https://carulla.com")
+        db_session.add_all([first, second])
+        db_session.commit()
+
+        page = crud_supermarket.get_supermarkets(db_session, limit=1, after_id=first.id)
+        assert [s.id for s in page] == [second.id]
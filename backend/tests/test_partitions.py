@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from datetime import datetime, timezone
+from dateutil.parser import parse
+from sqlalchemy import text
+from app.core.partitions import (
+    month_start, add_months, price_partition_name, create_price_partitions, drop_price_partitions, is_price_partition,
+)
+from app import main
+
+
+class TestPricePartitions:
+    """
+    Tests for monthly price partition helpers
+    """
+
+    def test_month_start(self):
+        """Test that any instant maps to the first instant of its UTC month"""
+        assert month_start(parse("2024-03-31T23:30:00-05:00")) == datetime(2024, 4, 1, tzinfo=timezone.utc)
+        assert month_start(datetime(2024, 3, 15, 12, 0)) == datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+    def test_add_months_wraps_years(self):
+        """Test that adding months rolls over into the next year"""
+        assert add_months(datetime(2024, 11, 1, tzinfo=timezone.utc), 3) == datetime(2025, 2, 1, tzinfo=timezone.utc)
+        assert add_months(datetime(2024, 1, 1, tzinfo=timezone.utc), -1) == datetime(2023, 12, 1, tzinfo=timezone.utc)
+
+    def test_price_partition_name(self):
+        """Test partition naming"""
+        assert price_partition_name(datetime(2024, 3, 1, tzinfo=timezone.utc)) == "prices_y2024m03"
+
+    def test_is_price_partition(self):
+        """Test that monthly and default partitions are told apart from other tables"""
+        assert is_price_partition(price_partition_name(datetime(2024, 3, 1)))
+        assert is_price_partition("prices_default")
+        assert not is_price_partition("prices")
+        assert not is_price_partition("prices_daily")
+        assert not is_price_partition("prices_y2024m03_old")
+
+    def test_maintenance_survives_failures(self, monkeypatch):
+        """Test that a failed maintenance run is retried instead of ending the task"""
+        calls = []
+
+        def ensure_price_partitions(engine):
+            calls.append(engine)
+            if len(calls) == 1:
+                raise RuntimeError("lock timeout")
+
+        monkeypatch.setattr(main, "ensure_price_partitions", ensure_price_partitions)
+
+        async def run():
+            task = asyncio.create_task(main.maintain_price_partitions(interval=0))
+            while len(calls) < 3:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert len(calls) >= 3
+
+    def test_default_partition_rows(self, db_session):
+        """Test that rows caught by the default partition move to their month's partition, and retention clears them"""
+        connection = db_session.connection()
+        if connection.dialect.name != "postgresql":
+            pytest.skip("Price partitioning is PostgreSQL only")
+        # A partitioned prices table for the length of the test transaction
+        connection.execute(text("ALTER TABLE prices RENAME TO prices_plain"))
+        connection.execute(text("CREATE TABLE prices (LIKE prices_plain INCLUDING DEFAULTS) PARTITION BY RANGE (scraped_at)"))
+        connection.execute(text("CREATE TABLE prices_default PARTITION OF prices DEFAULT"))
+        assert create_price_partitions(connection, parse("2024-01-01T00:00:00Z"), parse("2024-02-01T00:00:00Z")) == [
+            "prices_y2024m01"
+        ]
+        for scraped_at in ("2023-06-01", "2024-01-15", "2024-03-10", "2024-03-20"):
+            connection.execute(
+                text("INSERT INTO prices (product_id, supermarket_id, price, scraped_at) VALUES (1, 1, 1.0, :scraped_at)"),
+                {"scraped_at": parse(f"{scraped_at}T00:00:00Z")},
+            )
+
+        def count(table):
+            return connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+        # The missed month is created with the rows that fell through to the default partition
+        assert create_price_partitions(connection, parse("2024-03-01T00:00:00Z"), parse("2024-04-01T00:00:00Z")) == [
+            "prices_y2024m03"
+        ]
+        assert count("prices_y2024m03") == 2
+        assert count("prices_default") == 1
+
+        assert drop_price_partitions(connection, parse("2024-02-01T00:00:00Z")) == ["prices_y2024m01"]
+        assert count("prices_default") == 0
+        assert count("prices") == 2
@@ -0,0 +1,186 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import select
+
+from app.crud import crud_price
+from app.models import Price
+from app.routers import price as price_router
+from app.routers.price import MAX_NDJSON_LINE_BYTES, _iter_ndjson_lines
+from app.schemas.price import PriceConflict, PriceCreate
+
+
+class ChunkedRequest:
+    """Stands in for a Request whose body arrives in the given chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def read_lines(chunks):
+    async def collect():
+        return [line async for line in _iter_ndjson_lines(ChunkedRequest(chunks))]
+    return asyncio.run(collect())
+
+
+class TestPriceStream:
+    """
+    Tests for NDJSON price ingestion on POST /prices/stream
+    """
+
+    def price_line(self, product, supermarket, price, day):
+        return json.dumps({
+            "product_id": product.id,
+            "supermarket_id": supermarket.id,
+            "price": price,
+            "scraped_at": f"2022-01-{day:02d}T00:00:00Z",
+        })
+
+    def test_lines_across_chunks(self):
+        """Test that lines are split wherever the chunk boundaries fall"""
+        assert read_lines([b'{"a"', b': 1}\n{"b": 2}\n\n{"c"', b": 3}"]) == [
+            (1, b'{"a": 1}'), (2, b'{"b": 2}'), (3, b""), (4, b'{"c": 3}'),
+        ]
+        assert read_lines([b"x\n", b""]) == [(1, b"x")]
+
+    def test_oversized_lines(self):
+        """Test that an oversized line is reported once, however many chunks it spans"""
+        huge = b"x" * (MAX_NDJSON_LINE_BYTES // 2)
+        assert read_lines([b"a\n", huge, huge, huge, b"\nb\n"]) == [(1, b"a"), (2, None), (3, b"b")]
+        assert read_lines([b"a\n" + huge * 3]) == [(1, b"a"), (2, None)]
+
+    def test_stream_prices(self, client, db_session, catalog):
+        """Test that valid lines are stored and invalid ones reported by line number"""
+        supermarket, _, product = catalog
+        body = "\n".join([
+            self.price_line(product, supermarket, 4500.0, 1),
+            "",
+            "not json",
+            json.dumps({"product_id": product.id, "supermarket_id": supermarket.id, "price": -1}),
+            "x" * (MAX_NDJSON_LINE_BYTES + 1),
+            # The last line has no trailing newline
+            self.price_line(product, supermarket, 4700.0, 2),
+        ])
+
+        response = client.post("/prices/stream", content=body.encode())
+
+        assert response.status_code == 201
+        result = response.json()
+        assert (result["lines"], result["accepted"], result["rejected"]) == (6, 2, 3)
+        assert [error["line"] for error in result["errors"]] == [3, 4, 5]
+        assert result["errors"][2]["error"] == f"Line exceeds {MAX_NDJSON_LINE_BYTES} bytes"
+        prices = db_session.exec(select(Price.price).where(Price.product_id == product.id)).all()
+        assert sorted(prices) == [4500.0, 4700.0]
+
+    def test_stream_batches(self, client, db_session, catalog, monkeypatch):
+        """Test that lines are ingested in batches of batch_size"""
+        supermarket, _, product = catalog
+        batches = []
+        create_prices_bulk = crud_price.create_prices_bulk
+
+        def record_batch(session, prices_in, **kwargs):
+            batches.append(len(prices_in))
+            return create_prices_bulk(session, prices_in, **kwargs)
+
+        monkeypatch.setattr(price_router.crud_price, "create_prices_bulk", record_batch)
+        body = "\n".join(self.price_line(product, supermarket, 4000.0 + day, day) for day in range(1, 8)) + "\n"
+
+        response = client.post("/prices/stream?batch_size=3", content=body.encode())
+
+        assert response.status_code == 201
+        assert response.json()["accepted"] == 7
+        assert batches == [3, 3, 1]
+
+
+class TestPriceHistoryCaching:
+    """
+    Tests for conditional requests on GET /prices/product/{id}/history
+    """
+
+    def setup_data_for_test(self, db_session, catalog):
+        """Aux function to give the catalog's Product two Prices"""
+        supermarket, _, product = catalog
+        self.scraped_at = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=2)
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 4500.0, 0),
+            self.observation(supermarket, product, 4700.0, 1),
+        ])
+        return supermarket, product
+
+    def observation(self, supermarket, product, price, hours, url=None):
+        return PriceCreate(
+            product_id=product.id,
+            supermarket_id=supermarket.id,
+            price=price,
+            url=url,
+            scraped_at=self.scraped_at + timedelta(hours=hours),
+        )
+
+    def test_not_modified(self, client, db_session, catalog):
+        """Test that a request with the current ETag gets an empty 304"""
+        _, product = self.setup_data_for_test(db_session, catalog)
+        url = f"/prices/product/{product.id}/history"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert [price["price"] for price in response.json()] == [4700.0, 4500.0]
+        etag = response.headers["ETag"]
+        assert "Last-Modified" not in response.headers
+
+        cached = client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["ETag"] == etag
+        # Each resolution and range is a different representation
+        assert client.get(f"{url}?days=7", headers={"If-None-Match": etag}).status_code == 200
+        assert client.get(f"{url}?resolution=daily", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_overwrites_change_the_etag(self, client, db_session, catalog):
+        """Test that overwriting only a price's url, or swapping prices around, is a new version"""
+        supermarket, product = self.setup_data_for_test(db_session, catalog)
+        url = f"/prices/product/{product.id}/history"
+        etag = client.get(url).headers["ETag"]
+
+        crud_price.create_prices_bulk(
+            db_session, [self.observation(supermarket, product, 4500.0, 0, url="https://example.com/leche")],
+            on_conflict=PriceConflict.UPDATE,
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()[1]["url"] == "https://example.com/leche"
+        etag = response.headers["ETag"]
+
+        # Same count, newest observation and price sum
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 4700.0, 0, url="https://example.com/leche"),
+            self.observation(supermarket, product, 4500.0, 1),
+        ], on_conflict=PriceConflict.UPDATE)
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert [price["price"] for price in response.json()] == [4500.0, 4700.0]
+
+    def test_daily_not_modified(self, client, db_session, catalog):
+        """Test that daily rollups are validated too, and change when a price is overwritten"""
+        supermarket, product = self.setup_data_for_test(db_session, catalog)
+        url = f"/prices/product/{product.id}/history?resolution=daily"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        crud_price.create_prices_bulk(
+            db_session, [self.observation(supermarket, product, 4600.0, 1)], on_conflict=PriceConflict.UPDATE
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_unknown_product(self, client):
+        """Test that a missing product is a 404 rather than an empty, cacheable history"""
+        assert client.get("/prices/product/999999/history").status_code == 404
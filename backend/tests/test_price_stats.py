@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+from datetime import timedelta
+from dateutil.parser import parse
+from app.core.price_stats import PRICE_WINDOW_DTYPE, compute_price_stats, get_price_stats
+from app.models import Supermarket
+from app.schemas.price import PriceCreate
+from app.crud import crud_price
+
+
+class TestPriceStats:
+    """
+    Tests for vectorized price statistics
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def test_matches_per_product_numpy(self):
+        """Test that the single vectorized pass agrees with NumPy applied to each product on its own"""
+        rng = np.random.default_rng(7)
+        window = np.zeros(5000, dtype=PRICE_WINDOW_DTYPE)
+        window["product_id"] = rng.integers(1, 200, size=len(window))
+        window["supermarket_id"] = rng.integers(1, 6, size=len(window))
+        window["price"] = rng.uniform(1, 50, size=len(window))
+
+        stats = compute_price_stats(window)
+
+        for i, product_id in enumerate(stats["product_id"]):
+            rows = window[window["product_id"] == product_id]
+            prices = rows["price"]
+            assert stats["count"][i] == len(prices)
+            assert stats["mean"][i] == pytest.approx(prices.mean())
+            assert stats["median"][i] == pytest.approx(np.median(prices))
+            assert stats["std"][i] == pytest.approx(prices.std())
+            assert stats["p90"][i] == pytest.approx(np.percentile(prices, 90))
+            assert stats["min"][i] == prices.min() and stats["max"][i] == prices.max()
+
+            store_means = [prices[rows["supermarket_id"] == s].mean() for s in np.unique(rows["supermarket_id"])]
+            assert stats["stores"][i] == len(store_means)
+            assert stats["store_spread"][i] == pytest.approx(max(store_means) - min(store_means))
+
+    def test_empty_window(self):
+        """Test that an empty window gives no statistics"""
+        assert len(compute_price_stats(np.zeros(0, dtype=PRICE_WINDOW_DTYPE))["product_id"]) == 0
+
+    def test_get_price_stats(self, db_session, catalog):
+        """Test statistics across supermarkets from stored prices"""
+        supermarket, _, product = catalog
+        other = Supermarket(name="Other Supermarket", website_url="https://other.example.com")
+        db_session.add(other)
+        db_session.commit()
+        db_session.refresh(other)
+
+        crud_price.create_prices_bulk(db_session, [
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=4.0, scraped_at=self.scraped_at_dt),
+            PriceCreate(product_id=product.id, supermarket_id=supermarket.id, price=6.0, scraped_at=self.scraped_at_dt + timedelta(hours=1)),
+            PriceCreate(product_id=product.id, supermarket_id=other.id, price=8.0, scraped_at=self.scraped_at_dt),
+        ])
+
+        stats = get_price_stats(db_session, since=self.scraped_at_dt, product_ids=[product.id])
+        assert len(stats) == 1
+        assert stats[0].count == 3
+        assert stats[0].stores == 2
+        assert stats[0].mean == pytest.approx(6.0)
+        assert stats[0].median == pytest.approx(6.0)
+        assert stats[0].store_spread == pytest.approx(3.0)
+        assert stats[0].cv == pytest.approx(stats[0].std / 6.0)
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlmodel import select
+
+from app.config import Settings, settings
+from app.models import Price, ScrapeSchedule, ScrapingJobStatus
+from app.scraper.scheduler import change_rate, create_due_jobs, mark_checked, refresh_schedule, revisit_intervals
+
+
+def as_utc(value):
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class TestScheduler:
+    """
+    Tests for the volatility-driven revisit schedule
+    """
+
+    def add_schedule(self, db_session, product, supermarket, url, rate, checked_at, due_at):
+        db_session.add(ScrapeSchedule(
+            product_id=product.id,
+            supermarket_id=supermarket.id,
+            url=url,
+            change_rate=rate,
+            interval_seconds=3600.0,
+            checked_at=checked_at,
+            next_due_at=due_at,
+        ))
+
+    def test_revisit_intervals(self):
+        """Test that intervals spend the daily budget, checking volatile prices more often"""
+        rates = [change_rate(changes, 30.0) for changes in (0, 3, 30)]
+        assert rates[0] < rates[1] < rates[2]
+
+        intervals = revisit_intervals(rates, daily_budget=2.0, min_hours=0.01, max_hours=10000.0)
+        assert intervals[0] > intervals[1] > intervals[2]
+        assert sum(86400 / interval for interval in intervals) == pytest.approx(2.0)
+        # Square-root allocation: four times the volatility, half the interval
+        doubled = revisit_intervals([0.1, 0.4], daily_budget=1.0, min_hours=0.01, max_hours=10000.0)
+        assert doubled[0] == pytest.approx(2 * doubled[1])
+
+        # Bounded either way
+        assert revisit_intervals([100.0, 0.0001], daily_budget=1000.0, min_hours=1.0, max_hours=24.0) == [3600.0, 86400.0]
+        assert revisit_intervals([]) == []
+
+    def test_stable_prices_stay_fresh(self):
+        """Test that prices that never change are still checked before they drop out of comparisons"""
+        never_changed = change_rate(0, settings.SCRAPER_VOLATILITY_WINDOW_DAYS)
+        [interval] = revisit_intervals([never_changed], daily_budget=1.0)
+        assert interval == settings.SCRAPER_MAX_INTERVAL_HOURS * 3600
+        assert interval < settings.PRICE_FRESHNESS_HOURS * 3600
+
+        with pytest.raises(ValidationError):
+            Settings(DATABASE_URL="sqlite://", SECRET_KEY="x", SCRAPER_MAX_INTERVAL_HOURS=336.0)
+
+    def test_refresh_schedule(self, db_session, make_catalog):
+        """Test that change rates come from the price history and set when each pair is due"""
+        (supermarket, _), _, (volatile, stable, unseen) = make_catalog(supermarkets=2, products=3)
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        for day in range(10, 0, -1):
+            db_session.add(Price(
+                product_id=volatile.id, supermarket_id=supermarket.id, price=100.0 + 10 * (day % 2),
+                url=f"https://shop.example.com/volatile?v={day}", scraped_at=now - timedelta(days=day),
+            ))
+        # One compacted row: the same price all along
+        db_session.add(Price(
+            product_id=stable.id, supermarket_id=supermarket.id, price=50.0, url="https://shop.example.com/stable",
+            scraped_at=now - timedelta(days=10), last_seen_at=now - timedelta(days=1),
+        ))
+        db_session.commit()
+
+        assert refresh_schedule(db_session, now=now, daily_budget=10.0) == 2
+        schedules = {row.product_id: row for row in db_session.exec(select(ScrapeSchedule)).all()}
+        assert set(schedules) == {volatile.id, stable.id}
+        fast, slow = schedules[volatile.id], schedules[stable.id]
+        assert fast.change_rate == pytest.approx(change_rate(9, 9.0))
+        assert slow.change_rate == pytest.approx(change_rate(0, 9.0))
+        assert fast.interval_seconds < slow.interval_seconds
+        # The newest URL is the one to fetch
+        assert fast.url == "https://shop.example.com/volatile?v=1"
+        assert as_utc(slow.checked_at) == now - timedelta(days=1)
+        assert as_utc(slow.next_due_at) == now - timedelta(days=1) + timedelta(seconds=slow.interval_seconds)
+
+        # A later check without a new price, as for an unchanged page, is kept
+        fast.checked_at = now
+        db_session.add(fast)
+        db_session.commit()
+        refresh_schedule(db_session, now=now, daily_budget=10.0)
+        db_session.refresh(fast)
+        assert as_utc(fast.checked_at) == now
+        assert as_utc(fast.next_due_at) == now + timedelta(seconds=fast.interval_seconds)
+
+    def test_create_due_jobs(self, db_session, make_catalog):
+        """Test that due pages become jobs in priority order, and aren't dispatched twice"""
+        (shop, other), _, products = make_catalog(supermarkets=2, products=4)
+        now = datetime.now(timezone.utc)
+        hour = timedelta(hours=1)
+        self.add_schedule(db_session, products[0], shop, "https://shop.example.com/a", 0.1, now - 10 * hour, now - hour)
+        self.add_schedule(db_session, products[1], shop, "https://shop.example.com/b", 2.0, now - 10 * hour, now - hour)
+        # Two products on one page: the page is fetched once
+        self.add_schedule(db_session, products[2], shop, "https://shop.example.com/b", 0.1, now - 10 * hour, now - hour)
+        self.add_schedule(db_session, products[0], other, "https://other.example.com/a", 1.0, now - 10 * hour, now - hour)
+        self.add_schedule(db_session, products[3], shop, "https://shop.example.com/d", 5.0, now - hour, now + hour)
+        db_session.commit()
+
+        jobs = create_due_jobs(db_session, now=now, max_urls=1)
+        assert [(job.supermarket_id, job.urls) for job in jobs] == [
+            (shop.id, ["https://shop.example.com/b"]),
+            (other.id, ["https://other.example.com/a"]),
+            (shop.id, ["https://shop.example.com/a"]),
+        ]
+        assert all(job.status == ScrapingJobStatus.PENDING for job in jobs)
+        assert [job.id for job in jobs] == sorted(job.id for job in jobs)
+
+        # Leased until their jobs check them, or the lease runs out
+        assert create_due_jobs(db_session, now=now) == []
+        later = create_due_jobs(db_session, now=now + timedelta(days=1))
+        assert [(job.supermarket_id, sorted(job.urls)) for job in later] == [
+            (shop.id, ["https://shop.example.com/a", "https://shop.example.com/b", "https://shop.example.com/d"]),
+            (other.id, ["https://other.example.com/a"]),
+        ]
+        assert later[0].urls[0] == "https://shop.example.com/d"
+
+    def test_mark_checked(self, db_session, make_catalog):
+        """Test that checked pages are due again one interval later, with their lease cleared"""
+        (shop, other), _, products = make_catalog(supermarkets=2, products=2)
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.add_schedule(db_session, products[0], shop, "https://shop.example.com/a", 1.0, now - timedelta(days=1), now)
+        self.add_schedule(db_session, products[1], shop, "https://shop.example.com/a", 1.0, now - timedelta(days=1), now)
+        self.add_schedule(db_session, products[0], other, "https://shop.example.com/a", 1.0, now - timedelta(days=1), now)
+        db_session.commit()
+        create_due_jobs(db_session, now=now)
+
+        mark_checked(db_session, shop.id, ["https://shop.example.com/a", "https://shop.example.com/a"], now=now)
+        db_session.commit()
+        for row in db_session.exec(select(ScrapeSchedule)).all():
+            db_session.refresh(row)
+            if row.supermarket_id == shop.id:
+                assert as_utc(row.checked_at) == now
+                assert as_utc(row.next_due_at) == now + timedelta(hours=1)
+                assert row.leased_until is None
+            else:
+                assert as_utc(row.checked_at) == now - timedelta(days=1)
+                assert row.leased_until is not None
@@ -0,0 +1,438 @@
+import asyncio
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import select
+
+from app.config import settings
+from app.crud import crud_page_cache
+from app.models import Product, Price, PriceLatest, ScrapeSchedule, ScrapingJob, ScrapingJobStatus
+from app.scraper import engine as scrape_engine
+from app.scraper.engine import ScrapeEngine
+from app.scraper.extractors import (
+    EXTRACTORS, Extractor, JsonLdExtractor, PageResult, ScrapedItem, get_extractor, register_extractor,
+)
+from app.scraper.page_store import PageStore, content_hash
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "scraper"
+
+
+@pytest.fixture(autouse=True)
+def page_store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SCRAPER_PAGE_STORE_DIR", tmp_path / "pages")
+    return tmp_path / "pages"
+
+
+@pytest.fixture
+def stub_site():
+    """
+    A local HTTP server for scrapers to crawl. Routes map a path to a list of
+    (status, body) or (status, body, headers) responses that are served in
+    turn, the last one repeating. 200 responses carry an ETag and honour
+    If-None-Match while options["etags"] is set. Every response takes
+    options["delay"] seconds, and options["peak"] is the most requests the
+    server had in flight at once.
+    """
+    routes = {}
+    hits = []
+    options = {"etags": True, "delay": 0.0, "peak": 0}
+    in_flight = []
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                hits.append(self.path)
+                in_flight.append(self.path)
+                options["peak"] = max(options["peak"], len(in_flight))
+                responses = routes.get(self.path, [(404, "Not found")])
+                status, body, *headers = responses.pop(0) if len(responses) > 1 else responses[0]
+            time.sleep(options["delay"])
+            with lock:
+                in_flight.remove(self.path)
+            payload = body.encode()
+            etag = f'"{hashlib.md5(payload).hexdigest()}"'
+            if status == 200 and options["etags"] and self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            if status == 200 and options["etags"]:
+                self.send_header("ETag", etag)
+            for name, value in (headers[0] if headers else {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", routes, hits, options
+    server.shutdown()
+    server.server_close()
+
+
+class TestScrapeEngine:
+    """
+    Tests for the asyncio scraping engine against a stub site
+    """
+
+    def setup_data_for_test(self, db_session, make_catalog, website_url):
+        """Aux function to create the Products the stub site lists and a pending ScrapingJob"""
+        (supermarket,), category, _ = make_catalog(products=0, website_url=website_url)
+        products = [
+            Product(name="Leche Entera Pasteurizada Colanta", variant="1L", sku="7702129001", category_id=category.id),
+            Product(name="Huevos AA Rojos", variant="x30", category_id=category.id),
+            Product(name="Queso Campesino Alpina", variant="250g", sku="7702001999", category_id=category.id),
+        ]
+        for product in products:
+            db_session.add(product)
+        job = ScrapingJob(supermarket_id=supermarket.id)
+        db_session.add(job)
+        db_session.commit()
+        for product in products:
+            db_session.refresh(product)
+        db_session.refresh(job)
+
+        return supermarket, products, job
+
+    def test_json_ld_extractor(self):
+        """Test that Product entries, ItemLists and next links are read from JSON-LD"""
+        page = JsonLdExtractor().extract(
+            "https://shop.example.com/lacteos", (FIXTURES / "listing_1.html").read_text(encoding="utf-8")
+        )
+        assert page.items == [
+            ScrapedItem(
+                name="Leche Entera Colanta Bolsa", price=4590.0,
+                url="https://shop.example.com/leche-entera-colanta/p", sku="7702129001",
+            ),
+            ScrapedItem(name="Huevos AA Rojos", price=18900.0, url="https://shop.example.com/lacteos", variant="x30"),
+        ]
+        assert page.links == ["https://shop.example.com/lacteos?page=2", "https://ads.example.net/next"]
+
+        page = JsonLdExtractor().extract(
+            "https://shop.example.com/lacteos?page=2", (FIXTURES / "listing_2.html").read_text(encoding="utf-8")
+        )
+        # The unparseable price and the broken JSON block are skipped
+        assert [item.name for item in page.items] == ["Queso Campesino Alpina", "Yogurt Griego Natural"]
+        assert page.items[0].price == 9800.0
+
+    def test_extractor_registry(self):
+        """Test that extractors are looked up by domain, falling back to JSON-LD"""
+        @register_extractor("www.tienda.example.com")
+        class TiendaExtractor(Extractor):
+            concurrency = 2
+
+        try:
+            assert isinstance(get_extractor("https://tienda.example.com/"), TiendaExtractor)
+            assert isinstance(get_extractor("https://WWW.TIENDA.EXAMPLE.COM/frutas"), TiendaExtractor)
+            assert isinstance(get_extractor("https://other.example.com/"), JsonLdExtractor)
+        finally:
+            EXTRACTORS.pop("tienda.example.com")
+
+    def test_run_job(self, db_session, make_catalog, stub_site):
+        """Test a crawl: items are matched, ingested in batches and counted on the job"""
+        base_url, routes, hits, _ = stub_site
+        routes["/lacteos"] = [(200, (FIXTURES / "listing_1.html").read_text(encoding="utf-8"))]
+        routes["/lacteos?page=2"] = [(200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8"))]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+
+        job = asyncio.run(ScrapeEngine(db_session, batch_size=2, parse_processes=2).run(job))
+
+        # Page 3 is a 404; the yogurt has no product to match
+        assert job.status == ScrapingJobStatus.COMPLETED
+        assert job.products_scraped == 3
+        assert job.errors_count == 1
+        assert "HTTP 404" in job.error_message
+        assert job.completed_at is not None
+        # Links to other sites are not followed
+        assert sorted(hits) == ["/lacteos", "/lacteos?page=2", "/lacteos?page=3"]
+
+        prices = db_session.exec(select(Price.product_id, Price.price).where(Price.supermarket_id == supermarket.id)).all()
+        assert sorted(prices) == sorted([(products[0].id, 4590.0), (products[1].id, 18900.0), (products[2].id, 9800.0)])
+
+    def test_retries_and_failures(self, db_session, make_catalog, stub_site, monkeypatch):
+        """Test that server errors are retried, and a site that can't be fetched fails the job"""
+        monkeypatch.setattr(scrape_engine, "RETRY_BACKOFF", 0)
+        base_url, routes, hits, _ = stub_site
+        routes["/lacteos"] = [(503, "Busy"), (200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8"))]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+
+        job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+        assert job.status == ScrapingJobStatus.COMPLETED
+        assert job.products_scraped == 1
+        assert hits.count("/lacteos") == 2
+
+        routes["/lacteos"] = [(500, "Down")]
+        hits.clear()
+        failed = ScrapingJob(supermarket_id=supermarket.id)
+        db_session.add(failed)
+        db_session.commit()
+        failed = asyncio.run(ScrapeEngine(db_session, max_retries=1, parse_processes=0).run(failed))
+        assert failed.status == ScrapingJobStatus.FAILED
+        assert failed.errors_count == 1
+        assert hits == ["/lacteos", "/lacteos"]
+
+    def test_concurrency_per_supermarket(self, db_session, make_catalog, stub_site):
+        """Test that requests to a site never exceed its concurrency ceiling"""
+        base_url, routes, hits, options = stub_site
+        options["delay"] = 0.02
+
+        class PagedExtractor(Extractor):
+            concurrency = 2
+
+            def start_urls(self, website_url):
+                return [f"{website_url}/page/{i}" for i in range(8)]
+
+            def extract(self, url, html):
+                return PageResult(items=[ScrapedItem(name="Huevos AA Rojos", variant="x30", price=18900.0, url=url)])
+
+        for i in range(8):
+            routes[f"/page/{i}"] = [(200, "<html></html>")]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, base_url)
+
+        register_extractor("127.0.0.1")(PagedExtractor)
+        try:
+            job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+        finally:
+            EXTRACTORS.pop("127.0.0.1")
+
+        assert job.status == ScrapingJobStatus.COMPLETED
+        assert options["peak"] == 2
+        assert job.metrics["peak_concurrency"] == 2
+        assert len(hits) == 8
+        # Eight observations of one product in one run compact to a single price
+        assert job.products_scraped == 8
+
+        # The supermarket's own ceiling wins over the extractor's
+        options["peak"] = 0
+        supermarket.max_concurrency = 1
+        db_session.add(supermarket)
+        job = ScrapingJob(supermarket_id=supermarket.id)
+        db_session.add(job)
+        db_session.commit()
+        register_extractor("127.0.0.1")(PagedExtractor)
+        try:
+            job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+        finally:
+            EXTRACTORS.pop("127.0.0.1")
+        assert options["peak"] == 1
+
+    def test_throttling_metrics(self, db_session, make_catalog, stub_site, monkeypatch):
+        """Test that a 429 backs the limiter off and the job reports it in its metrics"""
+        monkeypatch.setattr(scrape_engine, "RETRY_BACKOFF", 0)
+        base_url, routes, hits, _ = stub_site
+        routes["/lacteos"] = [
+            (429, "Slow down", {"Retry-After": "0"}),
+            (200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8")),
+        ]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+        supermarket.max_requests_per_second = 50.0
+        db_session.add(supermarket)
+        db_session.commit()
+
+        job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+
+        assert job.status == ScrapingJobStatus.COMPLETED
+        metrics = job.metrics
+        assert metrics["requests"] == 3
+        assert metrics["retries"] == 1
+        assert metrics["throttled"] == 1
+        assert metrics["backoffs"] == 1
+        assert metrics["pages"] == 1
+        # Halved by the 429, then recovering towards the supermarket's ceiling
+        assert 25.0 < metrics["rate"] < 50.0
+        assert metrics["mean_latency_ms"] > 0
+
+    def test_unchanged_pages_are_skipped(self, db_session, make_catalog, stub_site, page_store_dir):
+        """Test that pages answering 304 or with the same body are followed but not ingested again"""
+        base_url, routes, hits, options = stub_site
+        listing_1 = (FIXTURES / "listing_1.html").read_text(encoding="utf-8")
+        listing_2 = (FIXTURES / "listing_2.html").read_text(encoding="utf-8")
+        routes["/lacteos"] = [(200, listing_1)]
+        routes["/lacteos?page=2"] = [(200, listing_2)]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+
+        def run_again(**kwargs):
+            hits.clear()
+            job = ScrapingJob(supermarket_id=supermarket.id)
+            db_session.add(job)
+            db_session.commit()
+            return asyncio.run(ScrapeEngine(db_session, parse_processes=0, **kwargs).run(job))
+
+        job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+        assert job.products_scraped == 3
+        cached = crud_page_cache.get_cached_pages(db_session, supermarket.id)
+        assert set(cached) == {f"{base_url}/lacteos", f"{base_url}/lacteos?page=2"}
+        store = PageStore(page_store_dir)
+        assert store.get(cached[f"{base_url}/lacteos"].content_hash) == listing_1.encode()
+
+        # 304s: nothing to ingest, yet the cached links still lead on to page 3
+        job = run_again()
+        assert job.status == ScrapingJobStatus.COMPLETED
+        assert job.products_scraped == 0
+        assert sorted(hits) == ["/lacteos", "/lacteos?page=2", "/lacteos?page=3"]
+
+        # Without validators, an identical body is recognised by its hash
+        options["etags"] = False
+        job = run_again()
+        assert job.products_scraped == 0
+        assert len(hits) == 3
+
+        # A changed page is ingested again
+        routes["/lacteos?page=2"] = [(200, listing_2.replace("9800", "9900"))]
+        job = run_again()
+        assert job.products_scraped == 1
+        assert crud_page_cache.get_cached_pages(db_session, supermarket.id)[f"{base_url}/lacteos?page=2"].content_hash == (
+            content_hash(listing_2.replace("9800", "9900").encode())
+        )
+
+        # Unconditional runs ingest everything
+        job = run_again(conditional=False)
+        assert job.products_scraped == 3
+
+    def test_unchanged_pages_confirm_prices(self, db_session, make_catalog, client, stub_site):
+        """Test that prices of pages answering 304 stay in comparisons after the last change is a day old"""
+        base_url, routes, hits, options = stub_site
+        routes["/lacteos"] = [(200, (FIXTURES / "listing_1.html").read_text(encoding="utf-8"))]
+        routes["/lacteos?page=2"] = [(200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8"))]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+        asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+        cached = crud_page_cache.get_cached_pages(db_session, supermarket.id)
+        assert sorted(product_id for page in cached.values() for product_id in page.product_ids) == sorted(
+            product.id for product in products
+        )
+
+        # Move the clock past the comparison window: the first run is now 25 hours old
+        day_ago = timedelta(hours=25)
+        for row in (*db_session.exec(select(Price)), *db_session.exec(select(PriceLatest))):
+            row.scraped_at -= day_ago
+            db_session.add(row)
+        db_session.commit()
+        assert client.get(f"/prices/compare/{products[0].id}").status_code == 404
+
+        job = ScrapingJob(supermarket_id=supermarket.id)
+        db_session.add(job)
+        db_session.commit()
+        job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+
+        assert job.metrics["unchanged_pages"] == 2
+        assert (job.products_scraped, job.metrics["confirmed_prices"]) == (0, 3)
+        for product in products:
+            response = client.get(f"/prices/compare/{product.id}")
+            assert response.status_code == 200
+            assert len(response.json()["prices"]) == 1
+        # Every product is last seen by this run, at the price it had
+        last_seen = {}
+        for price in db_session.exec(select(Price).where(Price.supermarket_id == supermarket.id)):
+            seen = price.last_seen_at or price.scraped_at
+            seen = seen if seen.tzinfo else seen.replace(tzinfo=timezone.utc)
+            last_seen[price.product_id] = max(last_seen.get(price.product_id, seen), seen)
+        assert set(last_seen) == {product.id for product in products}
+        assert all(seen > datetime.now(timezone.utc) - timedelta(hours=1) for seen in last_seen.values())
+
+    def test_heartbeat_without_progress(self, db_session, make_catalog, stub_site):
+        """Test that a run of unchanged pages still writes its job's heartbeat"""
+        base_url, routes, hits, options = stub_site
+        routes["/lacteos"] = [(200, (FIXTURES / "listing_1.html").read_text(encoding="utf-8"))]
+        routes["/lacteos?page=2"] = [(200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8"))]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+        asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+
+        options["delay"] = 0.1
+        job = ScrapingJob(supermarket_id=supermarket.id)
+        db_session.add(job)
+        db_session.commit()
+        job = asyncio.run(ScrapeEngine(db_session, parse_processes=0, progress_interval=0.02).run(job))
+
+        assert job.metrics["unchanged_pages"] == 2
+        assert (job.products_scraped, job.errors_count) == (0, 1)
+        assert job.metrics["progress_flushes"] >= 3
+
+    def test_batches_are_ingested_off_the_event_loop(self, db_session, make_catalog, stub_site, monkeypatch):
+        """Test that matching and writes run on the ingest thread, with a session of their own"""
+        base_url, routes, hits, _ = stub_site
+        routes["/lacteos"] = [(200, (FIXTURES / "listing_1.html").read_text(encoding="utf-8"))]
+        routes["/lacteos?page=2"] = [(200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8"))]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+        match_products = scrape_engine.crud_product.match_products
+        calls = []
+
+        def recording_match_products(session, items, **kwargs):
+            calls.append((threading.current_thread().name, session))
+            return match_products(session, items, **kwargs)
+
+        monkeypatch.setattr(scrape_engine.crud_product, "match_products", recording_match_products)
+        job = asyncio.run(ScrapeEngine(db_session, batch_size=2, parse_processes=0).run(job))
+
+        assert job.products_scraped == 3
+        assert len(calls) >= 2
+        assert all(name.startswith("scrape-ingest") and session is not db_session for name, session in calls)
+        # One thread and one session for every batch
+        assert len({id(session) for _, session in calls}) == 1
+
+    def test_failed_batch_is_not_counted(self, db_session, make_catalog, stub_site, monkeypatch):
+        """Test that the prices of a batch whose commit fails are left out of the job's totals"""
+        base_url, routes, hits, _ = stub_site
+        routes["/lacteos"] = [(200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8"))]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+        create_prices_bulk = scrape_engine.crud_price.create_prices_bulk
+
+        def store_then_fail(session, prices_in, **kwargs):
+            result = create_prices_bulk(session, prices_in, **kwargs)
+            commit = session.commit
+
+            def failing_commit():
+                monkeypatch.setattr(session, "commit", commit)
+                raise OperationalError("COMMIT", {}, Exception("connection lost"))
+            # The batch is ingested through the engine's ingest session, not db_session
+            monkeypatch.setattr(session, "commit", failing_commit)
+            # Rollbacks would end the test's own transaction
+            monkeypatch.setattr(session, "rollback", lambda: None)
+            return result
+
+        monkeypatch.setattr(scrape_engine.crud_price, "create_prices_bulk", store_then_fail)
+        monkeypatch.setattr(db_session, "rollback", lambda: None)
+
+        job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+
+        assert job.status == ScrapingJobStatus.FAILED
+        assert "OperationalError" in job.error_message
+        assert job.products_scraped == 0
+
+    def test_scheduled_job(self, db_session, make_catalog, stub_site):
+        """Test that a job listing URLs fetches only those pages and marks them checked"""
+        base_url, routes, hits, _ = stub_site
+        routes["/lacteos?page=2"] = [(200, (FIXTURES / "listing_2.html").read_text(encoding="utf-8"))]
+        supermarket, products, job = self.setup_data_for_test(db_session, make_catalog, f"{base_url}/lacteos")
+        checked_at = datetime.now(timezone.utc) - timedelta(days=2)
+        schedule = ScrapeSchedule(
+            product_id=products[2].id, supermarket_id=supermarket.id, url=f"{base_url}/lacteos?page=2",
+            change_rate=1.0, interval_seconds=86400.0, checked_at=checked_at, next_due_at=checked_at,
+            leased_until=datetime.now(timezone.utc) + timedelta(hours=1),
+        )
+        db_session.add(schedule)
+        job.urls = [f"{base_url}/lacteos?page=2"]
+        db_session.add(job)
+        db_session.commit()
+
+        job = asyncio.run(ScrapeEngine(db_session, parse_processes=0).run(job))
+
+        assert job.status == ScrapingJobStatus.COMPLETED
+        assert job.products_scraped == 1
+        # Its link to page 3 is not followed
+        assert hits == ["/lacteos?page=2"]
+        db_session.refresh(schedule)
+        assert schedule.leased_until is None
+        next_due_at = schedule.next_due_at if schedule.next_due_at.tzinfo else schedule.next_due_at.replace(tzinfo=timezone.utc)
+        assert next_due_at > datetime.now(timezone.utc) + timedelta(hours=23)
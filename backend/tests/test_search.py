@@ -0,0 +1,102 @@
+from app.core.search import search_terms
+from app.models import Category, Product
+from app.crud import crud_product
+from app.schemas.product import ProductUpdate
+
+
+class TestProductSearch:
+    """
+    Tests for full-text product search
+    """
+
+    def setup_data_for_test(self, db_session):
+        """Aux function to create a Category and a few Products to search"""
+        category = Category(
+            name="Lácteos, huevos y refrigerados",
+            slug="lacteos-huevos-y-refrigerados",
+        )
+        other_category = Category(
+            name="Despensa",
+            slug="despensa",
+        )
+        db_session.add(category)
+        db_session.add(other_category)
+        db_session.commit()
+        db_session.refresh(category)
+        db_session.refresh(other_category)
+
+        products = [
+            Product(name="Leche Entera Pasteurizada Colanta (1000ML)", variant="1L", sku="7702129001", category_id=category.id),
+            Product(name="Leche Deslactosada Alquería", variant="Bolsa 900ML", sku="7702177012", category_id=category.id),
+            Product(name="Huevos AA Rojos", variant="Leche de gallina feliz x30", sku="7707210588", category_id=category.id),
+            Product(name="Arroz Diana", variant="500g", sku="7702511000", category_id=other_category.id),
+            Product(name="Lácteo Fermentado Kumis", variant="1L", sku="7702001934", category_id=category.id),
+        ]
+        for product in products:
+            db_session.add(product)
+        db_session.commit()
+        for product in products:
+            db_session.refresh(product)
+
+        return category, other_category, products
+
+    def test_search_terms(self):
+        """Test that queries are split into accent-folded words"""
+        assert search_terms("Lácteos  (1000ML)!") == ["lacteos", "1000ml"]
+        assert search_terms(" ' \" * ") == []
+
+    def test_search_matches_every_term(self, db_session):
+        """Test that only products containing all the query words are returned"""
+        _, _, products = self.setup_data_for_test(db_session)
+
+        results = crud_product.search_products(db_session, query="leche entera")
+        assert [product.id for product in results] == [products[0].id]
+
+        assert crud_product.search_products(db_session, query="leche cafe") == []
+        assert crud_product.search_products(db_session, query="!!!") == []
+
+    def test_search_relevance_order(self, db_session):
+        """Test that name matches rank above variant-only matches"""
+        _, _, products = self.setup_data_for_test(db_session)
+
+        results = crud_product.search_products(db_session, query="leche")
+        assert {product.id for product in results} == {products[0].id, products[1].id, products[2].id}
+        # "Leche" is only in the variant of the eggs
+        assert results[-1].id == products[2].id
+
+    def test_search_prefix_accents_and_sku(self, db_session):
+        """Test partial words, accent folding and SKU lookups"""
+        _, _, products = self.setup_data_for_test(db_session)
+
+        assert [product.id for product in crud_product.search_products(db_session, query="deslac")] == [products[1].id]
+        assert [product.id for product in crud_product.search_products(db_session, query="alqueria")] == [products[1].id]
+        assert [product.id for product in crud_product.search_products(db_session, query="kumís")] == [products[4].id]
+        assert [product.id for product in crud_product.search_products(db_session, query="7702511000")] == [products[3].id]
+        assert [product.id for product in crud_product.search_products(db_session, query="77025")] == [products[3].id]
+
+    def test_search_category_and_paging(self, db_session):
+        """Test the category filter and skip/limit on search results"""
+        category, other_category, products = self.setup_data_for_test(db_session)
+
+        assert crud_product.search_products(db_session, query="arroz", category_id=category.id) == []
+        results = crud_product.search_products(db_session, query="arroz", category_id=other_category.id)
+        assert [product.id for product in results] == [products[3].id]
+
+        everything = crud_product.search_products(db_session, query="leche")
+        page = crud_product.search_products(db_session, query="leche", skip=1, limit=1)
+        assert [product.id for product in page] == [everything[1].id]
+
+        # Without a query products are listed in ID order
+        listed = crud_product.search_products(db_session, category_id=category.id)
+        assert [product.id for product in listed] == [products[0].id, products[1].id, products[2].id, products[4].id]
+
+    def test_search_index_follows_updates(self, db_session):
+        """Test that renamed and deleted products are reflected in the index"""
+        _, _, products = self.setup_data_for_test(db_session)
+
+        crud_product.update_product(db_session, products[3], ProductUpdate(name="Arroz Roa Premium"))
+        assert [product.id for product in crud_product.search_products(db_session, query="roa")] == [products[3].id]
+        assert crud_product.search_products(db_session, query="diana") == []
+
+        crud_product.delete_product(db_session, products[3].id)
+        assert crud_product.search_products(db_session, query="arroz") == []
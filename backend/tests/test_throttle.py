@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from app.scraper import throttle
+from app.scraper.throttle import AdaptiveLimiter, TokenBucket
+
+
+class TestAdaptiveLimiter:
+    """
+    Tests for the token bucket and the AIMD concurrency window
+    """
+
+    def test_token_bucket_rate(self):
+        """Test that a bucket lets a burst through, then spaces requests to its rate"""
+        async def take(bucket, count):
+            started = time.monotonic()
+            for _ in range(count):
+                await bucket.acquire()
+            return time.monotonic() - started
+
+        assert asyncio.run(take(TokenBucket(rate=50.0, capacity=5), 5)) < 0.05
+        assert asyncio.run(take(TokenBucket(rate=50.0, capacity=1), 6)) >= 0.09
+
+    def test_window_grows_and_halves(self):
+        """Test additive increase on healthy responses and multiplicative decrease on errors"""
+        async def scenario():
+            limiter = AdaptiveLimiter(max_concurrency=8, max_rate=1000.0, burst=1000.0)
+            limiter.window = 2.0
+            for _ in range(40):
+                await limiter.release(await limiter.acquire(), 200)
+            grown = limiter.window
+            # Round trips of a real site, rather than of this event loop
+            limiter.latency = 1.0
+
+            await limiter.release(await limiter.acquire(), 503)
+            halved = limiter.window
+            # A second error within the same round trip is the same overload
+            await limiter.release(await limiter.acquire(), 503)
+            return grown, halved, limiter
+
+        grown, halved, limiter = asyncio.run(scenario())
+        assert grown == 8.0
+        assert halved == 4.0
+        assert limiter.window == 4.0
+        assert limiter.decreases == 1
+
+    def test_throttling_and_slow_responses(self, monkeypatch):
+        """Test that a 429 halves the rate and a much slower response shrinks the window"""
+        monkeypatch.setattr(throttle, "MIN_SLOW_LATENCY", 0.01)
+
+        async def scenario():
+            limiter = AdaptiveLimiter(max_concurrency=4, max_rate=100.0, burst=100.0, latency_tolerance=3.0)
+            await limiter.release(await limiter.acquire(), 200)
+            limiter.latency = 0.001
+
+            await limiter.release(await limiter.acquire(), 429, retry_after=0.05)
+            throttled = (limiter.window, limiter.rate)
+            limiter._last_decrease = 0.0
+
+            started = await limiter.acquire()
+            await asyncio.sleep(0.02)
+            await limiter.release(started, 200)
+            return throttled, limiter
+
+        (window, rate), limiter = asyncio.run(scenario())
+        assert (window, rate) == (2.0, 50.0)
+        assert limiter.window == 1.0
+        assert limiter.decreases == 2
+        # Slow responses still move the usual latency, so a slower site becomes the norm
+        assert limiter.latency > 0.001
+
+    def test_retry_after_pauses_requests(self):
+        """Test that Retry-After holds back the next request"""
+        async def scenario():
+            limiter = AdaptiveLimiter(max_concurrency=2, max_rate=1000.0, burst=10.0)
+            await limiter.release(await limiter.acquire(), 429, retry_after=0.1)
+            started = time.monotonic()
+            await limiter.acquire()
+            return time.monotonic() - started
+
+        assert asyncio.run(scenario()) >= 0.09
+
+    def test_window_limits_in_flight(self):
+        """Test that requests beyond the window wait for a slot"""
+        async def scenario():
+            limiter = AdaptiveLimiter(max_concurrency=3, max_rate=1000.0, burst=1000.0)
+            limiter.window = 2.0
+            peak = 0
+
+            async def request():
+                nonlocal peak
+                started = await limiter.acquire()
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+                await limiter.release(started, 404)
+
+            await asyncio.gather(*(request() for _ in range(6)))
+            return peak, limiter.in_flight
+
+        peak, in_flight = asyncio.run(scenario())
+        assert peak <= 3
+        assert in_flight == 0
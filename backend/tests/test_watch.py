@@ -0,0 +1,86 @@
+import pytest
+from datetime import timedelta
+from dateutil.parser import parse
+from sqlmodel import select
+from app.models import Supermarket, PriceAlert, PriceAlertReason
+from app.schemas.price import PriceCreate
+from app.schemas.watch import WatchCreate
+from app.crud import crud_price, crud_watch
+
+
+class TestPriceWatches:
+    """
+    Tests for watch evaluation on price ingestion
+    """
+
+    scraped_at_dt = parse("2022-01-01T00:00:00Z")
+
+    def observation(self, supermarket, product, price, hours):
+        return PriceCreate(
+            product_id=product.id,
+            supermarket_id=supermarket.id,
+            price=price,
+            scraped_at=self.scraped_at_dt + timedelta(hours=hours),
+        )
+
+    def alerts(self, db_session):
+        return db_session.exec(select(PriceAlert).order_by(PriceAlert.id)).all()
+
+    def test_target_price_alerts_once_when_crossed(self, db_session, catalog):
+        """Test that a target alert fires when the price first goes below the target"""
+        supermarket, _, product = catalog
+        watch = crud_watch.create_watch(db_session, WatchCreate(subscriber="ana@example.com", product_id=product.id, target_price=3.000))
+
+        crud_price.create_price(db_session, self.observation(supermarket, product, 3.500, 0))
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 2.900, 1),
+            self.observation(supermarket, product, 2.800, 2),
+        ])
+
+        alerts = self.alerts(db_session)
+        assert [(a.watch_id, a.reason, a.price, a.previous_price) for a in alerts] == [
+            (watch.id, PriceAlertReason.TARGET_PRICE, 2.900, 3.500)
+        ]
+
+    def test_drop_percent_compares_with_latest_price(self, db_session, catalog):
+        """Test percentage drops against the previous latest price, ignoring late and replayed rows"""
+        supermarket, _, product = catalog
+        crud_watch.create_watch(db_session, WatchCreate(subscriber="ana@example.com", product_id=product.id, drop_percent=10))
+
+        crud_price.create_price(db_session, self.observation(supermarket, product, 4.000, 5))
+        crud_price.create_prices_bulk(db_session, [
+            self.observation(supermarket, product, 3.000, 0),  # late, older than the latest price
+            self.observation(supermarket, product, 3.700, 6),  # -7.5%
+            self.observation(supermarket, product, 3.300, 7),  # -10.8% from 3.700
+        ])
+        crud_price.create_prices_bulk(db_session, [self.observation(supermarket, product, 3.300, 7)])
+
+        alerts = self.alerts(db_session)
+        assert [(a.reason, a.price, a.previous_price) for a in alerts] == [(PriceAlertReason.PRICE_DROP, 3.300, 3.700)]
+        assert alerts[0].price_id is not None
+
+    def test_inactive_and_other_store_watches_are_skipped(self, db_session, catalog):
+        """Test that watches for another supermarket or inactive ones never match"""
+        supermarket, _, product = catalog
+        other = Supermarket(name="Other Supermarket", website_url="https://other.example.com")
+        db_session.add(other)
+        db_session.commit()
+        db_session.refresh(other)
+        crud_watch.create_watch(db_session, WatchCreate(subscriber="ana@example.com", product_id=product.id, supermarket_id=other.id, target_price=5.000))
+        crud_watch.create_watch(db_session, WatchCreate(subscriber="ana@example.com", product_id=product.id, target_price=5.000, is_active=False))
+
+        crud_price.create_price(db_session, self.observation(supermarket, product, 3.000, 0))
+
+        assert self.alerts(db_session) == []
+
+    def test_mark_alerts_delivered(self, db_session, catalog):
+        """Test that delivered alerts leave the pending list"""
+        supermarket, _, product = catalog
+        crud_watch.create_watch(db_session, WatchCreate(subscriber="ana@example.com", product_id=product.id, target_price=5.000))
+        crud_price.create_price(db_session, self.observation(supermarket, product, 3.000, 0))
+
+        pending = crud_watch.get_pending_alerts(db_session)
+        assert len(pending) == 1
+        assert crud_watch.mark_alerts_delivered(db_session, [pending[0].id]) == 1
+        assert crud_watch.mark_alerts_delivered(db_session, [pending[0].id]) == 0
+        assert crud_watch.get_pending_alerts(db_session) == []